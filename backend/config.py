@@ -24,8 +24,108 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.5-pro')
 GEMINI_IMAGE_MODEL = os.getenv('GEMINI_IMAGE_MODEL', 'gemini-2.5-flash-image-preview')
 
+# Slides batchUpdate Configuration
+# Maximum number of requests sent in one presentations.batchUpdate when committing a deck mutation plan
+SLIDES_MAX_REQUESTS_PER_BATCH = int(os.getenv('SLIDES_MAX_REQUESTS_PER_BATCH', '500'))
+# In-memory presentation snapshots kept per SlidesClient (least recently used are dropped)
+SLIDES_SNAPSHOT_MAX_ENTRIES = int(os.getenv('SLIDES_SNAPSHOT_MAX_ENTRIES', '4'))
+
+# Text generation concurrency
+# Number of placeholder texts generated in parallel (independent placeholders only)
+TEXT_GENERATION_CONCURRENCY = int(os.getenv('TEXT_GENERATION_CONCURRENCY', '6'))
+# Number of images generated, cropped and uploaded in parallel in the image stage
+IMAGE_GENERATION_CONCURRENCY = int(os.getenv('IMAGE_GENERATION_CONCURRENCY', '4'))
+# Default Gemini request rate limit per model (requests per minute, 0 = unlimited)
+GEMINI_RATE_LIMIT_RPM = int(os.getenv('GEMINI_RATE_LIMIT_RPM', '60'))
+# Per-model overrides, e.g. "gemini-2.5-pro=150,gemini-2.5-flash=1000"
+GEMINI_MODEL_RATE_LIMITS = {
+    name.strip(): int(limit)
+    for name, _, limit in (
+        item.partition('=') for item in os.getenv('GEMINI_MODEL_RATE_LIMITS', '').split(',') if '=' in item
+    )
+    if limit.strip().isdigit()
+}
+# Slides batchUpdate (write) requests per minute across all jobs and threads (0 = unlimited)
+SLIDES_WRITE_RATE_LIMIT_RPM = int(os.getenv('SLIDES_WRITE_RATE_LIMIT_RPM', '60'))
+
+# Gemini client (shared by all generators/analyzers)
+# Maximum in-flight Gemini requests per model across all jobs and threads
+GEMINI_MAX_CONCURRENT_REQUESTS = int(os.getenv('GEMINI_MAX_CONCURRENT_REQUESTS', '8'))
+# Retries for transient Gemini API errors (429/5xx/timeouts) with exponential backoff
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '3'))
+GEMINI_RETRY_BASE_DELAY = float(os.getenv('GEMINI_RETRY_BASE_DELAY', '1.0'))  # seconds
+GEMINI_RETRY_MAX_DELAY = float(os.getenv('GEMINI_RETRY_MAX_DELAY', '30.0'))  # seconds
+
+# Gemini response cache (text responses keyed by model + generation config + formatted prompt)
+# Mode: off | read (use cached responses, never store) | readwrite
+# Off by default: a cached response is returned verbatim for identical prompts until it expires.
+# Opt in with GEMINI_CACHE_MODE, or per run/job with --cache-mode / the cache_mode request field.
+GEMINI_CACHE_MODES = ('off', 'read', 'readwrite')
+GEMINI_CACHE_MODE = os.getenv('GEMINI_CACHE_MODE', 'off').strip().lower()
+GEMINI_CACHE_PATH = os.getenv(
+    'GEMINI_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'gemini_responses.sqlite3')
+)
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv('GEMINI_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))  # 0 = never expire
+GEMINI_CACHE_MAX_BYTES = int(os.getenv('GEMINI_CACHE_MAX_BYTES', str(100 * 1024 * 1024)))  # LRU eviction above this size
+
+# Drive upload deduplication (SHA-256 of image bytes -> existing Drive file)
+DRIVE_UPLOAD_DEDUP = os.getenv('DRIVE_UPLOAD_DEDUP', 'true').lower() == 'true'
+DRIVE_UPLOAD_INDEX_PATH = os.getenv(
+    'DRIVE_UPLOAD_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'drive_uploads.sqlite3')
+)
+DRIVE_UPLOAD_INDEX_TTL_SECONDS = int(os.getenv('DRIVE_UPLOAD_INDEX_TTL_SECONDS', str(30 * 24 * 3600)))
+DRIVE_UPLOAD_INDEX_MAX_ENTRIES = int(os.getenv('DRIVE_UPLOAD_INDEX_MAX_ENTRIES', '5000'))  # LRU eviction above this
+# Re-check that an indexed Drive file still exists when its last check is older than this
+DRIVE_UPLOAD_VERIFY_SECONDS = int(os.getenv('DRIVE_UPLOAD_VERIFY_SECONDS', '3600'))
+
+# Job server (FastAPI) scheduling
+# Number of jobs executed concurrently; further submissions wait in the queue
+JOB_WORKER_COUNT = int(os.getenv('JOB_WORKER_COUNT', '2'))
+# Submissions are rejected with HTTP 429 once this many jobs are waiting
+JOB_QUEUE_HIGH_WATER = int(os.getenv('JOB_QUEUE_HIGH_WATER', '20'))
+# Log lines kept per job (oldest lines are dropped beyond this)
+JOB_LOG_BUFFER_SIZE = int(os.getenv('JOB_LOG_BUFFER_SIZE', '5000'))
+# Per-stage deadlines for generation jobs in seconds (0 = no deadline), e.g. "images=300,text=600"
+JOB_STAGE_TIMEOUTS = {'analysis': 180, 'sheets': 180, 'text': 900, 'images': 900, 'styling': 300}
+JOB_STAGE_TIMEOUTS.update({
+    stage.strip(): int(timeout)
+    for stage, _, timeout in (
+        item.partition('=') for item in os.getenv('JOB_STAGE_TIMEOUTS', '').split(',') if '=' in item
+    )
+    if timeout.strip().isdigit()
+})
+# Job store backend: memory (lost on restart) | sqlite (JOB_STORE_PATH, WAL mode)
+JOB_STORE = os.getenv('JOB_STORE', 'memory').strip().lower()
+JOB_STORE_PATH = os.getenv(
+    'JOB_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'jobs.sqlite3')
+)
+# Finished jobs are evicted after this long and beyond this count (0 = no limit)
+JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', str(24 * 3600)))
+JOB_MAX_FINISHED = int(os.getenv('JOB_MAX_FINISHED', '500'))
+# Identical requests (same canonical request hash) submitted within this many seconds of a
+# successful run reuse its result instead of starting a new job (0 = only coalesce in-flight jobs)
+JOB_RESULT_REUSE_SECONDS = int(os.getenv('JOB_RESULT_REUSE_SECONDS', '0'))
+# Log lines kept when a finished job is compacted into the store
+JOB_LOG_RETAIN_LINES = int(os.getenv('JOB_LOG_RETAIN_LINES', '1000'))
+# Pre-initialized PPTAutomation instances kept warm for jobs (0 = one per worker)
+AUTOMATION_POOL_SIZE = int(os.getenv('AUTOMATION_POOL_SIZE', '0')) or JOB_WORKER_COUNT
+# Build the pool in the background when the server starts
+AUTOMATION_POOL_WARM_ON_STARTUP = os.getenv('AUTOMATION_POOL_WARM_ON_STARTUP', 'true').lower() == 'true'
+# Manifest rows generated in parallel by a batch run (main.py --batch / POST /jobs/batch)
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '3'))
+# Maximum rows accepted in one batch
+BATCH_MAX_ROWS = int(os.getenv('BATCH_MAX_ROWS', '200'))
+
 # Template Configuration
 TEMPLATE_PRESENTATION_ID = os.getenv('TEMPLATE_PRESENTATION_ID')  # You'll set this after creating template
+# Placeholder analyzer reports kept per template revision (Drive file ID + version), 0 = disabled
+TEMPLATE_ANALYSIS_CACHE_SIZE = int(os.getenv('TEMPLATE_ANALYSIS_CACHE_SIZE', '32'))
+# After deleting excess side_Heading slides, confirm the remaining slide IDs with a
+# fields-masked presentations.get (the placeholder list itself is always computed locally)
+VERIFY_SLIDE_DELETIONS = os.getenv('VERIFY_SLIDE_DELETIONS', 'false').lower() == 'true'
 
 # Placeholder Configuration
 PLACEHOLDERS = {
@@ -86,6 +186,14 @@ MANUAL_CROP_DIMS = {
 # Google Sheets Configuration
 GOOGLE_SHEETS_ID = os.getenv('GOOGLE_SHEETS_ID')  # Can be ID or full URL
 GOOGLE_SHEETS_RANGE = os.getenv('GOOGLE_SHEETS_RANGE', 'Sheet1')  # Default to whole sheet (just sheet name)
+# Sheet values are cached process-wide per spreadsheet revision (Drive modifiedTime) for this long
+SHEETS_CACHE_TTL_SECONDS = int(os.getenv('SHEETS_CACHE_TTL_SECONDS', '600'))  # 0 = disabled
+SHEETS_CACHE_MAX_ENTRIES = int(os.getenv('SHEETS_CACHE_MAX_ENTRIES', '64'))
+# Rows fetched per values.batchGet page when streaming a sheet
+SHEETS_PAGE_ROWS = int(os.getenv('SHEETS_PAGE_ROWS', '500'))
+# Estimated token budget for the sheet data in the Gemini project analysis prompt (only used
+# when the layout is not recognized locally); rows beyond it are summarized per phase/owner
+PROJECT_ANALYSIS_TOKEN_BUDGET = int(os.getenv('PROJECT_ANALYSIS_TOKEN_BUDGET', '8000'))
 
 # Placeholders that should be fetched from Google Sheets
 # These can be manually entered OR automatically analyzed by Gemini AI
@@ -5,13 +5,16 @@ Orchestrates the entire process of AI-powered presentation generation
 from .generator import ContentGenerator
 from .slides_client import SlidesClient
 from utils.placeholder_matcher import PlaceholderMatcher
-from utils.logger import get_logger
+from utils.logger import get_logger, ContextThreadPoolExecutor
 from utils.color_manager import color_manager
 from utils.sheets_reader import SheetsReader
-from config import TEMPLATE_PRESENTATION_ID, DEFAULT_IMAGE_URL, BING_IMAGE_SEARCH_KEY, BING_IMAGE_SEARCH_ENDPOINT, LOG_LEVEL, LOG_FILE, MANUAL_CROP_DIMS
-from utils.placeholder_analyzer import analyze_presentation
+from config import TEMPLATE_PRESENTATION_ID, DEFAULT_IMAGE_URL, BING_IMAGE_SEARCH_KEY, BING_IMAGE_SEARCH_ENDPOINT, LOG_LEVEL, LOG_FILE, MANUAL_CROP_DIMS, IMAGE_GENERATION_CONCURRENCY, GEMINI_CACHE_MODE, VERIFY_SLIDE_DELETIONS
+from utils.placeholder_analyzer import analyze_presentation, filter_report
+from utils.cancellation import enter_stage, checkpoint
 import requests
 import os
+import time
+import copy
 
 
 class PPTAutomation:
@@ -29,10 +32,134 @@ class PPTAutomation:
         if use_ai:
             self.content_generator = ContentGenerator()
             self.placeholder_matcher.set_content_generator(self.content_generator)
+            if self.sheets_reader and self.sheets_reader.project_analyzer is not None:
+                self.sheets_reader.project_analyzer.on_prompt_size = self.content_generator.record_prompt_size
             self.logger.info("AI Content Generator initialized")
         else:
             raise ValueError("AI Content Generator is required")
 
+    def reset_run_state(self):
+        """Clear per-run state so this instance can serve another job (used by the worker pool)"""
+        self.slides_client.reset_run_state()
+        if self.sheets_reader:
+            self.sheets_reader.clear_cache()
+            if self.sheets_reader.project_analyzer is not None:
+                self.sheets_reader.project_analyzer.cache_mode = GEMINI_CACHE_MODE
+        if hasattr(self, 'content_generator'):
+            self.content_generator.reset_run_state()
+
+    def _set_cache_mode(self, cache_mode=None):
+        """Apply the Gemini response cache mode to every Gemini caller used by this run"""
+        if not hasattr(self, 'content_generator'):
+            return None
+        cache_mode = self.content_generator.set_cache_mode(cache_mode)
+        analyzer = getattr(self.sheets_reader, 'project_analyzer', None) if self.sheets_reader else None
+        if analyzer is not None:
+            analyzer.cache_mode = cache_mode
+        self.logger.info(f"🗄️ Gemini response cache mode: {cache_mode}")
+        return cache_mode
+
+    def _run_image_stage(self, target_id, image_jobs, context, company_name=None, project_name=None,
+                         project_description=None, theme=None):
+        """Generate, crop and upload placeholder images concurrently, then stage their Slides edits.
+        
+        Each job is a dict with 'name', 'slide_id', 'dimensions' and optionally 'derived_from'
+        (+ 'output_filename'). Jobs without 'derived_from' start right away; a derived job
+        (backgroundImage) is cropped from the original uncropped copy of its source image
+        once that image is generated. The createImage/deleteObject requests are staged on the
+        calling thread in job order, so with a mutation plan open they go out in one commit.
+        
+        Returns:
+            set of placeholder names that were replaced
+        """
+        if not image_jobs:
+            return set()
+        
+        started = time.time()
+        folder_id = self.slides_client.get_or_create_uploads_folder()
+        
+        def upload(job, image_path, original_path=None):
+            prepared = {'image_path': image_path, 'original_path': original_path, 'uploaded': None}
+            if not image_path or not os.path.exists(image_path):
+                self.logger.warning(f"No image produced for {job['name']}")
+                return prepared
+            # Public access is granted for all images at once after the uploads finish
+            prepared['uploaded'] = self.slides_client.upload_image_to_drive(image_path, folder_id=folder_id, make_public=False)
+            return prepared
+        
+        def generate(job):
+            image_path, _, original_path = self.content_generator.generate_image(
+                placeholder_type=job['name'],
+                context=context,
+                company_name=company_name or context,
+                project_name=project_name or f"{context} Project",
+                project_description=project_description,
+                image_requirements=None,
+                theme=theme,
+                placeholder_dimensions=job['dimensions']
+            )
+            return upload(job, image_path, original_path)
+        
+        def derive(job, source_future):
+            # Submitted after its source job, so the source is already running (no pool deadlock)
+            source = source_future.result() if source_future else None
+            original_path = (source or {}).get('original_path')
+            if not original_path or not os.path.exists(original_path):
+                self.logger.warning(f"{job['derived_from']} original not available for {job['name']}, skipping")
+                return None
+            self.logger.info(f"Creating {job['name']} from original {job['derived_from']} copy (dimensions: {job['dimensions']})")
+            image_path = self.content_generator.crop_existing_image(
+                source_image_path=original_path,
+                target_dimensions=job['dimensions'],
+                output_filename=job.get('output_filename')
+            )
+            return upload(job, image_path)
+        
+        workers = max(1, min(IMAGE_GENERATION_CONCURRENCY, len(image_jobs)))
+        self.logger.info(f"🖼️ Image stage: preparing {len(image_jobs)} image(s) with {workers} worker(s)")
+        futures = {}
+        with ContextThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-stage") as pool:
+            for job in image_jobs:
+                if not job.get('derived_from'):
+                    futures[job['name']] = pool.submit(generate, job)
+            for job in image_jobs:
+                if job.get('derived_from'):
+                    futures[job['name']] = pool.submit(derive, job, futures.get(job['derived_from']))
+            prepared = {}
+            for name, future in futures.items():
+                try:
+                    prepared[name] = future.result()
+                except Exception as e:
+                    self.logger.warning(f"Image generation failed for {name}: {e}")
+        self.slides_client.make_files_public([
+            result['uploaded'][0] for result in prepared.values() if result and result.get('uploaded')
+        ])
+        self.logger.info(f"🖼️ Image stage: images generated and uploaded in {time.time() - started:.1f}s")
+        
+        replaced = set()
+        for job in image_jobs:
+            result = prepared.get(job['name'])
+            if not result or not result.get('uploaded'):
+                continue
+            try:
+                success = self.slides_client.replace_image_placeholder(
+                    target_id,
+                    f"{{{{{job['name']}}}}}",
+                    result['image_path'],
+                    slide_id=job.get('slide_id'),
+                    crop_properties=None,  # Images are pre-cropped before upload
+                    target_dimensions=job['dimensions'],
+                    uploaded=result['uploaded']
+                )
+                if success:
+                    replaced.add(job['name'])
+                    self.logger.info(f"Successfully replaced image placeholder: {job['name']}")
+                else:
+                    self.logger.warning(f"Failed to replace {job['name']} placeholder")
+            except Exception as e:
+                self.logger.warning(f"Image replacement failed for {job['name']}: {e}")
+        return replaced
+
     def _select_property_set(self, project_description):
         """
         Analyze project description and select the appropriate property set.
@@ -293,8 +420,19 @@ class PPTAutomation:
                                    profile=None, project_name=None, project_description=None, 
                                    company_name=None, proposal_type=None, company_website=None,
                                    sheets_id=None, sheets_range=None, primary_color=None, 
-                                   secondary_color=None, accent_color=None):
-        """Auto-detect placeholders (type + name) and fill text/images accordingly."""
+                                   secondary_color=None, accent_color=None, dry_run=False, cache_mode=None,
+                                   template_report=None):
+        """Auto-detect placeholders (type + name) and fill text/images accordingly.
+        
+        All Slides edits after slide deletion are collected in a DeckMutationPlan and committed
+        in a few batchUpdate calls at the end. With dry_run=True the plan is returned as
+        'mutation_plan' in the result instead of being sent. A dry run still copies the
+        template, deletes the unused slides from the copy and uploads the generated images
+        to Drive; only the content edits are left unsent.
+        cache_mode ('off', 'read', 'readwrite') controls the Gemini response cache for this run.
+        template_report is an analyzer report of the template computed beforehand (batch runs
+        analyze the template once); the copy keeps the template's object IDs, so Step 1 reuses it.
+        """
         def _normalize_dims(dims):
             if not dims:
                 return None
@@ -317,6 +455,7 @@ class PPTAutomation:
 
         if hasattr(self, 'content_generator'):
             self.content_generator.reset_token_usage()
+        self._set_cache_mode(cache_mode)
 
         # Duplicate the template deck using Drive (reliable way to clone all slides)
         working_title = output_title or f"{company_name or context} - Generated"
@@ -333,8 +472,14 @@ class PPTAutomation:
         # ============================================================================
         # STEP 1: INITIAL ANALYSIS - Analyze placeholders to identify structure
         # ============================================================================
+        enter_stage('analysis')
         self.logger.info("📊 Step 1: Analyzing presentation to detect placeholders...")
-        report = analyze_presentation(target_id)
+        if template_report:
+            report = copy.deepcopy(template_report)
+            report['presentationId'] = target_id
+            self.logger.info("Reusing the pre-computed template analysis for the copied deck")
+        else:
+            report = analyze_presentation(target_id, client=self.slides_client)
         detected = report.get('placeholders') or []
         if not detected:
             self.logger.error("No placeholders found via analyzer")
@@ -406,15 +551,25 @@ class PPTAutomation:
                 
                 if delete_success:
                     self.logger.info(f"✅ Successfully deleted {len(slides_to_delete)} slide(s)")
+                    # The deletion batch is atomic: drop the deleted slides' placeholders locally
+                    remaining_slide_ids = None
+                    if VERIFY_SLIDE_DELETIONS:
+                        # Ask the server: the local snapshot already has the deletion applied
+                        remaining_slide_ids = self.slides_client.get_slide_ids(target_id, force_remote=True)
+                        if remaining_slide_ids is not None:
+                            still_present = set(slides_to_delete) & set(remaining_slide_ids)
+                            if still_present:
+                                self.logger.warning(f"⚠️ Slides still present after deletion: {sorted(still_present)}")
+                            if remaining_slide_ids != self.slides_client.get_slide_ids(target_id):
+                                self.logger.warning("⚠️ Local snapshot differs from the server after deletion - re-fetching")
+                                self.slides_client.invalidate_snapshot(target_id)
+                    report = filter_report(report, removed_slide_ids=slides_to_delete,
+                                           remaining_slide_ids=remaining_slide_ids)
+                    detected = report.get('placeholders') or []
+                    self.logger.info(f"✓ Placeholder list updated: {len(detected)} placeholders remaining")
                 else:
                     self.logger.error(f"❌ Failed to delete slides. Continuing with existing slides.")
                 
-                # Re-analyze after deletion to get clean placeholder list
-                self.logger.info("🔄 Re-analyzing presentation after slide deletion...")
-                report = analyze_presentation(target_id)
-                detected = report.get('placeholders') or []
-                self.logger.info(f"✓ Re-analysis complete: {len(detected)} placeholders remaining")
-                
                 # Verify deletion was successful
                 remaining_max = self._find_max_side_heading_number(detected)
                 if remaining_max <= max_side_heading:
@@ -428,6 +583,9 @@ class PPTAutomation:
         # STEP 4: CONTINUE WITH CONTENT GENERATION - Process cleaned presentation
         # ============================================================================
         self.logger.info("🚀 Step 4: Proceeding with content generation...")
+
+        # Defer all remaining Slides edits into one mutation plan (committed before returning)
+        self.slides_client.begin_mutation_plan(target_id, dry_run=dry_run)
         
         # Build simple structures
         placeholder_names = [p.get('name') for p in detected if p.get('name')]
@@ -670,6 +828,7 @@ class PPTAutomation:
         content_map = {}
         
         # Fetch data from Google Sheets if configured
+        enter_stage('sheets')
         self.logger.info("=" * 80)
         self.logger.info("📊 CHECKING GOOGLE SHEETS DATA FETCH")
         self.logger.info("=" * 80)
@@ -798,6 +957,7 @@ class PPTAutomation:
                 self.logger.info(f"✅ Set property3 based on project description: '{prop3_val}'")
         
         # Fill remaining via matcher per placeholder
+        enter_stage('text')
         remaining_map = self.placeholder_matcher.generate_content_for_placeholders(
             match_result['matched'], context, company_name, project_name, project_description,
             existing_content=content_map
@@ -860,56 +1020,12 @@ class PPTAutomation:
         # Split text vs images using analyzer inferred_type
         text_map = {}
         image_targets = []  # list of tuples (name, slide_id, element_id)
-        image_1_path = None  # Store image_1 path for backgroundImage use
+        background_ph = None  # backgroundImage is cropped from image_1 in the image stage
         processed_images = set()  # Track which images have already been processed
         # Initialize final_image_map early to track extracted logos (will be populated later)
         final_image_map = {}
         
-        # First pass: generate image_1
-        for ph in detected:
-            name = ph.get('name')
-            if name == 'image_1':
-                try:
-                    # Find dimensions for image_1
-                    image_1_dimensions = None
-                    if ph.get('size'):
-                        size = ph['size']
-                        image_1_dimensions = {
-                            'width': size.get('width', {}).get('magnitude'),
-                            'height': size.get('height', {}).get('magnitude'),
-                            'unit': size.get('width', {}).get('unit', 'PT')
-                        }
-                    # Prefer manual override if provided
-                    if MANUAL_CROP_DIMS.get('image_1'):
-                        image_1_dimensions = _normalize_dims(MANUAL_CROP_DIMS.get('image_1'))
-                    
-                    image_1_path, image_1_crop, image_1_original = self.content_generator.generate_image(
-                        placeholder_type='image_1',
-                        context=context,
-                        company_name=company_name or context,
-                        project_name=project_name or f"{context} Project",
-                        project_description=project_description,
-                        image_requirements=None,
-                        theme=theme,
-                        placeholder_dimensions=image_1_dimensions
-                    )
-                    if image_1_path and os.path.exists(image_1_path):
-                        # Replace image_1 placeholder
-                        self.slides_client.replace_image_placeholder(
-                            target_id,
-                            "{{image_1}}",
-                            image_1_path,
-                            slide_id=ph.get('slide_id'),
-                            crop_properties=image_1_crop,
-                            target_dimensions=image_1_dimensions
-                        )
-                        self.logger.info("Successfully replaced image_1 placeholder with project context")
-                        processed_images.add('image_1')
-                except Exception as e:
-                    self.logger.warning(f"Image_1 generation failed: {e}")
-                break  # Exit after processing image_1
-        
-        # Second pass: process all other placeholders
+        # Sort placeholders into text, image, color and emoji handling
         for ph in detected:
             name = ph.get('name')
             inferred = (ph.get('inferred_type') or '').upper()
@@ -920,46 +1036,9 @@ class PPTAutomation:
                 text_map[name] = name
                 continue
                 
-            # Handle backgroundImage by copying and cropping image_1
+            # backgroundImage is created from image_1 in the image stage below
             if name == 'backgroundImage':
-                try:
-                    # Get background dimensions
-                    bg_dimensions = None
-                    if ph.get('size'):
-                        size = ph['size']
-                        bg_dimensions = {
-                            'width': size.get('width', {}).get('magnitude'),
-                            'height': size.get('height', {}).get('magnitude'),
-                            'unit': size.get('width', {}).get('unit', 'PT')
-                        }
-                    if MANUAL_CROP_DIMS.get('backgroundImage'):
-                        bg_dimensions = _normalize_dims(MANUAL_CROP_DIMS.get('backgroundImage'))
-                    
-                    # Use the original uncropped image_1 to create backgroundImage
-                    if image_1_original and os.path.exists(image_1_original):
-                        self.logger.info(f"Creating backgroundImage from original image_1 copy (dimensions: {bg_dimensions})")
-                        bg_image_path = self.content_generator.crop_existing_image(
-                            source_image_path=image_1_original,
-                            target_dimensions=bg_dimensions,
-                            output_filename=f"backgroundImage_{company_name.replace(' ', '_') if company_name else 'auto'}.jpg"
-                        )
-                        if bg_image_path and os.path.exists(bg_image_path):
-                            self.slides_client.replace_image_placeholder(
-                                target_id,
-                                "{{backgroundImage}}",
-                                bg_image_path,
-                                slide_id=ph.get('slide_id'),
-                                crop_properties=None,
-                                target_dimensions=bg_dimensions
-                            )
-                            self.logger.info("Successfully replaced backgroundImage placeholder using cropped copy of image_1")
-                            processed_images.add('backgroundImage')
-                        else:
-                            self.logger.warning("Failed to create backgroundImage from image_1 original")
-                    else:
-                        self.logger.warning("image_1 original not available for backgroundImage, skipping")
-                except Exception as e:
-                    self.logger.warning(f"Background image replacement failed: {e}")
+                background_ph = background_ph or ph
                 continue
             
             if inferred == 'IMAGE' or name.lower().startswith('image') or name.lower() in ('logo', 'companylogo') or name.lower().startswith('companylogo'):
@@ -1078,88 +1157,107 @@ class PPTAutomation:
         if 'effort_estimation_q' in content_map:
             text_map['effort_estimation_q'] = content_map['effort_estimation_q']
 
+        # Image stage: collect every image placeholder, then generate/crop/upload them concurrently
+        image_jobs = []
+        image_1_ph = next((ph for ph in detected if ph.get('name') == 'image_1'), None)
+        if image_1_ph:
+            image_1_dimensions = None
+            if image_1_ph.get('size'):
+                size = image_1_ph['size']
+                image_1_dimensions = {
+                    'width': size.get('width', {}).get('magnitude'),
+                    'height': size.get('height', {}).get('magnitude'),
+                    'unit': size.get('width', {}).get('unit', 'PT')
+                }
+            # Prefer manual override if provided
+            if MANUAL_CROP_DIMS.get('image_1'):
+                image_1_dimensions = _normalize_dims(MANUAL_CROP_DIMS.get('image_1'))
+            image_jobs.append({'name': 'image_1', 'slide_id': image_1_ph.get('slide_id'), 'dimensions': image_1_dimensions})
+        
+        if background_ph:
+            bg_dimensions = None
+            if background_ph.get('size'):
+                size = background_ph['size']
+                bg_dimensions = {
+                    'width': size.get('width', {}).get('magnitude'),
+                    'height': size.get('height', {}).get('magnitude'),
+                    'unit': size.get('width', {}).get('unit', 'PT')
+                }
+            if MANUAL_CROP_DIMS.get('backgroundImage'):
+                bg_dimensions = _normalize_dims(MANUAL_CROP_DIMS.get('backgroundImage'))
+            image_jobs.append({
+                'name': 'backgroundImage',
+                'slide_id': background_ph.get('slide_id'),
+                'dimensions': bg_dimensions,
+                'derived_from': 'image_1',
+                'output_filename': f"backgroundImage_{company_name.replace(' ', '_') if company_name else 'auto'}.jpg"
+            })
+
         for name, slide_id, element_id in image_targets:
             if name in ['image_1', 'backgroundImage']:
                 continue  # Skip these as they're handled separately
             
-            # Skip if already processed
-            if name in processed_images:
-                self.logger.debug(f"Skipping already processed image: {name}")
+            # Skip if already queued (same placeholder on several slides)
+            if any(job['name'] == name for job in image_jobs):
+                self.logger.debug(f"Skipping already queued image: {name}")
                 continue
                 
-            try:
-                # Find dimensions for this placeholder
-                placeholder_dimensions = None
-                for ph in detected:
-                    if ph.get('name') == name and ph.get('element_id') == element_id:
-                        if ph.get('size'):
-                            size = ph['size']
-                            width = size.get('width', {}).get('magnitude')
-                            height = size.get('height', {}).get('magnitude')
-                            # Validate dimensions - reject obviously invalid values (like 3000000)
-                            if width and height:
-                                # Convert EMU to PT if needed (1 inch = 914400 EMU = 72 PT, so 1 EMU = 72/914400 PT)
-                                # But if values are > 10000, they're likely EMU, otherwise assume PT
-                                if width > 10000 or height > 10000:
-                                    # Likely EMU, convert to PT
-                                    width = float(width) / 914400 * 72
-                                    height = float(height) / 914400 * 72
-                                    self.logger.debug(f"Converted {name} dimensions from EMU to PT: {width}x{height}")
-                                else:
-                                    width = float(width)
-                                    height = float(height)
-                                
-                                # Validate reasonable dimensions (reject if > 1000 PT which is ~14 inches)
-                                if width > 0 and height > 0 and width < 1000 and height < 1000:
-                                    placeholder_dimensions = {
-                                        'width': width,
-                                        'height': height,
-                                        'unit': 'PT'
-                                    }
-                                    self.logger.debug(f"Detected dimensions for {name}: {width}x{height} PT")
-                                else:
-                                    self.logger.warning(f"Invalid dimensions detected for {name}: {width}x{height} PT, using manual/default")
-                            break
-                # Prefer manual override by placeholder name
-                if MANUAL_CROP_DIMS.get(name):
-                    placeholder_dimensions = _normalize_dims(MANUAL_CROP_DIMS.get(name))
-                    self.logger.info(f"Using MANUAL_CROP_DIMS for {name}: {placeholder_dimensions}")
-                
-                is_company_logo = name.lower() == 'companylogo' or name.lower().startswith('companylogo_')
-                if is_company_logo:
-                    self.logger.info(f"⏭️ Skipping automatic generation for {name}. Provide a custom logo via overrides to replace this placeholder.")
-                    continue
-                
-                image_path, image_crop, _ = self.content_generator.generate_image(
-                    placeholder_type=name,
-                    context=context,
-                    company_name=company_name or context,
-                    project_name=project_name or f"{context} Project",
-                    project_description=project_description,
-                    image_requirements=None,
-                    theme=theme,
-                    placeholder_dimensions=placeholder_dimensions
-                )
-                
-                if image_path and os.path.exists(image_path):
-                    # Replace - exact handling for companyLogo is done automatically in replace_image_placeholder
-                    success = self.slides_client.replace_image_placeholder(
-                        target_id,
-                        f"{{{{{name}}}}}",
-                        image_path,
-                        slide_id=slide_id,
-                        crop_properties=None,  # No crop needed - exact replacement handles sizing
-                        target_dimensions=placeholder_dimensions  # Pass for reference (companyLogo uses exact method)
-                    )
-                    
-                    if success:
-                        processed_images.add(name)
-                        self.logger.info(f"Successfully replaced image placeholder: {name}")
-                    else:
-                        self.logger.warning(f"Failed to replace {name} placeholder")
-            except Exception as e:
-                self.logger.warning(f"Image replacement failed for {name}: {e}")
+            # Find dimensions for this placeholder
+            placeholder_dimensions = None
+            for ph in detected:
+                if ph.get('name') == name and ph.get('element_id') == element_id:
+                    if ph.get('size'):
+                        size = ph['size']
+                        width = size.get('width', {}).get('magnitude')
+                        height = size.get('height', {}).get('magnitude')
+                        # Validate dimensions - reject obviously invalid values (like 3000000)
+                        if width and height:
+                            # Convert EMU to PT if needed (1 inch = 914400 EMU = 72 PT, so 1 EMU = 72/914400 PT)
+                            # But if values are > 10000, they're likely EMU, otherwise assume PT
+                            if width > 10000 or height > 10000:
+                                # Likely EMU, convert to PT
+                                width = float(width) / 914400 * 72
+                                height = float(height) / 914400 * 72
+                                self.logger.debug(f"Converted {name} dimensions from EMU to PT: {width}x{height}")
+                            else:
+                                width = float(width)
+                                height = float(height)
+                            
+                            # Validate reasonable dimensions (reject if > 1000 PT which is ~14 inches)
+                            if width > 0 and height > 0 and width < 1000 and height < 1000:
+                                placeholder_dimensions = {
+                                    'width': width,
+                                    'height': height,
+                                    'unit': 'PT'
+                                }
+                                self.logger.debug(f"Detected dimensions for {name}: {width}x{height} PT")
+                            else:
+                                self.logger.warning(f"Invalid dimensions detected for {name}: {width}x{height} PT, using manual/default")
+                        break
+            # Prefer manual override by placeholder name
+            if MANUAL_CROP_DIMS.get(name):
+                placeholder_dimensions = _normalize_dims(MANUAL_CROP_DIMS.get(name))
+                self.logger.info(f"Using MANUAL_CROP_DIMS for {name}: {placeholder_dimensions}")
+            
+            is_company_logo = name.lower() == 'companylogo' or name.lower().startswith('companylogo_')
+            if is_company_logo:
+                self.logger.info(f"⏭️ Skipping automatic generation for {name}. Provide a custom logo via overrides to replace this placeholder.")
+                continue
+            
+            image_jobs.append({'name': name, 'slide_id': slide_id, 'dimensions': placeholder_dimensions})
+
+        enter_stage('images')
+        processed_images |= self._run_image_stage(
+            target_id,
+            image_jobs,
+            context=context,
+            company_name=company_name,
+            project_name=project_name,
+            project_description=project_description,
+            theme=theme
+        )
 
+        enter_stage('styling')
         # Add any u0022 entries from content_map to text_map before replacement
         # Also check detected placeholders directly to ensure we have it
         u0022_found = False
@@ -1222,27 +1320,52 @@ class PPTAutomation:
             # Apply special styling for "Project" and "Overview" text elements
             self._apply_special_text_styling(target_id, theme)
 
+        # Send every staged Slides edit (or return the plan for dry runs)
+        checkpoint()
+        plan_result = self.slides_client.commit_mutation_plan(target_id, dry_run=dry_run)
+        if plan_result and not plan_result.get('dry_run') and not plan_result.get('committed'):
+            self.logger.error(f"❌ Failed to commit presentation updates: {plan_result.get('error')}")
+            return {
+                'success': False,
+                'error': 'COMMIT_FAILED',
+                'message': f"Could not apply updates to the presentation: {plan_result.get('error')}",
+                'presentation_id': target_id,
+                'token_usage': self.content_generator.get_token_usage_summary() if hasattr(self, 'content_generator') else None
+            }
+        if plan_result and plan_result.get('failed_stages'):
+            self.logger.warning(f"⚠️ Some stages were not applied: {', '.join(plan_result['failed_stages'])}")
+        if plan_result and plan_result.get('dry_run'):
+            plan_result['note'] = (
+                'Content edits were not sent. The template was still copied, unused slides were '
+                'deleted from the copy and generated images were uploaded to Drive.'
+            )
+
         token_usage_summary = None
         if hasattr(self, 'content_generator'):
             token_usage_summary = self.content_generator.get_token_usage_summary()
             self.logger.info(
                 f"🧮 Token usage this run → prompt: {token_usage_summary['prompt_tokens']}, "
                 f"candidates: {token_usage_summary['candidates_tokens']}, "
-                f"total: {token_usage_summary['total_tokens']}"
+                f"total: {token_usage_summary['total_tokens']}, "
+                f"cache hits/misses: {token_usage_summary['cache']['hits']}/{token_usage_summary['cache']['misses']}"
             )
 
         presentation_url = self.slides_client.get_presentation_url(target_id)
-        return {
+        result = {
             'success': True,
             'presentation_id': target_id,
             'presentation_url': presentation_url,
             'placeholders_replaced': len(text_map) + len(image_targets),
             'token_usage': token_usage_summary
         }
+        if plan_result:
+            result['mutation_plan'] = plan_result
+        return result
     
     def generate_presentation(self, context, template_id=None, output_title=None, image_overrides=None, 
                             profile=None, project_name=None, project_description=None, company_name=None, proposal_type=None, company_website=None,
-                            sheets_id=None, sheets_range=None, primary_color=None, secondary_color=None, accent_color=None):
+                            sheets_id=None, sheets_range=None, primary_color=None, secondary_color=None, accent_color=None,
+                            cache_mode=None):
         """Generate a complete presentation from template"""
         def _normalize_dims(dims):
             if not dims:
@@ -1266,6 +1389,7 @@ class PPTAutomation:
 
         if hasattr(self, 'content_generator'):
             self.content_generator.reset_token_usage()
+        self._set_cache_mode(cache_mode)
         
         # Duplicate the template deck using Drive (reliable way to clone all slides)
         working_title = output_title or f"{company_name or context} - Generated"
@@ -2385,7 +2509,8 @@ class PPTAutomation:
                 self.logger.info(
                     f"🧮 Token usage this run → prompt: {token_usage_summary['prompt_tokens']}, "
                     f"candidates: {token_usage_summary['candidates_tokens']}, "
-                    f"total: {token_usage_summary['total_tokens']}"
+                    f"total: {token_usage_summary['total_tokens']}, "
+                    f"cache hits/misses: {token_usage_summary['cache']['hits']}/{token_usage_summary['cache']['misses']}"
                 )
 
             # Apply the styling map AFTER text has been replaced
@@ -2499,7 +2624,7 @@ class PPTAutomation:
             
             # Apply all styling requests
             if requests:
-                self.slides_client.batch_update_requests(presentation_id, requests)
+                self.slides_client.batch_update_requests(presentation_id, requests, stage='special_styling')
                 self.logger.info(f"Applied special text styling to {len(requests)} elements")
                 
         except Exception as e:
@@ -0,0 +1,104 @@
+"""
+Warm pool of PPTAutomation instances
+Keeps authenticated, fully initialized automation objects around between jobs
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from .automation import PPTAutomation
+from utils.logger import get_logger
+from utils.color_manager import color_manager
+from config import AUTOMATION_POOL_SIZE, LOG_LEVEL, LOG_FILE
+
+
+class AutomationPool:
+    """Pool of reusable PPTAutomation instances.
+
+    lease() hands out an idle instance (or builds one when none is idle); when the
+    lease ends the instance's per-run state is reset and it goes back to the pool,
+    up to `size` idle instances. An instance whose reset fails is dropped.
+    """
+
+    def __init__(self, size: Optional[int] = None, factory: Optional[Callable[[], PPTAutomation]] = None):
+        self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.size = max(1, size or AUTOMATION_POOL_SIZE)
+        self._factory = factory or (lambda: PPTAutomation(use_ai=True))
+        self._idle: List[PPTAutomation] = []
+        self._leased = 0
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self) -> PPTAutomation:
+        started = time.time()
+        automation = self._factory()
+        with self._lock:
+            self._created += 1
+        self.logger.info(f"🔥 Automation worker initialized in {time.time() - started:.2f}s")
+        return automation
+
+    def warm(self, count: Optional[int] = None) -> int:
+        """Build idle instances until `count` (default: pool size) are available. Returns the number built."""
+        target = min(self.size, count or self.size)
+        built = 0
+        while True:
+            with self._lock:
+                if len(self._idle) + self._leased >= target:
+                    break
+            try:
+                automation = self._create()
+            except Exception as e:
+                self.logger.error(f"❌ Could not warm automation worker: {e}")
+                break
+            with self._lock:
+                self._idle.append(automation)
+            built += 1
+        return built
+
+    def warm_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm, name="automation-pool-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def acquire(self) -> PPTAutomation:
+        with self._lock:
+            automation = self._idle.pop() if self._idle else None
+            self._leased += 1
+        if automation is not None:
+            return automation
+        try:
+            return self._create()
+        except Exception:
+            with self._lock:
+                self._leased -= 1
+            raise
+
+    def release(self, automation: PPTAutomation) -> None:
+        try:
+            automation.reset_run_state()
+            reusable = True
+        except Exception as e:
+            self.logger.warning(f"⚠️ Dropping automation worker (reset failed): {e}")
+            reusable = False
+        with self._lock:
+            self._leased -= 1
+            if reusable and len(self._idle) < self.size:
+                self._idle.append(automation)
+            # The color usage log lives on the shared color manager; only clear it between runs
+            idle_process = self._leased == 0
+        if idle_process:
+            color_manager.color_usage_log.clear()
+
+    @contextmanager
+    def lease(self):
+        """with pool.lease() as automation: ... (state is reset when the block exits)"""
+        automation = self.acquire()
+        try:
+            yield automation
+        finally:
+            self.release(automation)
+
+    def stats(self):
+        with self._lock:
+            return {'size': self.size, 'idle': len(self._idle), 'leased': self._leased, 'created': self._created}
@@ -0,0 +1,182 @@
+"""
+Batch deck generation
+Generates one presentation per manifest row (CSV or JSONL) from a shared template:
+the template is analyzed once, rows run in parallel on warm automation instances and
+all Gemini/Slides traffic goes through the process-wide rate limiters.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from .automation_pool import AutomationPool
+from utils.logger import get_logger, ContextThreadPoolExecutor
+from utils.placeholder_analyzer import analyze_presentation
+from utils.cancellation import CancellationToken, StageTimeout, cancellation_scope, current_token
+from config import TEMPLATE_PRESENTATION_ID, BATCH_CONCURRENCY, BATCH_MAX_ROWS, LOG_LEVEL, LOG_FILE
+
+
+# Manifest columns passed through to PPTAutomation.generate_presentation_auto
+ROW_FIELDS = (
+    'context', 'output_title', 'profile', 'project_name', 'project_description', 'company_name',
+    'proposal_type', 'company_website', 'sheets_id', 'sheets_range', 'primary_color',
+    'secondary_color', 'accent_color',
+)
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    """Read manifest rows from a .csv file (header row) or a JSON Lines file (one object per line)"""
+    rows: List[Dict[str, Any]] = []
+    if os.path.splitext(path)[1].lower() == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                row = {(k or '').strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+                if any(row.values()):
+                    rows.append(row)
+        return rows
+
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on manifest line {line_number}: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"Manifest line {line_number} is not a JSON object")
+            rows.append(row)
+    return rows
+
+
+class BatchRunner:
+    """Runs manifest rows against one template.
+
+    Each row leases an automation instance from the pool and runs under its own child
+    cancellation token: a row whose stage times out fails on its own, while cancelling
+    the surrounding job stops every row.
+    """
+
+    def __init__(self, pool: Optional[AutomationPool] = None, concurrency: Optional[int] = None):
+        self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.concurrency = max(1, concurrency or BATCH_CONCURRENCY)
+        self.pool = pool or AutomationPool(size=self.concurrency)
+
+    def analyze_template(self, template_id: str) -> Dict[str, Any]:
+        """Analyzer report of the template, shared by every row"""
+        with self.pool.lease() as automation:
+            file_id = automation.slides_client._extract_file_id(template_id) or template_id
+            return analyze_presentation(file_id, client=automation.slides_client)
+
+    def run(self, rows: List[Dict[str, Any]], template_id: Optional[str] = None, cache_mode: Optional[str] = None,
+            dry_run: bool = False, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Generate a deck per row. Returns the aggregate summary with per-row results.
+
+        on_progress receives the (updated) summary after the template analysis and after every row.
+        """
+        template_id = template_id or TEMPLATE_PRESENTATION_ID
+        if not template_id:
+            raise ValueError("No template presentation ID provided")
+        if not rows:
+            raise ValueError("The batch manifest has no rows")
+        if len(rows) > BATCH_MAX_ROWS:
+            raise ValueError(f"The batch has {len(rows)} rows; the limit is {BATCH_MAX_ROWS}")
+
+        started = time.time()
+        summary: Dict[str, Any] = {
+            'total': len(rows),
+            'completed': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'template_id': template_id,
+            'results': [
+                {'index': index, 'company_name': row.get('company_name'), 'status': 'pending'}
+                for index, row in enumerate(rows)
+            ],
+        }
+        lock = threading.Lock()
+
+        def _report():
+            if on_progress:
+                with lock:
+                    snapshot = dict(summary, results=[dict(r) for r in summary['results']])
+                on_progress(snapshot)
+
+        self.logger.info(f"📦 Batch started: {len(rows)} row(s), concurrency {self.concurrency}")
+        template_report = self.analyze_template(template_id)
+        placeholders = len(template_report.get('placeholders') or [])
+        self.logger.info(f"📊 Template analyzed once for the batch: {placeholders} placeholder(s)")
+        summary['template_placeholders'] = placeholders
+        _report()
+
+        parent_token = current_token()
+
+        def _run_row(index: int, row: Dict[str, Any]) -> Dict[str, Any]:
+            with lock:
+                summary['results'][index]['status'] = 'running'
+            row_started = time.time()
+            outcome: Dict[str, Any] = {'index': index, 'company_name': row.get('company_name')}
+            with cancellation_scope(CancellationToken(parent=parent_token)):
+                try:
+                    with self.pool.lease() as automation:
+                        result = self._generate(automation, row, template_id, template_report, cache_mode, dry_run)
+                    if result and result.get('success', True):
+                        outcome.update(status='succeeded', success=True,
+                                       presentation_id=result.get('presentation_id'),
+                                       presentation_url=result.get('presentation_url'))
+                    else:
+                        outcome.update(status='failed', success=False,
+                                       error=(result or {}).get('message') or (result or {}).get('error')
+                                       or 'Presentation generation failed',
+                                       presentation_id=(result or {}).get('presentation_id'))
+                except StageTimeout as e:
+                    outcome.update(status='failed', success=False, error=str(e))
+                except Exception as e:
+                    outcome.update(status='failed', success=False, error=str(e))
+            outcome['duration'] = round(time.time() - row_started, 2)
+            return outcome
+
+        with ContextThreadPoolExecutor(max_workers=min(self.concurrency, len(rows))) as executor:
+            futures = [executor.submit(_run_row, index, row) for index, row in enumerate(rows)]
+            for future in as_completed(futures):
+                outcome = future.result()
+                with lock:
+                    summary['results'][outcome['index']] = outcome
+                    summary['completed'] += 1
+                    summary['succeeded' if outcome['success'] else 'failed'] += 1
+                    completed = summary['completed']
+                if outcome['success']:
+                    self.logger.info(f"✅ Batch row {outcome['index'] + 1}/{len(rows)} done: {outcome.get('presentation_url')}")
+                else:
+                    self.logger.error(f"❌ Batch row {outcome['index'] + 1}/{len(rows)} failed: {outcome.get('error')}")
+                self.logger.info(f"📦 Batch progress: {completed}/{len(rows)}")
+                _report()
+
+        summary['duration'] = round(time.time() - started, 2)
+        self.logger.info(
+            f"📦 Batch finished in {summary['duration']:.1f}s: "
+            f"{summary['succeeded']} succeeded, {summary['failed']} failed"
+        )
+        return summary
+
+    @staticmethod
+    def _generate(automation, row: Dict[str, Any], template_id: str, template_report: Dict[str, Any],
+                  cache_mode: Optional[str], dry_run: bool):
+        params = {field: (row.get(field) or None) for field in ROW_FIELDS}
+        context = params.pop('context') or params.get('company_name') or 'General Presentation'
+        params['profile'] = params.get('profile') or 'company'
+        params['sheets_range'] = params.get('sheets_range') or 'Sheet1'
+        if not params.get('output_title') and params.get('company_name') and params.get('project_name'):
+            params['output_title'] = f"{params['company_name']} - {params['project_name']}"
+        return automation.generate_presentation_auto(
+            context,
+            template_id=template_id,
+            dry_run=dry_run,
+            cache_mode=row.get('cache_mode') or cache_mode,
+            template_report=template_report,
+            **params,
+        )
@@ -0,0 +1,227 @@
+"""
+Deferred batchUpdate pipeline for PPT Automation
+Collects Slides requests from all generation stages and commits them in a few batchUpdate calls
+"""
+import json
+import uuid
+from config import SLIDES_MAX_REQUESTS_PER_BATCH, LOG_LEVEL, LOG_FILE
+from utils.logger import get_logger
+
+
+class DeckMutationPlan:
+    """Ordered collection of Slides batchUpdate requests for one presentation.
+
+    While a plan is open, SlidesClient stages requests here instead of sending them and
+    applies them to the PresentationSnapshot right away, so the stages that follow keep
+    reading an up-to-date deck. commit() then sends everything in as few batchUpdate
+    calls as SLIDES_MAX_REQUESTS_PER_BATCH allows.
+
+    Requests are sent grouped by phase (stable within a phase):
+        1. text    - replaceAllText, deleteText, insertText and range-based formatting
+                     (FIXED_RANGE hyperlinks, bullets) which depend on the text at that point
+        2. delete  - deleteObject
+        3. create  - createImage and shape/page property updates
+        4. style   - whole-element updateTextStyle (theme and special styling)
+    """
+
+    PHASE_TEXT = 0
+    PHASE_DELETE = 1
+    PHASE_CREATE = 2
+    PHASE_STYLE = 3
+    PHASE_NAMES = {PHASE_TEXT: 'text', PHASE_DELETE: 'delete', PHASE_CREATE: 'create', PHASE_STYLE: 'style'}
+
+    # Create requests that accept a caller-provided objectId (assigned at staging time so
+    # later stages can reference the element before the plan is committed)
+    CREATE_REQUESTS = {'createImage', 'createShape', 'createLine', 'createTable', 'createSlide'}
+
+    def __init__(self, presentation_id, max_requests_per_batch=None, dry_run=False):
+        self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.presentation_id = presentation_id
+        self.max_requests_per_batch = max(1, int(max_requests_per_batch or SLIDES_MAX_REQUESTS_PER_BATCH))
+        self.dry_run = dry_run
+        # False once a dry run staged a request the snapshot could not model: the local
+        # replies of everything staged after it are no longer predictions of the real ones
+        self.replies_known = True
+        self.entries = []
+        self.batch_update_calls = 0
+        self.committed_requests = 0
+        self.failed_stages = {}  # stage -> error of the batchUpdate that rejected its requests
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def classify(cls, request):
+        """Return (kind, phase) for a single batchUpdate request"""
+        kind = next(iter(request), None)
+        body = request.get(kind) or {}
+        if kind == 'deleteObject':
+            return kind, cls.PHASE_DELETE
+        if kind in cls.CREATE_REQUESTS or kind in ('updateShapeProperties', 'updatePageProperties', 'updateImageProperties'):
+            return kind, cls.PHASE_CREATE
+        if kind == 'updateTextStyle' and (body.get('textRange') or {}).get('type', 'ALL') == 'ALL':
+            return kind, cls.PHASE_STYLE
+        return kind, cls.PHASE_TEXT
+
+    @classmethod
+    def assign_object_ids(cls, requests):
+        """Give create requests an explicit objectId so their replies are known before commit"""
+        for request in requests or []:
+            kind = next(iter(request), None)
+            body = request.get(kind)
+            if kind in cls.CREATE_REQUESTS and isinstance(body, dict) and not body.get('objectId'):
+                body['objectId'] = f"autoppt_{uuid.uuid4().hex[:20]}"
+        return requests
+
+    def add(self, requests, local_replies=None, stage=None):
+        """Stage requests (one batch from one caller) and return their plan entries.
+
+        Args:
+            requests: List of batchUpdate request dicts
+            local_replies: Replies computed by the snapshot for these requests, used to
+                           verify the real replies at commit time
+            stage: Optional label of the pipeline stage that produced the requests
+        """
+        added = []
+        for index, request in enumerate(requests or []):
+            kind, phase = self.classify(request)
+            entry = {
+                'seq': self._sequence,
+                'phase': phase,
+                'stage': stage or 'unspecified',
+                'kind': kind,
+                'request': request,
+                'local_reply': local_replies[index] if local_replies and index < len(local_replies) else None,
+                'predicted': self.replies_known and local_replies is not None,
+                'reply': None,
+                'error': None,
+            }
+            self._sequence += 1
+            self.entries.append(entry)
+            added.append(entry)
+        return added
+
+    def ordered_entries(self):
+        """Entries in commit order (by phase, then staging order)"""
+        return sorted(self.entries, key=lambda e: (e['phase'], e['seq']))
+
+    def batches(self):
+        """Split the ordered entries into batchUpdate-sized chunks"""
+        ordered = self.ordered_entries()
+        size = self.max_requests_per_batch
+        return [ordered[i:i + size] for i in range(0, len(ordered), size)]
+
+    def commit(self, execute):
+        """Send all staged requests.
+
+        Slides rejects a batchUpdate as a whole, so when a batch fails it is sent again stage
+        by stage: one bad request then only loses its own stage (as when every stage sent its
+        own batchUpdate). Rejected stages are recorded in failed_stages and their entries
+        get an 'error'.
+
+        Args:
+            execute: Callable(requests) -> batchUpdate response (performs the API call)
+
+        Returns:
+            True if every reply matched the locally predicted reply, False if the
+            snapshot should be considered diverged. Raises the API error only when no
+            request at all could be applied.
+        """
+        if not self.entries:
+            return True
+        in_sync = True
+        sent = 0
+        errors = []
+        for batch in self.batches():
+            try:
+                in_sync = self._send(execute, batch) and in_sync
+                sent += len(batch)
+                continue
+            except Exception as e:
+                in_sync = False
+                stages = list(dict.fromkeys(entry['stage'] for entry in batch))
+                if len(stages) == 1:
+                    self._reject(batch, e)
+                    errors.append(e)
+                    continue
+                self.logger.warning(f"⚠️ batchUpdate of {len(batch)} request(s) failed ({e}), retrying stage by stage")
+            for stage in stages:
+                entries = [entry for entry in batch if entry['stage'] == stage]
+                try:
+                    self._send(execute, entries)
+                    sent += len(entries)
+                except Exception as e:
+                    self._reject(entries, e)
+                    errors.append(e)
+        self.entries = []
+        if errors and not sent:
+            raise errors[0]
+        self.logger.info(
+            f"✅ Committed {self.committed_requests} request(s) in {self.batch_update_calls} batchUpdate call(s) "
+            f"for presentation {self.presentation_id}"
+        )
+        return in_sync
+
+    def _send(self, execute, entries):
+        """Send entries in one batchUpdate and record their replies (True if they match the predictions)"""
+        response = execute([entry['request'] for entry in entries]) or {}
+        self.batch_update_calls += 1
+        self.committed_requests += len(entries)
+        replies = response.get('replies') or []
+        in_sync = True
+        for index, entry in enumerate(entries):
+            entry['reply'] = replies[index] if index < len(replies) else {}
+            if entry['kind'] == 'replaceAllText' and entry['local_reply'] is not None:
+                expected = (entry['local_reply'].get('replaceAllText') or {}).get('occurrencesChanged', 0)
+                actual = (entry['reply'].get('replaceAllText') or {}).get('occurrencesChanged', 0)
+                if expected != actual:
+                    self.logger.warning(
+                        f"⚠️ replaceAllText '{entry['request']['replaceAllText'].get('containsText', {}).get('text')}' "
+                        f"changed {actual} occurrence(s), plan expected {expected}"
+                    )
+                    in_sync = False
+        return in_sync
+
+    def _reject(self, entries, error):
+        """Record that the API rejected these entries"""
+        for entry in entries:
+            entry['error'] = error
+            self.failed_stages[entry['stage']] = str(error)
+        self.logger.error(f"❌ {len(entries)} request(s) of stage '{entries[0]['stage']}' were rejected: {error}")
+
+    def summary(self):
+        """Counts per stage and phase for logging/results"""
+        stages = {}
+        phases = {}
+        for entry in self.entries:
+            stages[entry['stage']] = stages.get(entry['stage'], 0) + 1
+            phase_name = self.PHASE_NAMES[entry['phase']]
+            phases[phase_name] = phases.get(phase_name, 0) + 1
+        return {
+            'presentation_id': self.presentation_id,
+            'total_requests': len(self.entries),
+            'batch_update_calls': len(self.batches()),
+            'stages': stages,
+            'phases': phases,
+        }
+
+    def to_dict(self):
+        """Serializable plan (used for dry runs)"""
+        plan = self.summary()
+        plan['requests'] = [
+            {
+                'seq': entry['seq'],
+                'phase': self.PHASE_NAMES[entry['phase']],
+                'stage': entry['stage'],
+                'kind': entry['kind'],
+                'predicted': entry['predicted'],
+                'request': entry['request'],
+            }
+            for entry in self.ordered_entries()
+        ]
+        plan['unpredicted_requests'] = sum(1 for entry in self.entries if not entry['predicted'])
+        return plan
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
@@ -2,20 +2,21 @@
 AI Content Generator for PPT Automation
 Handles content generation using Google Gemini API
 """
-import google.generativeai as genai
 import json
 import re
 import os
 import sys
+import threading
 from typing import Optional
 from PIL import Image, ImageFilter, ImageEnhance, ImageOps
 from io import BytesIO
 import colorsys
 import numpy as np
 from collections import Counter
-from config import GEMINI_API_KEY, GEMINI_MODEL, GEMINI_IMAGE_MODEL, LOG_LEVEL, LOG_FILE, IMAGE_CROP_SETTINGS
+from config import GEMINI_API_KEY, GEMINI_MODEL, GEMINI_IMAGE_MODEL, GEMINI_CACHE_MODE, GEMINI_CACHE_MODES, LOG_LEVEL, LOG_FILE, IMAGE_CROP_SETTINGS
 from utils.logger import get_logger
-from utils.prompt_manager import prompt_manager
+from utils.prompt_manager import prompt_manager, CompiledPrompt
+from utils.gemini_client import gemini_client
 
 # ============================================================================
 # DETERMINISTIC EMOJI SELECTION SYSTEM
@@ -359,19 +360,141 @@ FALLBACK_EMOJIS = {
 }
 
 
+# Partial matching only applies to words and keywords longer than this
+PARTIAL_MATCH_MIN_LENGTH = 4
+
+
+class EmojiIndex:
+    """Inverted index over EMOJI_DATABASE, built once at import.
+
+    - keyword -> [(emoji, weight)] postings for exact matches
+    - substring (>= 4 chars) -> keywords containing it, for "word in keyword" partial matches;
+      "keyword in word" matches look up the word's substrings in the keyword postings
+    - category -> emoji set, plus the filtered candidate dicts per category list
+
+    Scoring a context touches only the postings of its words, instead of every
+    keyword of every candidate emoji.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.order = {emoji: position for position, emoji in enumerate(database)}
+        self.postings = {}
+        self.substrings = {}
+        self.categories = {}
+        self._candidates = {}
+        self._partial_matches = {}
+        self._lock = threading.Lock()
+
+        for emoji, data in database.items():
+            for keyword in data['keywords']:
+                # Duplicated keywords keep one posting each (they scored twice before, too)
+                self.postings.setdefault(keyword, []).append((emoji, data['weight']))
+            for category in data.get('categories', []):
+                self.categories.setdefault(category, set()).add(emoji)
+
+        long_keywords = [keyword for keyword in self.postings if len(keyword) >= PARTIAL_MATCH_MIN_LENGTH]
+        self.max_keyword_length = max((len(keyword) for keyword in long_keywords), default=0)
+        for keyword in long_keywords:
+            for start in range(len(keyword) - PARTIAL_MATCH_MIN_LENGTH + 1):
+                for end in range(start + PARTIAL_MATCH_MIN_LENGTH, len(keyword) + 1):
+                    self.substrings.setdefault(keyword[start:end], set()).add(keyword)
+
+    def partial_matches(self, word):
+        """Keywords that contain the word or are contained in it (memoized per word)"""
+        matches = self._partial_matches.get(word)
+        if matches is not None:
+            return matches
+        matches = set()
+        if len(word) >= PARTIAL_MATCH_MIN_LENGTH:
+            matches.update(self.substrings.get(word, ()))
+            for start in range(len(word) - PARTIAL_MATCH_MIN_LENGTH + 1):
+                for end in range(start + PARTIAL_MATCH_MIN_LENGTH, min(len(word), start + self.max_keyword_length) + 1):
+                    if word[start:end] in self.postings:
+                        matches.add(word[start:end])
+        matches = tuple(sorted(matches))
+        with self._lock:
+            self._partial_matches[word] = matches
+        return matches
+
+    def score(self, context_words):
+        """{emoji: score} for every emoji with at least one match.
+
+        Same scoring as ContentGenerator.calculate_emoji_score: 2 x weight per keyword present
+        in the context, 1 x weight per (keyword, word) partial match and a 0.5-per-match bonus
+        above 2 exact matches. Additions happen in the same order, so scores are identical.
+        """
+        exact = Counter()
+        for keyword in set(context_words):
+            for emoji, _ in self.postings.get(keyword, ()):
+                exact[emoji] += 1
+        partial = Counter()
+        for word, count in Counter(context_words).items():
+            for keyword in self.partial_matches(word):
+                for emoji, _ in self.postings[keyword]:
+                    partial[emoji] += count
+
+        scores = {}
+        for emoji in exact.keys() | partial.keys():
+            weight = self.database[emoji]['weight']
+            score = 0.0
+            for _ in range(exact[emoji]):
+                score += 2.0 * weight
+            for _ in range(partial[emoji]):
+                score += 1.0 * weight
+            if exact[emoji] > 2:
+                score += exact[emoji] * 0.5
+            scores[emoji] = score
+        return scores
+
+    def candidates(self, allowed_categories):
+        """EMOJI_DATABASE entries in any of the categories, in database order (shared, do not modify)"""
+        key = tuple(allowed_categories)
+        candidates = self._candidates.get(key)
+        if candidates is None:
+            emojis = set().union(*(self.categories.get(category, set()) for category in key))
+            candidates = {emoji: self.database[emoji] for emoji in sorted(emojis, key=self.order.get)}
+            with self._lock:
+                self._candidates[key] = candidates
+        return candidates
+
+    def rank(self, scores, candidates):
+        """Candidates ranked by score (highest first, ties in database order)"""
+        return sorted(
+            ((emoji, scores.get(emoji, 0.0)) for emoji in candidates),
+            key=lambda item: item[1], reverse=True
+        )
+
+
+EMOJI_INDEX = EmojiIndex(EMOJI_DATABASE)
+
+
+def _is_json_object(text):
+    """Response cache validator: the text (optionally in a ```json fence) is a JSON object"""
+    text = text.strip()
+    if text.startswith('```json'):
+        text = text[7:]
+    if text.endswith('```'):
+        text = text[:-3]
+    return isinstance(json.loads(text.strip()), dict)
+
+
 class ContentGenerator:
     def __init__(self):
         if not GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
-        genai.configure(api_key=GEMINI_API_KEY)
+        gemini_client.configure(GEMINI_API_KEY)
         self.model_name = GEMINI_MODEL
         self.image_model_name = GEMINI_IMAGE_MODEL
-        self.gemini_model = genai.GenerativeModel(self.model_name)
+        self.gemini_model = gemini_client.get_model(self.model_name)
         self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
         self.placeholder_colors = {}  # Store AI-detected colors for placeholders
         self.emoji_selection_log = []  # Track emoji selections for metrics
         self.emoji_cache = {}  # Cache emoji selections for performance
+        self._emoji_context_scores = {}  # EMOJI_INDEX scores per context (shared by logo placeholders)
+        self._token_usage_lock = threading.Lock()  # generate_content may run on worker threads
+        self.cache_mode = GEMINI_CACHE_MODE if GEMINI_CACHE_MODE in GEMINI_CACHE_MODES else 'off'
         self.reset_token_usage()
 
     # ============================================================================
@@ -386,6 +509,50 @@ class ContentGenerator:
             'total_tokens': 0
         }
         self._token_usage_details = []
+        self._cache_stats = {'hits': 0, 'misses': 0, 'tokens_saved': 0}
+        self._prompt_sizes = []
+
+    def reset_run_state(self):
+        """Reset everything a run accumulates (token usage, detected colors, emoji selections, cache mode)"""
+        self.placeholder_colors = {}
+        self.emoji_selection_log = []
+        self.emoji_cache = {}
+        self._emoji_context_scores = {}
+        self.cache_mode = GEMINI_CACHE_MODE if GEMINI_CACHE_MODE in GEMINI_CACHE_MODES else 'off'
+        self.reset_token_usage()
+
+    def set_cache_mode(self, cache_mode=None):
+        """Set the Gemini response cache mode for this run ('off', 'read', 'readwrite'; None = config default)"""
+        if not cache_mode:
+            cache_mode = GEMINI_CACHE_MODE if GEMINI_CACHE_MODE in GEMINI_CACHE_MODES else 'off'
+        cache_mode = cache_mode.strip().lower()
+        if cache_mode not in GEMINI_CACHE_MODES:
+            raise ValueError(f"Invalid cache mode '{cache_mode}'. Expected one of: {', '.join(GEMINI_CACHE_MODES)}")
+        self.cache_mode = cache_mode
+        return cache_mode
+
+    def _generate_text(self, prompt, generation_config=None, label=None, use_cache=True, validate=None):
+        """Text request through the shared Gemini client, using the response cache unless opted out.
+
+        validate(text) decides whether a response may be cached (see GeminiClient.generate).
+        """
+        cache_mode = self.cache_mode if use_cache else 'off'
+        response = gemini_client.generate(
+            self.model_name,
+            prompt,
+            generation_config=generation_config,
+            label=label,
+            cache_mode=cache_mode,
+            validate=validate,
+        )
+        if cache_mode != 'off':
+            with self._token_usage_lock:
+                if getattr(response, 'from_cache', False):
+                    self._cache_stats['hits'] += 1
+                    self._cache_stats['tokens_saved'] += getattr(response, 'saved_tokens', 0)
+                else:
+                    self._cache_stats['misses'] += 1
+        return response
 
     def _record_token_usage(self, response, label=None):
         """Record token usage from a Gemini response, if available."""
@@ -441,16 +608,22 @@ class ContentGenerator:
         if not any([prompt_tokens, candidates_tokens, total_tokens]):
             return
 
-        self._token_usage_summary['prompt_tokens'] += prompt_tokens
-        self._token_usage_summary['candidates_tokens'] += candidates_tokens
-        self._token_usage_summary['total_tokens'] += total_tokens
+        with self._token_usage_lock:
+            self._token_usage_summary['prompt_tokens'] += prompt_tokens
+            self._token_usage_summary['candidates_tokens'] += candidates_tokens
+            self._token_usage_summary['total_tokens'] += total_tokens
+
+            self._token_usage_details.append({
+                'label': label or 'unspecified',
+                'prompt_tokens': prompt_tokens,
+                'candidates_tokens': candidates_tokens,
+                'total_tokens': total_tokens
+            })
 
-        self._token_usage_details.append({
-            'label': label or 'unspecified',
-            'prompt_tokens': prompt_tokens,
-            'candidates_tokens': candidates_tokens,
-            'total_tokens': total_tokens
-        })
+    def record_prompt_size(self, stats):
+        """Record the estimated size of a compacted prompt (before/after tokens) for this run"""
+        with self._token_usage_lock:
+            self._prompt_sizes.append(dict(stats))
 
     def get_token_usage_summary(self):
         """Return the aggregated token usage for the current run."""
@@ -458,7 +631,9 @@ class ContentGenerator:
             'prompt_tokens': self._token_usage_summary['prompt_tokens'],
             'candidates_tokens': self._token_usage_summary['candidates_tokens'],
             'total_tokens': self._token_usage_summary['total_tokens'],
-            'details': list(self._token_usage_details)
+            'details': list(self._token_usage_details),
+            'cache': {'mode': self.cache_mode, **self._cache_stats},
+            'prompt_sizes': list(self._prompt_sizes)
         }
     
     # ============================================================================
@@ -503,6 +678,7 @@ class ContentGenerator:
     def calculate_emoji_score(self, context_words, emoji_data):
         """
         Calculate relevance score for an emoji based on keyword matches
+        (select_emoji_deterministic scores all emojis at once through EMOJI_INDEX)
         
         Args:
             context_words: list of preprocessed words from project context
@@ -514,9 +690,12 @@ class ContentGenerator:
         score = 0.0
         
         # 1. Exact keyword matches (highest score)
+        word_set = set(context_words)
+        match_count = 0
         for keyword in emoji_data['keywords']:
-            if keyword in context_words:
+            if keyword in word_set:
                 score += 2.0 * emoji_data['weight']
+                match_count += 1
         
         # 2. Partial keyword matches (medium score)
         for keyword in emoji_data['keywords']:
@@ -526,7 +705,6 @@ class ContentGenerator:
                         score += 1.0 * emoji_data['weight']
         
         # 3. Bonus for multiple matches (indicates strong relevance)
-        match_count = sum(1 for kw in emoji_data['keywords'] if kw in context_words)
         if match_count > 2:
             score += match_count * 0.5
         
@@ -541,7 +719,7 @@ class ContentGenerator:
             placeholder_name: e.g., 'logo_1', 'logo_2', etc.
             
         Returns:
-            dict: Filtered emoji database containing only relevant categories
+            dict: Filtered emoji database containing only relevant categories (shared, do not modify)
         """
         # 1. Get allowed categories for this placeholder
         allowed_categories = LOGO_CATEGORY_MAPPING.get(
@@ -558,17 +736,8 @@ class ContentGenerator:
                 placeholder_key = f'logo_{num}'
                 allowed_categories = LOGO_CATEGORY_MAPPING.get(placeholder_key, ['main_theme'])
         
-        # 2. Filter EMOJI_DATABASE to only include emojis with matching categories
-        filtered_emojis = {}
-        
-        for emoji, data in EMOJI_DATABASE.items():
-            # Check if ANY of the emoji's categories match allowed categories
-            emoji_categories = data.get('categories', [])
-            if any(cat in allowed_categories for cat in emoji_categories):
-                filtered_emojis[emoji] = data
-        
-        # 3. Return filtered dictionary
-        return filtered_emojis
+        # 2. Emojis with ANY matching category, from the precomputed category index
+        return EMOJI_INDEX.candidates(allowed_categories)
     
     def validate_emoji_input(self, project_name, project_description):
         """
@@ -653,15 +822,16 @@ class ContentGenerator:
             candidate_emojis = EMOJI_DATABASE
         
         # === STEP 3: Score All Candidate Emojis ===
-        emoji_scores = {}
-        
-        for emoji, emoji_data in candidate_emojis.items():
-            score = self.calculate_emoji_score(context_words, emoji_data)
-            emoji_scores[emoji] = score
+        # One index lookup per context word; logo placeholders sharing a context reuse the scores
+        context_key = tuple(context_words)
+        emoji_scores = self._emoji_context_scores.get(context_key)
+        if emoji_scores is None:
+            emoji_scores = EMOJI_INDEX.score(context_words)
+            self._emoji_context_scores[context_key] = emoji_scores
         
         # === STEP 4: Select Best Emoji ===
-        # Sort by score (highest first)
-        sorted_emojis = sorted(emoji_scores.items(), key=lambda x: x[1], reverse=True)
+        # Sort by score (highest first, ties in database order)
+        sorted_emojis = EMOJI_INDEX.rank(emoji_scores, candidate_emojis)
         
         # Log top 3 candidates
         self.logger.debug(f"Top 3 candidates for {placeholder_name}:")
@@ -743,13 +913,15 @@ class ContentGenerator:
             # Preserve unknown placeholders as-is (e.g., {Heading_1})
             return '{' + key + '}'
 
-    def _safe_format_template(self, template: str, variables: dict) -> str:
-        """Format a template with variables but keep unknown {placeholders} intact."""
+    def _safe_format_template(self, template, variables: dict) -> str:
+        """Format a template (str or CompiledPrompt) with variables but keep unknown {placeholders} intact."""
         try:
+            if isinstance(template, CompiledPrompt):
+                return template.render(variables)
             return template.format_map(self._DefaultFormatterDict(variables))
         except Exception as e:
             self.logger.warning(f"Safe format failed, returning template unformatted: {e}")
-            return template
+            return getattr(template, 'template', template)
     
     def get_placeholder_color(self, placeholder_type):
         """Get the color code detected for a placeholder from AI response"""
@@ -776,7 +948,8 @@ class ContentGenerator:
             company_name: Company name
             project_name: Project name
             project_description: Project description
-            **kwargs: Additional context (e.g., previous_headings, heading_content)
+            **kwargs: Additional context (e.g., previous_headings, heading_content);
+                      use_cache=False skips the Gemini response cache for this placeholder
         """
         
         # Skip empty or quote-only placeholders
@@ -784,33 +957,12 @@ class ContentGenerator:
             self.logger.warning(f"Skipping invalid placeholder: '{placeholder_type}'")
             return f"[Invalid placeholder: {placeholder_type}]"
         
-        # Load AI prompts from separated config file
+        # Look up the AI prompt in the prompt registry (exact key first, then normalized key)
         try:
-            with open('config/prompts_text.json', 'r', encoding='utf-8') as f:
-                text_prompts = json.load(f)
-            
-            # Try multiple variations to find the right prompt
-            snake = self._to_snake_case(placeholder_type)
-            variations = [
-                placeholder_type,  # original
-                placeholder_type.replace(' ', '_'),
-                placeholder_type.replace('-', '_'),
-                placeholder_type.lower(),
-                snake,
-                snake.title(),
-                snake.capitalize(),
-            ]
-            
-            prompt_key = None
-            prompt_template = None
-            for var in variations:
-                prompt_template = text_prompts.get('prompts', {}).get(var)
-                if prompt_template:
-                    prompt_key = var
-                    break
-            
-            if not prompt_template:
-                raise ValueError(f"No AI prompt found for {placeholder_type}. Tried variations: {variations}")
+            compiled_prompt = prompt_manager.find_prompt('text_prompts', placeholder_type)
+            if not compiled_prompt:
+                raise ValueError(f"No AI prompt found for {placeholder_type}")
+            prompt_key = compiled_prompt.key
             
             # Format the prompt with variables, preserving unknown placeholders
             variables = {
@@ -844,7 +996,7 @@ class ContentGenerator:
                 for heading_name, heading_content in kwargs['previous_headings'].items():
                     variables[heading_name] = heading_content
             
-            prompt = self._safe_format_template(prompt_template, variables)
+            prompt = self._safe_format_template(compiled_prompt, variables)
             self.logger.debug(f"Prompt key: '{prompt_key}' for placeholder '{placeholder_type}'")
             self.logger.debug(f"Formatted prompt (first 200 chars): {prompt[:200]}")
         except Exception as e:
@@ -852,7 +1004,7 @@ class ContentGenerator:
             prompt = f"Generate appropriate content for {placeholder_type} related to {project_name} by {company_name}" \
                      f". Context: {project_description or context}. Output only the required text."
         
-        # try:
+        try:
         #     # Determine appropriate token limit based on placeholder type
         #     max_tokens = 180  # default
         #     if placeholder_type == 'conclusion_para':
@@ -860,8 +1012,7 @@ class ContentGenerator:
         #     elif placeholder_type == 'our_process_desc':
         #         max_tokens = 300  # Also increase for process description
 
-            model = genai.GenerativeModel(self.model_name)
-            response = model.generate_content(
+            response = self._generate_text(
                 prompt,
                 generation_config={
                     'max_output_tokens': 180,
@@ -869,6 +1020,8 @@ class ContentGenerator:
                     'top_p': 0.9,
                     'top_k': 40,
                 },
+                label=f"text:{placeholder_type}",
+                use_cache=kwargs.get('use_cache', True),
             )
             self._record_token_usage(response, label=f"text:{placeholder_type}")
             
@@ -997,8 +1150,6 @@ class ContentGenerator:
     def _generate_theme_from_company_name(self, company_name, project_name=None):
         """Generate theme based on company name using prompt manager"""
         try:
-            model = genai.GenerativeModel(self.model_name)
-            
             # Get theme prompt from prompt manager
             prompt = prompt_manager.get_theme_prompt(
                 'company_theme',
@@ -1032,14 +1183,18 @@ Examples:
             for attempt in range(max_retries):
                 try:
                     self.logger.info(f"Theme generation API call attempt {attempt + 1}/{max_retries}")
-                    response = model.generate_content(
+                    response = self._generate_text(
                         prompt,
                         generation_config={
                             'max_output_tokens': 512,
                             'temperature': 0.3,
                             'top_p': 0.8,
                             'top_k': 20,
-                        }
+                        },
+                        label="theme_generation",
+                        # A retry must reach the model instead of re-reading the cached answer
+                        use_cache=attempt == 0,
+                        validate=_is_json_object,
                     )
                     self._record_token_usage(response, label="theme_generation")
                     
@@ -1103,12 +1258,16 @@ Examples:
                         continue  # Retry
                         
                 except Exception as e:
+                    if gemini_client.is_rate_limit(e):
+                        # Rate limit / quota errors were already retried with backoff by the Gemini client
+                        self.logger.warning(f"Theme generation rate limited: {e}")
+                        raise
                     self.logger.warning(f"Theme generation attempt {attempt + 1} failed: {e}")
                     if attempt == max_retries - 1:
-                        raise e
+                        raise
                     # Wait before retry
-                    import time
-                    time.sleep(2 ** attempt)  # Exponential backoff
+                    gemini_client.wait_before_retry(attempt)
+                    continue
             
             # Clean the response text
             response_text = response_text.strip()
@@ -1464,15 +1623,16 @@ Examples:
 Return ONLY valid JSON with all the above keys. No explanations, no markdown formatting, just the JSON object.
 """
             
-            model = genai.GenerativeModel(self.model_name)
-            response = model.generate_content(
+            response = self._generate_text(
                 comprehensive_prompt,
                 generation_config={
                     'max_output_tokens': 2048,
                     'temperature': 0.7,
                     'top_p': 0.9,
                     'top_k': 40,
-                }
+                },
+                label="comprehensive_generation",
+                validate=_is_json_object,
             )
             
             usage_stats = self._record_token_usage(response, label="comprehensive_generation")
@@ -2064,9 +2224,8 @@ Return ONLY valid JSON with all the above keys. No explanations, no markdown for
             
             # Use Gemini's image generation model
             try:
-                model = genai.GenerativeModel(self.image_model_name)
-
                 # Retry generation a few times – Gemini can occasionally return empty inline_data
+                # (API errors are retried with backoff inside the Gemini client)
                 max_retries = 3
                 image_parts = []
                 last_error = None
@@ -2076,16 +2235,16 @@ Return ONLY valid JSON with all the above keys. No explanations, no markdown for
                             self.logger.info(f"Using reference image: {reference_image_path} (attempt {attempt+1}/{max_retries})")
                             with open(reference_image_path, 'rb') as ref_file:
                                 reference_image_data = ref_file.read()
-                            response = model.generate_content([
+                            response = gemini_client.generate(self.image_model_name, [
                                 {
                                     "mime_type": "image/jpeg",
                                     "data": reference_image_data
                                 },
                                 base_prompt
-                            ])
+                            ], label=f"image:{placeholder_type}")
                         else:
                             self.logger.info(f"Generating image (attempt {attempt+1}/{max_retries})")
-                            response = model.generate_content(base_prompt)
+                            response = gemini_client.generate(self.image_model_name, base_prompt, label=f"image:{placeholder_type}")
 
                         self._record_token_usage(response, label=f"image:{placeholder_type}")
 
@@ -2103,8 +2262,8 @@ Return ONLY valid JSON with all the above keys. No explanations, no markdown for
                         last_error = e
                         self.logger.warning(f"Gemini image generation attempt {attempt+1} failed: {e}")
                     # backoff
-                    import time
-                    time.sleep(1.5 * (attempt + 1))
+                    if attempt < max_retries - 1:
+                        gemini_client.wait_before_retry(attempt)
                 
                 if image_parts:
                     image_data = image_parts[0]
@@ -2373,13 +2532,9 @@ Return ONLY valid JSON with all the above keys. No explanations, no markdown for
 
     def _create_image_prompt(self, placeholder_type, context, company_name, project_name, project_description, requirements, theme=None, reference_image_path=None):
         """Create image generation prompt using AI prompts with exact dimensions"""
-        # Load AI prompts from JSON file
+        # Look up the AI image prompt in the prompt registry
         try:
-            with open('config/prompts_image.json', 'r', encoding='utf-8') as f:
-                image_prompts = json.load(f)
-            
-            # Get prompt for this placeholder type from prompts section
-            prompt_template = image_prompts.get('prompts', {}).get(placeholder_type)
+            prompt_template = prompt_manager.find_prompt('image_prompts', placeholder_type)
             if not prompt_template:
                 raise ValueError(f"No AI image prompt found for {placeholder_type}")
             
@@ -2389,15 +2544,15 @@ Return ONLY valid JSON with all the above keys. No explanations, no markdown for
             unit = requirements.get('placeholder_unit', 'PT')
             
             # Format the prompt with variables including exact dimensions
-            prompt = prompt_template.format(
-                project_name=project_name or f"{context} Project",
-                company_name=company_name or context,
-                context=context,
-                project_description=project_description or "",
-                placeholder_width=width,
-                placeholder_height=height,
-                placeholder_unit=unit
-            )
+            prompt = prompt_template.render({
+                'project_name': project_name or f"{context} Project",
+                'company_name': company_name or context,
+                'context': context,
+                'project_description': project_description or "",
+                'placeholder_width': width,
+                'placeholder_height': height,
+                'placeholder_unit': unit
+            }, keep_unknown=False)
             
             # Special handling for backgroundImage with reference image
             # When reference_image_path is provided, instruct Gemini to use it as the basis
@@ -2551,9 +2706,10 @@ Return ONLY valid JSON with all the above keys. No explanations, no markdown for
             }
             
             # Call Gemini API
-            response = self.gemini_model.generate_content(
-                request['contents'][0]['parts'][0]['text'],
-                request['contents'][0]['parts'][1]
+            response = gemini_client.generate(
+                self.model_name,
+                [request['contents'][0]['parts'][0]['text'], request['contents'][0]['parts'][1]],
+                label="image_enhancement",
             )
             self._record_token_usage(response, label="image_enhancement")
             
@@ -0,0 +1,391 @@
+"""
+In-memory Presentation Snapshot for PPT Automation
+Keeps a local copy of a presentation and replays our batchUpdate requests on it
+"""
+import copy
+import re
+import threading
+from config import LOG_LEVEL, LOG_FILE
+from utils.logger import get_logger
+
+
+class PresentationSnapshot:
+    """Local copy of a Slides presentation document kept in sync with our own writes.
+
+    The document is fetched once by SlidesClient. Every batchUpdate sent through the
+    client is replayed here (together with the API replies), so later reads can be
+    served without downloading the deck again. Whenever the local result cannot be
+    trusted - an unsupported request type, a missing object, or an API reply that
+    disagrees with the local outcome (e.g. replaceAllText occurrence counts) - the
+    snapshot marks itself stale and the client re-fetches on the next read.
+
+    Note: sizes/transforms of locally created images keep the units they were sent
+    with (usually PT) instead of the EMU values the API would return.
+    """
+
+    # Requests that only touch bullets/paragraph formatting - nothing our readers look at
+    CONTENT_NEUTRAL_REQUESTS = {
+        'createParagraphBullets',
+        'deleteParagraphBullets',
+        'updateParagraphStyle',
+    }
+
+    def __init__(self, presentation_id, document):
+        self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.presentation_id = presentation_id
+        self.document = document
+        self.stale = False
+        self.stale_reason = None
+        self.revision = 0  # Number of batchUpdates applied locally since the fetch
+        self.lock = threading.RLock()
+
+    def invalidate(self, reason):
+        """Mark the snapshot as out of sync so the next read triggers a full fetch"""
+        with self.lock:
+            if not self.stale:
+                self.logger.info(f"♻️ Presentation snapshot {self.presentation_id} invalidated: {reason}")
+            self.stale = True
+            self.stale_reason = reason
+
+    def apply(self, requests, response=None):
+        """Apply a batchUpdate (requests + API response) to the local document.
+
+        Args:
+            requests: The list of request dicts that were (or will be) sent
+            response: The batchUpdate response. Its replies are used for divergence checks
+                      and for the object IDs of created elements. Pass None to apply
+                      requests that have not been sent yet (deferred mutation plans).
+
+        Returns:
+            List of locally computed replies (same shape as the API replies) if the
+            snapshot is still in sync, None if it was invalidated
+        """
+        replies = (response or {}).get('replies') or []
+        local_replies = []
+        with self.lock:
+            if self.stale:
+                return None
+            for index, request in enumerate(requests or []):
+                kind = next(iter(request), None)
+                if kind in self.CONTENT_NEUTRAL_REQUESTS:
+                    local_replies.append({})
+                    continue
+                handler = self._HANDLERS.get(kind)
+                if handler is None:
+                    self.invalidate(f"unsupported request type '{kind}'")
+                    return None
+                reply = replies[index] if index < len(replies) else {}
+                try:
+                    local_reply = handler(self, request.get(kind) or {}, reply or {})
+                except Exception as e:
+                    self.logger.debug(f"Could not apply {kind} locally: {e}")
+                    local_reply = None
+                if local_reply is None:
+                    self.invalidate(f"divergence while applying {kind}")
+                    return None
+                local_replies.append(local_reply)
+            self.revision += 1
+            return local_replies
+
+    # ------------------------------------------------------------------
+    # Document lookups
+    # ------------------------------------------------------------------
+
+    def _walk_elements(self, page_elements):
+        """Yield page elements, descending into element groups"""
+        for element in page_elements or []:
+            yield element
+            group = element.get('elementGroup')
+            if group:
+                yield from self._walk_elements(group.get('children', []))
+
+    def _iter_text_bodies(self, page_object_ids=None):
+        """Yield every text body (shape text and table cell text) on the slides"""
+        for slide in self.document.get('slides', []):
+            if page_object_ids and slide.get('objectId') not in page_object_ids:
+                continue
+            for element in self._walk_elements(slide.get('pageElements', [])):
+                shape = element.get('shape')
+                if shape and shape.get('text'):
+                    yield shape['text']
+                table = element.get('table')
+                if table:
+                    for row in table.get('tableRows', []):
+                        for cell in row.get('tableCells', []):
+                            if cell.get('text'):
+                                yield cell['text']
+
+    def _find_slide(self, object_id):
+        for slide in self.document.get('slides', []):
+            if slide.get('objectId') == object_id:
+                return slide
+        return None
+
+    def _find_element(self, object_id):
+        for slide in self.document.get('slides', []):
+            for element in self._walk_elements(slide.get('pageElements', [])):
+                if element.get('objectId') == object_id:
+                    return element
+        return None
+
+    def _find_text(self, object_id, cell_location=None):
+        """Return the text body addressed by an objectId (+ optional table cellLocation)"""
+        element = self._find_element(object_id)
+        if not element:
+            return None
+        if cell_location and 'table' in element:
+            rows = element['table'].get('tableRows', [])
+            cell = rows[cell_location.get('rowIndex', 0)]['tableCells'][cell_location.get('columnIndex', 0)]
+            return cell.setdefault('text', {'textElements': []})
+        if 'shape' not in element:
+            return None
+        return element['shape'].setdefault('text', {'textElements': []})
+
+    def _remove_element(self, page_elements, object_id):
+        for index, element in enumerate(page_elements):
+            if element.get('objectId') == object_id:
+                del page_elements[index]
+                return True
+            group = element.get('elementGroup')
+            if group and self._remove_element(group.get('children', []), object_id):
+                return True
+        return False
+
+    # ------------------------------------------------------------------
+    # Text helpers - a text body is handled as a flat list of run segments
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _flatten(text):
+        """Split textElements into (run segments, paragraph markers)"""
+        segments = []
+        markers = []
+        for te in text.get('textElements', []):
+            if 'paragraphMarker' in te:
+                markers.append(te['paragraphMarker'])
+            elif 'textRun' in te:
+                run = te['textRun']
+                segments.append({'content': run.get('content', ''), 'style': run.get('style', {}), 'autoText': None})
+            elif 'autoText' in te:
+                auto = te['autoText']
+                segments.append({'content': auto.get('content', ''), 'style': auto.get('style', {}), 'autoText': auto})
+        return segments, markers
+
+    @staticmethod
+    def _rebuild(text, segments, markers):
+        """Write run segments back as textElements with recomputed indices and paragraphs"""
+        paragraphs = [[]]
+        for seg in segments:
+            if not seg['content']:
+                continue
+            if seg['autoText'] is not None:
+                paragraphs[-1].append(seg)
+                continue
+            for piece in re.findall(r'[^\n]*\n|[^\n]+', seg['content']):
+                paragraphs[-1].append(dict(seg, content=piece))
+                if piece.endswith('\n'):
+                    paragraphs.append([])
+        if not paragraphs[-1]:
+            paragraphs.pop()
+
+        elements = []
+        index = 0
+        for number, paragraph in enumerate(paragraphs):
+            length = sum(len(seg['content']) for seg in paragraph)
+            marker = dict(markers[min(number, len(markers) - 1)]) if markers else {}
+            elements.append({'startIndex': index, 'endIndex': index + length, 'paragraphMarker': marker})
+            for seg in paragraph:
+                end = index + len(seg['content'])
+                if seg['autoText'] is not None:
+                    auto = dict(seg['autoText'], content=seg['content'], style=seg['style'])
+                    elements.append({'startIndex': index, 'endIndex': end, 'autoText': auto})
+                else:
+                    elements.append({
+                        'startIndex': index,
+                        'endIndex': end,
+                        'textRun': {'content': seg['content'], 'style': seg['style']}
+                    })
+                index = end
+        text['textElements'] = elements
+
+    @staticmethod
+    def _split_segments(segments, index):
+        """Split a segment list at a character index into (left, right)"""
+        left, right = [], []
+        position = 0
+        for seg in segments:
+            length = len(seg['content'])
+            if position + length <= index:
+                left.append(seg)
+            elif position >= index:
+                right.append(seg)
+            else:
+                cut = index - position
+                left.append(dict(seg, content=seg['content'][:cut], autoText=None))
+                right.append(dict(seg, content=seg['content'][cut:], autoText=None))
+            position += length
+        return left, right
+
+    def _splice(self, segments, start, end, new_text):
+        """Replace characters [start, end) with new_text, inheriting the style found at start"""
+        left, rest = self._split_segments(segments, start)
+        middle, right = self._split_segments(rest, end - start)
+        if middle:
+            style = middle[0]['style']
+        elif left:
+            style = left[-1]['style']
+        elif right:
+            style = right[0]['style']
+        else:
+            style = {}
+        inserted = [{'content': new_text, 'style': dict(style), 'autoText': None}] if new_text else []
+        return left + inserted + right
+
+    @staticmethod
+    def _resolve_range(text_range, length):
+        """Translate a Slides Range into (start, end) character offsets"""
+        range_type = (text_range or {}).get('type', 'ALL')
+        if range_type == 'FIXED_RANGE':
+            return text_range.get('startIndex', 0), text_range.get('endIndex', length)
+        if range_type == 'FROM_START_INDEX':
+            return text_range.get('startIndex', 0), length
+        return 0, length
+
+    @staticmethod
+    def _merge_fields(current, update, fields):
+        """Return current updated with the top-level keys named by a field mask"""
+        if fields == '*':
+            return copy.deepcopy(update)
+        merged = dict(current or {})
+        for field in (fields or '').split(','):
+            key = field.strip().split('.')[0]
+            if not key:
+                continue
+            if key in update:
+                merged[key] = copy.deepcopy(update[key])
+            else:
+                merged.pop(key, None)
+        return merged
+
+    # ------------------------------------------------------------------
+    # Request handlers - each returns the local reply, or None on divergence
+    # ------------------------------------------------------------------
+
+    def _apply_replace_all_text(self, body, reply):
+        contains = body.get('containsText') or {}
+        needle = contains.get('text')
+        if not needle:
+            return None
+        flags = 0 if contains.get('matchCase', False) else re.IGNORECASE
+        pattern = re.compile(re.escape(needle), flags)
+        replacement = body.get('replaceText', '')
+
+        occurrences = 0
+        for text in self._iter_text_bodies(body.get('pageObjectIds')):
+            segments, markers = self._flatten(text)
+            matches = list(pattern.finditer(''.join(seg['content'] for seg in segments)))
+            if not matches:
+                continue
+            # Replace right-to-left so earlier offsets stay valid
+            for match in reversed(matches):
+                segments = self._splice(segments, match.start(), match.end(), replacement)
+            self._rebuild(text, segments, markers)
+            occurrences += len(matches)
+
+        if 'replaceAllText' in reply:
+            expected = reply['replaceAllText'].get('occurrencesChanged', 0)
+            if expected != occurrences:
+                self.logger.debug(
+                    f"replaceAllText '{needle}': API changed {expected}, snapshot changed {occurrences}"
+                )
+                return None
+        return {'replaceAllText': {'occurrencesChanged': occurrences}}
+
+    def _apply_delete_object(self, body, reply):
+        object_id = body.get('objectId')
+        slides = self.document.get('slides', [])
+        for index, slide in enumerate(slides):
+            if slide.get('objectId') == object_id:
+                del slides[index]
+                return {}
+        for slide in slides:
+            if self._remove_element(slide.get('pageElements', []), object_id):
+                return {}
+        return None
+
+    def _apply_create_image(self, body, reply):
+        object_id = (reply.get('createImage') or {}).get('objectId') or body.get('objectId')
+        props = body.get('elementProperties') or {}
+        slide = self._find_slide(props.get('pageObjectId'))
+        if not object_id or slide is None:
+            return None
+        element = {'objectId': object_id, 'image': {'contentUrl': body.get('url'), 'sourceUrl': body.get('url')}}
+        if props.get('size'):
+            element['size'] = copy.deepcopy(props['size'])
+        if props.get('transform'):
+            element['transform'] = copy.deepcopy(props['transform'])
+        slide.setdefault('pageElements', []).append(element)
+        return {'createImage': {'objectId': object_id}}
+
+    def _apply_update_text_style(self, body, reply):
+        text = self._find_text(body.get('objectId'), body.get('cellLocation'))
+        if text is None:
+            return None
+        segments, markers = self._flatten(text)
+        length = sum(len(seg['content']) for seg in segments)
+        start, end = self._resolve_range(body.get('textRange'), length)
+        left, rest = self._split_segments(segments, start)
+        middle, right = self._split_segments(rest, end - start)
+        for seg in middle:
+            seg['style'] = self._merge_fields(seg['style'], body.get('style') or {}, body.get('fields'))
+        self._rebuild(text, left + middle + right, markers)
+        return {}
+
+    def _apply_delete_text(self, body, reply):
+        text = self._find_text(body.get('objectId'), body.get('cellLocation'))
+        if text is None:
+            return None
+        segments, markers = self._flatten(text)
+        length = sum(len(seg['content']) for seg in segments)
+        start, end = self._resolve_range(body.get('textRange'), length)
+        self._rebuild(text, self._splice(segments, start, end, ''), markers)
+        return {}
+
+    def _apply_insert_text(self, body, reply):
+        text = self._find_text(body.get('objectId'), body.get('cellLocation'))
+        if text is None:
+            return None
+        segments, markers = self._flatten(text)
+        index = body.get('insertionIndex', 0)
+        self._rebuild(text, self._splice(segments, index, index, body.get('text', '')), markers)
+        return {}
+
+    def _apply_update_shape_properties(self, body, reply):
+        element = self._find_element(body.get('objectId'))
+        if not element or 'shape' not in element:
+            return None
+        shape = element['shape']
+        shape['shapeProperties'] = self._merge_fields(
+            shape.get('shapeProperties'), body.get('shapeProperties') or {}, body.get('fields')
+        )
+        return {}
+
+    def _apply_update_page_properties(self, body, reply):
+        slide = self._find_slide(body.get('objectId'))
+        if slide is None:
+            return None
+        slide['pageProperties'] = self._merge_fields(
+            slide.get('pageProperties'), body.get('pageProperties') or {}, body.get('fields')
+        )
+        return {}
+
+    _HANDLERS = {
+        'replaceAllText': _apply_replace_all_text,
+        'deleteObject': _apply_delete_object,
+        'createImage': _apply_create_image,
+        'updateTextStyle': _apply_update_text_style,
+        'deleteText': _apply_delete_text,
+        'insertText': _apply_insert_text,
+        'updateShapeProperties': _apply_update_shape_properties,
+        'updatePageProperties': _apply_update_page_properties,
+    }
@@ -2,18 +2,29 @@
 Google Slides API Client for PPT Automation
 Handles all interactions with Google Slides API
 """
-from google.oauth2 import service_account
-from google.oauth2.credentials import Credentials as UserCredentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaIoBaseUpload
+from io import BytesIO
 import os
 import re
-from config import AUTH_MODE, GOOGLE_CREDENTIALS_FILE, GOOGLE_OAUTH_CLIENT_FILE, GOOGLE_TOKEN_FILE, GOOGLE_SCOPES, LOG_LEVEL, LOG_FILE
+import threading
+from collections import OrderedDict
+from config import AUTH_MODE, DRIVE_UPLOAD_DEDUP, SLIDES_SNAPSHOT_MAX_ENTRIES, SLIDES_WRITE_RATE_LIMIT_RPM, LOG_LEVEL, LOG_FILE
 import copy
 from utils.logger import get_logger
+from utils.drive_upload_index import drive_upload_index, content_hash
+from utils.google_services import get_credentials, get_service
+from utils.rate_limiter import get_rate_limiter
+from core.presentation_snapshot import PresentationSnapshot
+from core.deck_mutation_plan import DeckMutationPlan
+
+
+# 'Uploads' folder ID per Drive account, shared by every SlidesClient in the process
+_uploads_folder_ids = {}
+_uploads_folder_lock = threading.Lock()
+
+# Drive allows at most 100 calls in one HTTP batch request
+DRIVE_BATCH_LIMIT = 100
 
 
 class SlidesClient:
@@ -22,6 +33,19 @@ class SlidesClient:
         self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
         self.service = None
         self.drive_service = None
+        # presentation_id -> PresentationSnapshot (served by get_presentation), least recently used first
+        self._snapshots = OrderedDict()
+        # presentation_id -> DeckMutationPlan (batchUpdates are deferred while a plan is open)
+        self._plans = {}
+        self._uploads_folder_id = None
+        # Uploaded files waiting for make_files_public (file_id -> (content hash, public_url, size))
+        self._pending_public = {}
+        self._public_file_ids = set()
+        self._upload_lock = threading.Lock()
+        # Drive services of this client's upload threads (one HTTP connection per thread)
+        self._thread_services = threading.local()
+        # Copied presentation_id -> template revision {'file_id', 'version', 'modifiedTime', 'title'}, until the copy is edited
+        self._copy_sources = {}
         self._authenticate()
     
     def _extract_file_id(self, template_presentation_id_or_url):
@@ -67,9 +91,9 @@ class SlidesClient:
 
             # Verify the file exists and we have access before attempting to copy
             try:
-                _ = self.drive_service.files().get(
+                template_file = self.drive_service.files().get(
                     fileId=file_id,
-                    fields='id, name, mimeType',
+                    fields='id, name, mimeType, version, modifiedTime',
                     supportsAllDrives=True
                 ).execute()
             except HttpError as e:
@@ -92,6 +116,12 @@ class SlidesClient:
             new_id = copied.get('id')
             if new_id:
                 self.logger.info(f"Copied presentation {template_presentation_id} -> {new_id}")
+                self._copy_sources[new_id] = {
+                    'file_id': file_id,
+                    'version': template_file.get('version'),
+                    'modifiedTime': template_file.get('modifiedTime'),
+                    'title': copied.get('name') or new_title,  # The copy's own title (Drive name)
+                }
                 return new_id
             else:
                 self.logger.error("Drive copy returned no ID")
@@ -101,32 +131,13 @@ class SlidesClient:
             return None
 
     def _authenticate(self):
-        """Authenticate with Google Slides API"""
+        """Authenticate with Google Slides API (credentials and discovery clients are shared process-wide)"""
         try:
-            if AUTH_MODE == 'oauth':
-                creds = None
-                if os.path.exists(GOOGLE_TOKEN_FILE):
-                    creds = UserCredentials.from_authorized_user_file(GOOGLE_TOKEN_FILE, GOOGLE_SCOPES)
-                if not creds or not creds.valid:
-                    if creds and creds.expired and creds.refresh_token:
-                        creds.refresh(Request())
-                    else:
-                        if not os.path.exists(GOOGLE_OAUTH_CLIENT_FILE):
-                            raise FileNotFoundError(f"Missing OAuth client file at: {GOOGLE_OAUTH_CLIENT_FILE}")
-                        flow = InstalledAppFlow.from_client_secrets_file(GOOGLE_OAUTH_CLIENT_FILE, GOOGLE_SCOPES)
-                        creds = flow.run_local_server(port=0)
-                    with open(GOOGLE_TOKEN_FILE, 'w') as token:
-                        token.write(creds.to_json())
-                credentials = creds
-            else:
-                credentials = service_account.Credentials.from_service_account_file(
-                    GOOGLE_CREDENTIALS_FILE,
-                    scopes=GOOGLE_SCOPES
-                )
+            credentials = get_credentials()
             # Store credentials for reuse by other Google APIs (e.g., Sheets)
             self._credentials = credentials
-            self.service = build('slides', 'v1', credentials=credentials)
-            self.drive_service = build('drive', 'v3', credentials=credentials)
+            self.service = get_service('slides', 'v1', credentials)
+            self.drive_service = get_service('drive', 'v3', credentials)
             self.logger.info("Successfully authenticated with Google Slides and Drive API")
         except Exception as e:
             self.logger.error(f"Authentication failed: {e}")
@@ -134,20 +145,215 @@ class SlidesClient:
     def get_credentials(self):
         """Get the authenticated credentials for use with other Google APIs"""
         return self._credentials if hasattr(self, '_credentials') else None
-    def get_presentation(self, presentation_id):
-        """Get presentation details"""
+
+    def _thread_drive_service(self):
+        """Drive service for the calling thread (httplib2 connections are not thread-safe)"""
+        service = getattr(self._thread_services, 'drive', None)
+        if service is None:
+            service = get_service('drive', 'v3', self._credentials)
+            self._thread_services.drive = service
+        return service
+    def get_presentation(self, presentation_id, refresh=False):
+        """Get presentation details
+        
+        Served from the in-memory PresentationSnapshot when one is available and in sync;
+        the presentation is only downloaded on first access, after the snapshot was
+        invalidated, or when refresh=True. Returns a copy, so callers may modify it.
+        """
+        document = self._snapshot_document(presentation_id, refresh)
+        return copy.deepcopy(document) if document is not None else None
+
+    def _snapshot_document(self, presentation_id, refresh=False):
+        """The snapshot's live document (as get_presentation, without the copy).
+
+        Only for readers inside this client: replays and reply predictions are computed
+        from this dict, so it must never be modified outside PresentationSnapshot.
+        """
+        snapshot = self._snapshots.get(presentation_id)
+        if snapshot and not snapshot.stale and not refresh:
+            self._snapshots.move_to_end(presentation_id)
+            self.logger.debug(f"📸 Serving presentation {presentation_id} from snapshot (revision {snapshot.revision})")
+            return snapshot.document
+        # Requests staged in an open mutation plan must land before the deck is re-read
+        plan = self._plans.get(presentation_id)
+        if plan is not None and len(plan) and not plan.dry_run:
+            try:
+                self._send_plan(plan)
+            except Exception as e:
+                self.logger.error(f"Error flushing mutation plan before reloading presentation: {e}")
         try:
             presentation = self.service.presentations().get(
                 presentationId=presentation_id
             ).execute()
+            self._snapshots[presentation_id] = PresentationSnapshot(presentation_id, presentation)
+            self._snapshots.move_to_end(presentation_id)
+            # Drop the least recently used snapshots, but never one an open plan is staged on
+            evictable = [key for key in self._snapshots if key not in self._plans and key != presentation_id]
+            for key in evictable[:max(0, len(self._snapshots) - max(1, SLIDES_SNAPSHOT_MAX_ENTRIES))]:
+                del self._snapshots[key]
             return presentation
         except HttpError as e:
             self.logger.error(f"Error getting presentation: {e}")
             return None
+
+    def invalidate_snapshot(self, presentation_id):
+        """Drop the cached snapshot so the next get_presentation re-fetches the deck"""
+        self._snapshots.pop(presentation_id, None)
+
+    def reset_run_state(self):
+        """Forget per-run state (snapshots, open plans, pending uploads) so the client can be reused"""
+        if self._plans:
+            self.logger.warning(f"Discarding {len(self._plans)} uncommitted mutation plan(s)")
+        self._plans.clear()
+        self._snapshots.clear()
+        self._copy_sources.clear()
+        with self._upload_lock:
+            self._pending_public.clear()
+            self._public_file_ids.clear()
+
+    def copy_source(self, presentation_id):
+        """Template revision a presentation was copied from, while the copy is still unedited (else None).
+
+        Drive copies keep the template's slide and element object IDs, so anything derived
+        from that template revision also describes the copy.
+        """
+        return self._copy_sources.get(presentation_id)
+
+    def begin_mutation_plan(self, presentation_id, max_requests_per_batch=None, dry_run=False):
+        """Start deferring batchUpdates for a presentation into a DeckMutationPlan.
+        
+        Until commit_mutation_plan is called, every batchUpdate issued through this client
+        for presentation_id is applied to the local snapshot and staged instead of sent.
+        With dry_run=True nothing is sent even when the snapshot cannot model a request
+        (those requests are staged with unknown replies). Returns the plan, or None if the
+        presentation could not be loaded (requests are then sent immediately as before).
+        """
+        if not self._snapshot_document(presentation_id):
+            self.logger.warning("Could not load presentation - batchUpdates will be sent immediately")
+            return None
+        plan = DeckMutationPlan(presentation_id, max_requests_per_batch, dry_run=dry_run)
+        self._plans[presentation_id] = plan
+        self.logger.info(f"🗂️ Deferring batchUpdates for presentation {presentation_id} into a mutation plan")
+        return plan
+
+    def commit_mutation_plan(self, presentation_id, dry_run=False):
+        """Send all staged requests of the open plan and close it.
+        
+        Args:
+            presentation_id: The presentation ID
+            dry_run: If True (or the plan was opened as a dry run), the staged requests are
+                     not sent; the full ordered plan is returned instead
+        
+        Returns:
+            dict summary of the plan (with 'requests' for dry runs), or None if no plan was open.
+            'committed' is False only if nothing could be applied; stages whose requests
+            were rejected are listed in 'failed_stages'.
+        """
+        plan = self._plans.pop(presentation_id, None)
+        if plan is None:
+            return None
+        if dry_run or plan.dry_run:
+            result = plan.to_dict()
+            result.update({'dry_run': True, 'committed': False})
+            # Staged requests only exist in the local snapshot
+            self.invalidate_snapshot(presentation_id)
+            self.logger.info(f"🧪 Dry run: {result['total_requests']} request(s) planned in {result['batch_update_calls']} batchUpdate call(s), not sent")
+            return result
+        result = plan.summary()
+        result['dry_run'] = False
+        try:
+            self._send_plan(plan)
+            result['committed'] = True
+        except Exception as e:
+            self.logger.error(f"Error committing mutation plan: {e}")
+            result['committed'] = False
+            result['error'] = str(e)
+        if plan.failed_stages:
+            result['failed_stages'] = dict(plan.failed_stages)
+        result['batch_update_calls'] = plan.batch_update_calls
+        # The run is done with this deck; don't keep its document in memory
+        self.invalidate_snapshot(presentation_id)
+        return result
+
+    def _send_batch_update(self, presentation_id, requests):
+        """batchUpdate paced by the process-wide Slides write limiter (shared by all jobs and batch rows)"""
+        get_rate_limiter('slides.batchUpdate', SLIDES_WRITE_RATE_LIMIT_RPM).acquire()
+        return self.service.presentations().batchUpdate(
+            presentationId=presentation_id,
+            body={'requests': requests}
+        ).execute()
+
+    def _send_plan(self, plan):
+        """Send a plan's staged requests.
+
+        Raises (after invalidating the snapshot) only if none of them could be applied;
+        rejected stages are recorded on the plan.
+        """
+        if not len(plan):
+            return
+        presentation_id = plan.presentation_id
+        try:
+            in_sync = plan.commit(lambda requests: self._send_batch_update(presentation_id, requests))
+        except Exception:
+            # Drop the staged requests: the failing batch was rejected as a whole
+            plan.entries = []
+            self.invalidate_snapshot(presentation_id)
+            raise
+        if not in_sync:
+            snapshot = self._snapshots.get(presentation_id)
+            if snapshot:
+                snapshot.invalidate("mutation plan replies differ from local prediction")
+
+    def _execute_batch_update(self, presentation_id, requests, stage=None):
+        """Send a batchUpdate and replay it on the presentation snapshot.
+        
+        While a mutation plan is open for the presentation, the requests are applied to the
+        snapshot and staged instead, and locally computed replies are returned.
+        Raises the underlying API error (after invalidating the snapshot) so callers keep
+        their existing error handling.
+        """
+        # The deck no longer matches the template it was copied from
+        self._copy_sources.pop(presentation_id, None)
+        plan = self._plans.get(presentation_id)
+        if plan is not None:
+            DeckMutationPlan.assign_object_ids(requests)
+            snapshot = self._snapshots.get(presentation_id)
+            if snapshot is None or snapshot.stale:
+                self._snapshot_document(presentation_id)
+                snapshot = self._snapshots.get(presentation_id)
+            local_replies = snapshot.apply(requests) if snapshot else None
+            if local_replies is not None:
+                plan.add(requests, local_replies, stage)
+                return {'presentationId': presentation_id, 'replies': local_replies}
+            entries = plan.add(requests, None, stage)
+            if plan.dry_run:
+                # Nothing is sent in a dry run: stage it, later replies are no longer predictions
+                self.logger.warning(f"Snapshot cannot model stage '{stage}' - dry run replies are unknown from here on")
+                plan.replies_known = False
+                return {'presentationId': presentation_id, 'replies': [{} for _ in entries]}
+            # The snapshot cannot model this batch - send it now together with everything pending
+            self.logger.debug(f"Flushing mutation plan early for stage '{stage}'")
+            self._send_plan(plan)
+            rejected = next((entry['error'] for entry in entries if entry['error'] is not None), None)
+            if rejected is not None:
+                raise rejected
+            return {'presentationId': presentation_id, 'replies': [entry['reply'] or {} for entry in entries]}
+
+        try:
+            response = self._send_batch_update(presentation_id, requests)
+        except Exception:
+            snapshot = self._snapshots.get(presentation_id)
+            if snapshot:
+                snapshot.invalidate("batchUpdate failed")
+            raise
+        snapshot = self._snapshots.get(presentation_id)
+        if snapshot:
+            snapshot.apply(requests, response)
+        return response
     
     def find_placeholders(self, presentation_id):
         """Find all placeholders in the presentation from shapes and tables"""
-        presentation = self.get_presentation(presentation_id)
+        presentation = self._snapshot_document(presentation_id)
         if not presentation:
             return []
 
@@ -223,10 +429,7 @@ class SlidesClient:
             })
         
         try:
-            response = self.service.presentations().batchUpdate(
-                presentationId=presentation_id,
-                body={'requests': requests}
-            ).execute()
+            response = self._execute_batch_update(presentation_id, requests, stage='text')
             
             self.logger.info(f"Successfully replaced {len(requests)} placeholders")
             return response
@@ -259,10 +462,7 @@ class SlidesClient:
             return None
 
         try:
-            response = self.service.presentations().batchUpdate(
-                presentationId=presentation_id,
-                body={'requests': requests}
-            ).execute()
+            response = self._execute_batch_update(presentation_id, requests, stage='text')
             self.logger.info(f"Replaced text: {len(text_map or {})}")
             return response
         except HttpError as e:
@@ -272,7 +472,7 @@ class SlidesClient:
     def apply_text_styling(self, presentation_id, text_styling_map, theme=None):
         """Apply color and styling to text elements based on theme"""
         # Reload presentation to get current state after text replacements
-        presentation = self.get_presentation(presentation_id)
+        presentation = self._snapshot_document(presentation_id)
         if not presentation:
             self.logger.warning("Could not load presentation for style validation")
             return None
@@ -390,7 +590,7 @@ class SlidesClient:
         
         if requests:
             self.logger.info(f"📝 Applying styling to {len(requests)} elements (found: {elements_found}, found_by_text: {elements_found_by_text}, missing: {elements_not_found})")
-            result = self.batch_update_requests(presentation_id, requests)
+            result = self.batch_update_requests(presentation_id, requests, stage='styling')
             if result:
                 self.logger.info(f"✅ Successfully applied styling to {len(requests)} elements")
             else:
@@ -401,15 +601,12 @@ class SlidesClient:
         return None
 
 
-    def batch_update_requests(self, presentation_id, requests):
+    def batch_update_requests(self, presentation_id, requests, stage=None):
         """Execute arbitrary batchUpdate requests"""
         if not requests:
             return None
         try:
-            return self.service.presentations().batchUpdate(
-                presentationId=presentation_id,
-                body={'requests': requests}
-            ).execute()
+            return self._execute_batch_update(presentation_id, requests, stage=stage)
         except HttpError as e:
             self.logger.error(f"Error executing batchUpdate: {e}")
             return None
@@ -463,7 +660,7 @@ class SlidesClient:
             
             # Step 0: Find placeholder positions BEFORE replacement to track which occurrences to hyperlink
             self.logger.info(f"📖 Step 0: Finding placeholder positions before replacement...")
-            presentation_before = self.get_presentation(presentation_id)
+            presentation_before = self._snapshot_document(presentation_id)
             if not presentation_before:
                 self.logger.error("Failed to get presentation before replacement")
                 return False
@@ -521,10 +718,7 @@ class SlidesClient:
             self.logger.info(f"📝 Step 1: Replacing '{placeholder_text}' with '{display_text}' using replaceAllText")
             
             # Execute replaceAllText
-            replace_response = self.service.presentations().batchUpdate(
-                presentationId=presentation_id,
-                body={'requests': [replace_request]}
-            ).execute()
+            replace_response = self._execute_batch_update(presentation_id, [replace_request], stage='hyperlink')
             
             occurrences_replaced = replace_response.get('replies', [{}])[0].get('replaceAllText', {}).get('occurrencesChanged', 0)
             self.logger.info(f"✅ Replaced {occurrences_replaced} occurrence(s) of '{placeholder_text}' with '{display_text}'")
@@ -535,7 +729,7 @@ class SlidesClient:
             
             # Step 2: Reload presentation to find the new text positions
             self.logger.info(f"📖 Step 2: Reloading presentation to find replaced text positions...")
-            presentation = self.get_presentation(presentation_id)
+            presentation = self._snapshot_document(presentation_id)
             if not presentation:
                 self.logger.error("Failed to reload presentation after text replacement")
                 return False
@@ -622,10 +816,7 @@ class SlidesClient:
                 self.logger.info(f"🔗 Step 3: Applying hyperlink styles to {len(style_requests)} occurrence(s) using updateTextStyle")
                 
                 # Execute all style updates in one batch
-                style_response = self.service.presentations().batchUpdate(
-                    presentationId=presentation_id,
-                    body={'requests': style_requests}
-                ).execute()
+                style_response = self._execute_batch_update(presentation_id, style_requests, stage='hyperlink')
                 
                 self.logger.info(f"✅ Successfully added hyperlinks to {len(style_requests)} occurrence(s) of '{display_text}'")
                 self.logger.info(f"🔗 Hyperlink URL: {url}")
@@ -665,10 +856,7 @@ class SlidesClient:
                 }
             }]
             
-            result = self.service.presentations().batchUpdate(
-                presentationId=presentation_id,
-                body={'requests': requests}
-            ).execute()
+            result = self._execute_batch_update(presentation_id, requests, stage='delete_slides')
             
             self.logger.info(f"Successfully deleted slide {slide_object_id} from presentation {presentation_id}")
             return True
@@ -703,10 +891,7 @@ class SlidesClient:
                     }
                 })
             
-            result = self.service.presentations().batchUpdate(
-                presentationId=presentation_id,
-                body={'requests': requests}
-            ).execute()
+            result = self._execute_batch_update(presentation_id, requests, stage='delete_slides')
             
             self.logger.info(f"Successfully deleted {len(slide_object_ids)} slide(s) from presentation {presentation_id}")
             return True
@@ -718,17 +903,29 @@ class SlidesClient:
             self.logger.error(f"Error deleting slides: {e}")
             return False
     
-    def get_slide_ids(self, presentation_id):
+    def get_slide_ids(self, presentation_id, force_remote=False):
         """Get a list of all slide object IDs in a presentation.
         
         Args:
             presentation_id: The ID of the presentation
+            force_remote: Ask the server with a fields-masked presentations.get (no page
+                content) instead of the local snapshot, e.g. to verify our own changes
             
         Returns:
-            List of slide object IDs, or empty list if error
+            List of slide object IDs, or empty list if error (None if error with force_remote)
         """
+        if force_remote:
+            try:
+                presentation = self.service.presentations().get(
+                    presentationId=presentation_id,
+                    fields='slides.objectId'
+                ).execute()
+                return [slide.get('objectId') for slide in presentation.get('slides', []) or [] if slide.get('objectId')]
+            except HttpError as e:
+                self.logger.error(f"Error getting slide IDs: {e}")
+                return None
         try:
-            presentation = self.get_presentation(presentation_id)
+            presentation = self._snapshot_document(presentation_id)
             if not presentation:
                 return []
             
@@ -751,7 +948,7 @@ class SlidesClient:
             dict with 'element_id', 'slide_id', and 'text_content', or None if not found
         """
         try:
-            presentation = self.get_presentation(presentation_id)
+            presentation = self._snapshot_document(presentation_id)
             if not presentation:
                 return None
             
@@ -811,7 +1008,7 @@ class SlidesClient:
         """
         try:
             # First, reload presentation to get current text structure
-            presentation = self.get_presentation(presentation_id)
+            presentation = self._snapshot_document(presentation_id)
             if not presentation:
                 self.logger.error("Could not load presentation for bullet formatting")
                 return False
@@ -1011,10 +1208,7 @@ class SlidesClient:
             # Execute requests
             if requests:
                 try:
-                    response = self.service.presentations().batchUpdate(
-                        presentationId=presentation_id,
-                        body={'requests': requests}
-                    ).execute()
+                    response = self._execute_batch_update(presentation_id, requests, stage='bullets')
                     self.logger.info(f"✅ Successfully formatted bullets for element {element_id}")
                     return True
                 except HttpError as e:
@@ -1027,54 +1221,142 @@ class SlidesClient:
             self.logger.error(f"Error in format_bullets_for_element: {e}")
             return False
 
+    def _drive_account_key(self):
+        """Identify the Drive account behind the credentials (key for the process-wide folder cache)"""
+        credentials = getattr(self, '_credentials', None)
+        return (
+            getattr(credentials, 'service_account_email', None)
+            or getattr(credentials, 'client_id', None)
+            or AUTH_MODE
+        )
+
     def get_or_create_uploads_folder(self):
-        """Get or create the 'Uploads' folder in Google Drive root"""
-        try:
-            # Search for existing "Uploads" folder
-            query = "name='Uploads' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = self.drive_service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id, name)'
-            ).execute()
-            
-            folders = results.get('files', [])
-            
-            if folders:
-                # Folder exists, return its ID
-                folder_id = folders[0]['id']
-                self.logger.info(f"Found existing 'Uploads' folder: {folder_id}")
-                return folder_id
-            else:
-                # Create new folder
-                folder_metadata = {
-                    'name': 'Uploads',
-                    'mimeType': 'application/vnd.google-apps.folder'
-                }
-                folder = self.drive_service.files().create(
-                    body=folder_metadata,
-                    fields='id'
+        """Get or create the 'Uploads' folder in Google Drive root (cached per client and process)"""
+        if self._uploads_folder_id:
+            return self._uploads_folder_id
+        account_key = self._drive_account_key()
+        with _uploads_folder_lock:
+            cached_id = _uploads_folder_ids.get(account_key)
+            if cached_id:
+                self._uploads_folder_id = cached_id
+                return cached_id
+            try:
+                # Search for existing "Uploads" folder
+                query = "name='Uploads' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+                results = self.drive_service.files().list(
+                    q=query,
+                    spaces='drive',
+                    fields='files(id, name)'
                 ).execute()
-                folder_id = folder.get('id')
-                self.logger.info(f"Created new 'Uploads' folder: {folder_id}")
-                return folder_id
                 
-        except Exception as e:
-            self.logger.error(f"Error getting/creating Uploads folder: {e}")
-            return None
+                folders = results.get('files', [])
+                
+                if folders:
+                    # Folder exists, return its ID
+                    folder_id = folders[0]['id']
+                    self.logger.info(f"Found existing 'Uploads' folder: {folder_id}")
+                else:
+                    # Create new folder
+                    folder_metadata = {
+                        'name': 'Uploads',
+                        'mimeType': 'application/vnd.google-apps.folder'
+                    }
+                    folder = self.drive_service.files().create(
+                        body=folder_metadata,
+                        fields='id'
+                    ).execute()
+                    folder_id = folder.get('id')
+                    self.logger.info(f"Created new 'Uploads' folder: {folder_id}")
+                if folder_id:
+                    _uploads_folder_ids[account_key] = folder_id
+                    self._uploads_folder_id = folder_id
+                return folder_id
+                    
+            except Exception as e:
+                self.logger.error(f"Error getting/creating Uploads folder: {e}")
+                return None
+
+    def _forget_uploads_folder(self, folder_id):
+        """Drop a cached 'Uploads' folder ID that no longer works (e.g. the folder was deleted)"""
+        with _uploads_folder_lock:
+            if _uploads_folder_ids.get(self._drive_account_key()) == folder_id:
+                _uploads_folder_ids.pop(self._drive_account_key(), None)
+        if self._uploads_folder_id == folder_id:
+            self._uploads_folder_id = None
     
-    def upload_image_to_drive(self, image_path, filename=None):
-        """Upload image to Google Drive 'Uploads' folder, make it public, and return (file_id, public_url)"""
+    def upload_image_to_drive(self, image_path, filename=None, folder_id=None, make_public=True):
+        """Upload image to Google Drive 'Uploads' folder, make it public, and return (file_id, public_url)
+
+        Safe to call from worker threads. Pass folder_id (from get_or_create_uploads_folder)
+        to skip the folder lookup, and make_public=False to grant access later in one batch
+        with make_files_public.
+        """
         try:
             if not os.path.exists(image_path):
                 self.logger.error(f"Image file not found: {image_path}")
                 return None
-            
-            if not filename:
-                filename = os.path.basename(image_path)
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+            return self.upload_image_bytes(
+                image_bytes,
+                filename or os.path.basename(image_path),
+                folder_id=folder_id,
+                make_public=make_public
+            )
+        except Exception as e:
+            self.logger.error(f"Error uploading image to Drive: {e}")
+            return None
+
+    def _reuse_uploaded_file(self, digest):
+        """Return (file_id, public_url) of an earlier upload with the same content, if it still exists"""
+        account_key = self._drive_account_key()
+        entry = drive_upload_index.lookup(account_key, digest)
+        if not entry:
+            return None
+        if drive_upload_index.needs_verification(entry):
+            if not self._drive_file_usable(entry['file_id']):
+                self.logger.info(f"Indexed Drive file {entry['file_id']} is no longer available, uploading again")
+                drive_upload_index.remove(account_key, digest)
+                return None
+            drive_upload_index.mark_verified(account_key, digest)
+        with self._upload_lock:
+            self._public_file_ids.add(entry['file_id'])
+        self.logger.info(f"♻️ Reusing Drive file {entry['file_id']} (identical image already uploaded)")
+        return entry['file_id'], entry['public_url']
+
+    def _drive_file_usable(self, file_id):
+        """True if the Drive file still exists and is not trashed"""
+        try:
+            file = self._thread_drive_service().files().get(fileId=file_id, fields='id, trashed').execute()
+            return bool(file.get('id')) and not file.get('trashed')
+        except Exception as e:
+            self.logger.debug(f"Drive file {file_id} check failed: {e}")
+            return False
+
+    def upload_image_bytes(self, image_bytes, filename, mime_type=None, folder_id=None, make_public=True):
+        """Upload in-memory image bytes to the 'Uploads' folder and return (file_id, public_url)
+
+        With DRIVE_UPLOAD_DEDUP, bytes that were uploaded before (and whose Drive file still
+        exists) are not uploaded again; the existing file is returned.
+
+        Args:
+            image_bytes: Encoded image (PNG/JPEG bytes)
+            filename: Drive file name (the extension picks the MIME type if mime_type is not given)
+            mime_type: Optional explicit MIME type
+            folder_id: Optional 'Uploads' folder ID (looked up/cached if omitted)
+            make_public: Grant 'anyone: reader' right away (False = caller batches it via make_files_public)
+        """
+        try:
+            digest = content_hash(image_bytes) if DRIVE_UPLOAD_DEDUP else None
+            if digest:
+                reused = self._reuse_uploaded_file(digest)
+                if reused:
+                    return reused
+
+            drive_service = self._thread_drive_service()
             
             # Get or create the "Uploads" folder
-            uploads_folder_id = self.get_or_create_uploads_folder()
+            uploads_folder_id = folder_id or self.get_or_create_uploads_folder()
             if not uploads_folder_id:
                 self.logger.warning("Could not get Uploads folder, uploading to root instead")
                 uploads_folder_id = None
@@ -1092,36 +1374,60 @@ class SlidesClient:
                 self.logger.info(f"Uploading '{filename}' to root folder")
             
             # Choose MIME based on extension
-            ext = os.path.splitext(image_path)[1].lower()
-            if ext in ('.jpg', '.jpeg'):
-                mime = 'image/jpeg'
-            elif ext == '.png':
-                mime = 'image/png'
-            else:
-                mime = 'application/octet-stream'
+            if not mime_type:
+                ext = os.path.splitext(filename)[1].lower()
+                if ext in ('.jpg', '.jpeg'):
+                    mime_type = 'image/jpeg'
+                elif ext == '.png':
+                    mime_type = 'image/png'
+                else:
+                    mime_type = 'application/octet-stream'
 
-            # Upload file
-            media = MediaFileUpload(image_path, mimetype=mime)
-            file = self.drive_service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id'
-            ).execute()
+            # Upload straight from memory (single request, no resumable session for small images)
+            def _create(metadata):
+                media = MediaIoBaseUpload(BytesIO(image_bytes), mimetype=mime_type, resumable=False)
+                return drive_service.files().create(
+                    body=metadata,
+                    media_body=media,
+                    fields='id'
+                ).execute()
+
+            try:
+                file = _create(file_metadata)
+            except HttpError as e:
+                if uploads_folder_id and getattr(e, 'resp', None) is not None and e.resp.status == 404:
+                    # Cached folder was deleted - look it up again and retry once
+                    self.logger.warning(f"'Uploads' folder {uploads_folder_id} not found, refreshing folder cache")
+                    self._forget_uploads_folder(uploads_folder_id)
+                    uploads_folder_id = self.get_or_create_uploads_folder()
+                    if uploads_folder_id:
+                        file_metadata['parents'] = [uploads_folder_id]
+                    else:
+                        file_metadata.pop('parents', None)
+                    file = _create(file_metadata)
+                else:
+                    raise
             
             file_id = file.get('id')
+            public_url = f"https://drive.google.com/uc?export=view&id={file_id}"
             # Make the file publicly readable
-            try:
-                self.drive_service.permissions().create(
-                    fileId=file_id,
-                    body={
-                        'type': 'anyone',
-                        'role': 'reader'
-                    }
-                ).execute()
-            except Exception as e:
-                self.logger.warning(f"Could not set public permission for file {file_id}: {e}")
+            if make_public:
+                try:
+                    drive_service.permissions().create(
+                        fileId=file_id,
+                        body={
+                            'type': 'anyone',
+                            'role': 'reader'
+                        }
+                    ).execute()
+                    if digest:
+                        drive_upload_index.record(self._drive_account_key(), digest, file_id, public_url, len(image_bytes))
+                except Exception as e:
+                    self.logger.warning(f"Could not set public permission for file {file_id}: {e}")
+            else:
+                with self._upload_lock:
+                    self._pending_public[file_id] = (digest, public_url, len(image_bytes))
 
-            public_url = f"https://drive.google.com/uc?export=view&id={file_id}"
             self.logger.info(f"Image uploaded to Drive (Uploads folder): {file_id}")
             return file_id, public_url
             
@@ -1129,31 +1435,83 @@ class SlidesClient:
             self.logger.error(f"Error uploading image to Drive: {e}")
             return None
 
-    def replace_image_placeholder(self, presentation_id, placeholder_text, image_path, slide_id=None, crop_properties=None, target_dimensions=None):
+    def make_files_public(self, file_ids):
+        """Grant 'anyone: reader' on several Drive files using batched HTTP requests.
+
+        Returns:
+            set of file IDs that are now public
+        """
+        with self._upload_lock:
+            already_public = set(self._public_file_ids)
+        reused = {file_id for file_id in file_ids or [] if file_id in already_public}
+        file_ids = [file_id for file_id in dict.fromkeys(file_ids or []) if file_id and file_id not in already_public]
+        if not file_ids:
+            return reused
+
+        granted = set()
+
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                self.logger.warning(f"Could not set public permission for file {request_id}: {exception}")
+            else:
+                granted.add(request_id)
+
+        drive_service = self._thread_drive_service()
+        for start in range(0, len(file_ids), DRIVE_BATCH_LIMIT):
+            chunk = file_ids[start:start + DRIVE_BATCH_LIMIT]
+            try:
+                batch = drive_service.new_batch_http_request(callback=_callback)
+                for file_id in chunk:
+                    batch.add(
+                        drive_service.permissions().create(
+                            fileId=file_id,
+                            body={'type': 'anyone', 'role': 'reader'},
+                            fields='id'
+                        ),
+                        request_id=file_id
+                    )
+                batch.execute()
+            except Exception as e:
+                self.logger.warning(f"Batched permission update failed for {len(chunk)} file(s): {e}")
+        self.logger.info(f"Made {len(granted)}/{len(file_ids)} uploaded file(s) public via batched Drive request(s)")
+
+        # Only files that are actually public can be reused by later uploads
+        account_key = self._drive_account_key()
+        with self._upload_lock:
+            self._public_file_ids.update(granted)
+            pending = {file_id: self._pending_public.pop(file_id) for file_id in granted if file_id in self._pending_public}
+        for file_id, (digest, public_url, size) in pending.items():
+            if digest:
+                drive_upload_index.record(account_key, digest, file_id, public_url, size)
+        return granted | reused
+
+    def replace_image_placeholder(self, presentation_id, placeholder_text, image_path, slide_id=None, crop_properties=None, target_dimensions=None, uploaded=None):
         """Replace image placeholder with uploaded image
         
         Args:
             target_dimensions: Optional dict with 'width', 'height', 'unit' to override placeholder size
                               If provided, image element will use these dimensions instead of placeholder size
+            uploaded: Optional (file_id, public_url) of an image already uploaded with
+                      upload_image_to_drive; the upload step is skipped
         """
         try:
             # Special handling for companyLogo - use exact replacement method
             if 'companylogo' in (placeholder_text or '').lower():
                 self.logger.info("🔒 Detected companyLogo - using EXACT replacement method")
-                return self.replace_company_logo_exact(presentation_id, placeholder_text, image_path, slide_id)
+                return self.replace_company_logo_exact(presentation_id, placeholder_text, image_path, slide_id, uploaded=uploaded)
             
             # Special-case background image placeholders
             if 'backgroundimage' in (placeholder_text or '').lower():
-                return self.replace_background_placeholder(presentation_id, placeholder_text, image_path, slide_id=slide_id)
+                return self.replace_background_placeholder(presentation_id, placeholder_text, image_path, slide_id=slide_id, uploaded=uploaded)
 
             # Upload image to Drive
-            result = self.upload_image_to_drive(image_path)
+            result = uploaded or self.upload_image_to_drive(image_path)
             if not result:
                 return False
             file_id, public_url = result
             
             # Find ALL elements that contain the placeholder text BEFORE replacing
-            presentation = self.get_presentation(presentation_id)
+            presentation = self._snapshot_document(presentation_id)
             if not presentation:
                 return False
             
@@ -1392,10 +1750,7 @@ class SlidesClient:
             
             # Execute all requests in one batch to get created element IDs
             if all_requests:
-                response = self.service.presentations().batchUpdate(
-                    presentationId=presentation_id,
-                    body={'requests': all_requests}
-                ).execute()
+                response = self._execute_batch_update(presentation_id, all_requests, stage='image')
                 
                 # Get the IDs of newly created image elements from response
                 created_ids = []
@@ -1434,7 +1789,7 @@ class SlidesClient:
             self.logger.error(f"Error replacing image placeholder: {e}")
             return False
 
-    def replace_background_placeholder(self, presentation_id, placeholder_text, image_path, slide_id=None, target_dimensions=None):
+    def replace_background_placeholder(self, presentation_id, placeholder_text, image_path, slide_id=None, target_dimensions=None, uploaded=None):
         """Replace a background placeholder by setting the slide background and removing the placeholder shape.
         
         Args:
@@ -1443,10 +1798,11 @@ class SlidesClient:
             image_path: Path to the image file (should already be cropped/resized to exact slide dimensions)
             slide_id: Optional specific slide ID
             target_dimensions: Optional dict with 'width', 'height', 'unit' - if not provided, will use slide page size
+            uploaded: Optional (file_id, public_url) from an earlier upload_image_to_drive call
         """
         try:
             # Find placeholder location (slide + element) and get slide page size
-            presentation = self.get_presentation(presentation_id)
+            presentation = self._snapshot_document(presentation_id)
             if not presentation:
                 return False
 
@@ -1497,7 +1853,7 @@ class SlidesClient:
                 return False
 
             # Upload image to Drive (image should already be cropped/resized to exact dimensions)
-            result = self.upload_image_to_drive(image_path)
+            result = uploaded or self.upload_image_to_drive(image_path)
             if not result:
                 return False
             file_id, public_url = result
@@ -1530,14 +1886,14 @@ class SlidesClient:
                     "for other elements on this slide. Background is now set at slide level."
                 )
 
-            self.batch_update_requests(presentation_id, requests)
+            self.batch_update_requests(presentation_id, requests, stage='background')
             self.logger.info(f"Slide background updated from placeholder (image dimensions should match slide: {target_width:.2f}x{target_height:.2f} PT)")
             return True
         except Exception as e:
             self.logger.error(f"Error replacing background placeholder: {e}")
             return False
 
-    def replace_company_logo_exact(self, presentation_id, placeholder_text, image_path, slide_id=None):
+    def replace_company_logo_exact(self, presentation_id, placeholder_text, image_path, slide_id=None, uploaded=None):
         """Replace companyLogo placeholder with EXACT dimensions from template
         
         This method ensures the logo fits EXACTLY within the placeholder bounds,
@@ -1548,6 +1904,7 @@ class SlidesClient:
             placeholder_text: The placeholder text (e.g., "{{companyLogo}}")
             image_path: Path to the logo image file
             slide_id: Optional slide ID to search in
+            uploaded: Optional (file_id, public_url) from an earlier upload_image_to_drive call
             
         Returns:
             bool: True if successful, False otherwise
@@ -1556,14 +1913,14 @@ class SlidesClient:
             self.logger.info(f"🔒 EXACT LOGO REPLACEMENT: Starting for {placeholder_text}")
             
             # Upload image to Drive
-            result = self.upload_image_to_drive(image_path)
+            result = uploaded or self.upload_image_to_drive(image_path)
             if not result:
                 self.logger.error("❌ Failed to upload logo to Drive")
                 return False
             file_id, public_url = result
             
             # Get current presentation state
-            presentation = self.get_presentation(presentation_id)
+            presentation = self._snapshot_document(presentation_id)
             if not presentation:
                 self.logger.error("❌ Failed to get presentation")
                 return False
@@ -1681,10 +2038,7 @@ class SlidesClient:
             ]
             
             # Execute requests
-            response = self.service.presentations().batchUpdate(
-                presentationId=presentation_id,
-                body={'requests': requests}
-            ).execute()
+            response = self._execute_batch_update(presentation_id, requests, stage='logo')
             
             # Verify the created image
             if response.get('replies'):
@@ -1710,7 +2064,9 @@ class SlidesClient:
         """Replace color placeholder by filling the shape with solid color"""
         try:
             # Find the placeholder element
-            presentation = self.service.presentations().get(presentationId=presentation_id).execute()
+            presentation = self._snapshot_document(presentation_id)
+            if not presentation:
+                return False
             target_element_id = None
             target_slide_id = slide_id
             
@@ -1770,7 +2126,7 @@ class SlidesClient:
                 }
             })
             
-            self.batch_update_requests(presentation_id, requests)
+            self.batch_update_requests(presentation_id, requests, stage='color')
             self.logger.info(f"Successfully filled color placeholder {placeholder_text} with color {color}")
             
             # Note: Slides API doesn't support programmatic z-order changes (send to back/front).
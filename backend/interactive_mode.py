@@ -48,9 +48,14 @@ class InteractiveMode:
                         sheets_range: str | None = None,
                         primary_color: str | None = None,
                         secondary_color: str | None = None,
-                        accent_color: str | None = None):
+                        accent_color: str | None = None,
+                        cache_mode: str | None = None,
+                        automation=None):
         """Non-interactive: run generation directly with provided parameters.
 
+        Pass an existing PPTAutomation (e.g. leased from the server's warm pool) to skip
+        initializing a new one.
+
         Returns the result dict from automation (success, presentation_id, url, etc.) or raises on error.
         """
         from core import PPTAutomation
@@ -65,7 +70,8 @@ class InteractiveMode:
         self.use_ai = use_ai
         self.auto_detect = auto_detect
 
-        automation = PPTAutomation(use_ai=self.use_ai)
+        if automation is None:
+            automation = PPTAutomation(use_ai=self.use_ai)
         if self.auto_detect:
             result = automation.generate_presentation_auto(
                 context=self.company_name,
@@ -82,6 +88,7 @@ class InteractiveMode:
                 primary_color=primary_color,
                 secondary_color=secondary_color,
                 accent_color=accent_color,
+                cache_mode=cache_mode,
             )
         else:
             result = automation.generate_presentation(
@@ -100,6 +107,7 @@ class InteractiveMode:
                 primary_color=primary_color,
                 secondary_color=secondary_color,
                 accent_color=accent_color,
+                cache_mode=cache_mode,
             )
         return result
     
@@ -3,10 +3,11 @@ PPT Automation - Main Entry Point
 Generate professional presentations with AI-powered content and theming
 """
 import argparse
+import json
 from config import LOG_LEVEL, LOG_FILE
 from utils.logger import get_logger
 from core import PPTAutomation
-from config import TEMPLATE_PRESENTATION_ID
+from config import TEMPLATE_PRESENTATION_ID, GEMINI_CACHE_MODE, GEMINI_CACHE_MODES, BATCH_CONCURRENCY
 
 
 def main():
@@ -23,6 +24,9 @@ Examples:
   
   # Custom project with specific details
   python main.py --company "Tech Corp" --project-name "AI Platform" --proposal-type "Technical Proposal" --template-id YOUR_TEMPLATE_ID
+  
+  # Batch mode: one deck per manifest row (.jsonl or .csv with company_name, project_name, ... columns)
+  python main.py --batch manifest.jsonl --template-id YOUR_TEMPLATE_ID --batch-output results.json
         """
     )
     
@@ -39,6 +43,12 @@ Examples:
     parser.add_argument('--interactive', action='store_true', help='Interactive mode - prompts for company name')
     parser.add_argument('--fallback', action='store_true', help='Use fallback content (no AI)')
     parser.add_argument('--auto-detect', action='store_true', help='Auto-detect placeholders and fill text/images')
+    parser.add_argument('--dry-run', action='store_true', help='With --auto-detect: print the planned Slides batchUpdate requests as JSON instead of sending them (the template is still copied and images uploaded)')
+    parser.add_argument('--cache-mode', type=str, choices=list(GEMINI_CACHE_MODES), default=None,
+                        help=f'Gemini response cache: off, read or readwrite (default: {GEMINI_CACHE_MODE})')
+    parser.add_argument('--batch', type=str, metavar='MANIFEST', help='Generate one deck per row of a .jsonl or .csv manifest')
+    parser.add_argument('--batch-concurrency', type=int, default=None, help=f'Rows generated in parallel (default: {BATCH_CONCURRENCY})')
+    parser.add_argument('--batch-output', type=str, help='Write the batch summary (per-row results) to this JSON file')
     
     # Google Sheets arguments
     parser.add_argument('--sheets-id', '--sheets-url', type=str, dest='sheets_id', help='Google Sheet ID or full URL for placeholder values')
@@ -65,6 +75,10 @@ Examples:
         logger.error("No template ID provided. Use --template-id or set TEMPLATE_PRESENTATION_ID in .env")
         return 1
 
+    # Batch mode
+    if args.batch:
+        return run_batch(args, template_id, logger)
+
     # Interactive mode
     if args.interactive:
         try:
@@ -122,6 +136,8 @@ Examples:
                 company_website=args.company_website,
                 sheets_id=args.sheets_id,
                 sheets_range=args.sheets_range,
+                dry_run=args.dry_run,
+                cache_mode=args.cache_mode,
             )
         else:
             result = automation.generate_presentation(
@@ -133,12 +149,18 @@ Examples:
                 project_name=args.project_name,
                 company_name=company_name,
                 proposal_type=args.proposal_type,
+                cache_mode=args.cache_mode,
             )
 
         if not result:
             logger.error("Presentation generation failed")
             return 1
 
+        if args.dry_run and result.get('mutation_plan'):
+            print(json.dumps(result['mutation_plan'], indent=2, ensure_ascii=False))
+            logger.info(f"Dry run complete - planned {result['mutation_plan'].get('total_requests', 0)} request(s), content edits not sent")
+            return 0
+
         logger.info(f"Success! Presentation ready at: {result['presentation_url']}")
         return 0
 
@@ -147,5 +169,34 @@ Examples:
         return 1
 
 
+def run_batch(args, template_id, logger):
+    """Generate a deck for every manifest row and print the per-row results"""
+    from core.batch_runner import BatchRunner, load_manifest
+    try:
+        rows = load_manifest(args.batch)
+        runner = BatchRunner(concurrency=args.batch_concurrency)
+        summary = runner.run(rows, template_id=template_id, cache_mode=args.cache_mode, dry_run=args.dry_run)
+    except KeyboardInterrupt:
+        logger.info("Cancelled by user")
+        return 1
+    except Exception as e:
+        logger.error(f"Batch error: {e}")
+        return 1
+
+    for row in summary['results']:
+        label = row.get('company_name') or f"row {row['index'] + 1}"
+        if row.get('success'):
+            print(f"✅ {label}: {row.get('presentation_url')}")
+        else:
+            print(f"❌ {label}: {row.get('error')}")
+    if args.batch_output:
+        with open(args.batch_output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        logger.info(f"Batch summary written to {args.batch_output}")
+
+    logger.info(f"Batch complete: {summary['succeeded']}/{summary['total']} succeeded in {summary['duration']:.1f}s")
+    return 0 if summary['failed'] == 0 else 1
+
+
 if __name__ == "__main__":
     exit(main())
@@ -2,20 +2,27 @@
 FastAPI service exposing PPT generation as background jobs with progress logs.
 Run: uvicorn server:app --host 0.0.0.0 --port 8000 --reload
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
-import threading
-import logging
+from typing import Optional, Dict, Any, List
+import asyncio
+import json
+import time
 
-from config import TEMPLATE_PRESENTATION_ID, LOG_LEVEL, LOG_FILE
+from config import TEMPLATE_PRESENTATION_ID, GEMINI_CACHE_MODES, AUTOMATION_POOL_WARM_ON_STARTUP, BATCH_MAX_ROWS, LOG_LEVEL, LOG_FILE
 from utils.logger import get_logger
-from core.automation import PPTAutomation
-from utils.job_manager import JobManager
+from core.automation_pool import AutomationPool
+from core.batch_runner import BatchRunner
+from utils.job_manager import JobManager, QueueFullError, request_hash
 
 
 logger = get_logger("server", LOG_LEVEL, LOG_FILE)
+# Idle event streams send a comment line this often so proxies keep the connection open
+SSE_KEEPALIVE_SECONDS = 15
+# How often an open event stream checks its job (streams poll on the event loop, holding no thread)
+SSE_POLL_SECONDS = 0.5
 app = FastAPI(title="PPT Automation API", version="1.0.0")
 
 app.add_middleware(
@@ -27,6 +34,14 @@ app.add_middleware(
 )
 
 job_manager = JobManager()
+# Warm, reusable PPTAutomation instances (state is reset between jobs)
+automation_pool = AutomationPool()
+
+
+@app.on_event("startup")
+def warm_automation_pool():
+    if AUTOMATION_POOL_WARM_ON_STARTUP:
+        automation_pool.warm_in_background()
 
 
 class GenerateAutoRequest(BaseModel):
@@ -44,11 +59,43 @@ class GenerateAutoRequest(BaseModel):
     primary_color: Optional[str] = None  # User-provided primary color (hex)
     secondary_color: Optional[str] = None  # User-provided secondary color (hex)
     accent_color: Optional[str] = None  # User-provided accent color (hex)
+    dry_run: Optional[bool] = False  # Return the planned Slides batchUpdate requests instead of sending them (the copy is still made)
+    cache_mode: Optional[str] = None  # Gemini response cache: off | read | readwrite (default from config)
+    priority: Optional[int] = 0  # Higher runs first; FIFO within the same priority
+    idempotency_key: Optional[str] = None  # Same key -> same job (also accepted as the Idempotency-Key header)
+
+
+class BatchRow(BaseModel):
+    context: Optional[str] = None
+    output_title: Optional[str] = None
+    profile: Optional[str] = "company"
+    project_name: Optional[str] = None
+    project_description: Optional[str] = None
+    company_name: Optional[str] = None
+    proposal_type: Optional[str] = None
+    company_website: Optional[str] = None
+    sheets_id: Optional[str] = None  # Can be Sheet ID or full URL
+    sheets_range: Optional[str] = "Sheet1"  # Sheet name or A1 range (default: whole sheet)
+    primary_color: Optional[str] = None
+    secondary_color: Optional[str] = None
+    accent_color: Optional[str] = None
+    cache_mode: Optional[str] = None  # Overrides the batch cache_mode for this row
+
+
+class BatchRequest(BaseModel):
+    template_id: Optional[str] = None  # Shared by every row; analyzed once
+    rows: List[BatchRow]
+    concurrency: Optional[int] = None  # Rows generated in parallel (default BATCH_CONCURRENCY)
+    cache_mode: Optional[str] = None  # Gemini response cache: off | read | readwrite (default from config)
+    dry_run: Optional[bool] = False
+    priority: Optional[int] = 0  # Higher runs first; FIFO within the same priority
+    idempotency_key: Optional[str] = None  # Same key -> same job (also accepted as the Idempotency-Key header)
 
 
 class CopyRequest(BaseModel):
     template_id_or_url: str
     new_title: Optional[str] = None
+    priority: Optional[int] = 0  # Higher runs first; FIFO within the same priority
 
 class InteractiveRequest(BaseModel):
     template_id: Optional[str] = None
@@ -63,51 +110,67 @@ class InteractiveRequest(BaseModel):
     primary_color: Optional[str] = None  # User-provided primary color (hex)
     secondary_color: Optional[str] = None  # User-provided secondary color (hex)
     accent_color: Optional[str] = None  # User-provided accent color (hex)
+    cache_mode: Optional[str] = None  # Gemini response cache: off | read | readwrite (default from config)
+    priority: Optional[int] = 0  # Higher runs first; FIFO within the same priority
+    idempotency_key: Optional[str] = None  # Same key -> same job (also accepted as the Idempotency-Key header)
+
+
+def _validate_cache_mode(cache_mode: Optional[str]) -> None:
+    if cache_mode and cache_mode.strip().lower() not in GEMINI_CACHE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid cache_mode '{cache_mode}'. Expected one of: {', '.join(GEMINI_CACHE_MODES)}"
+        )
+
+
+# Request fields that do not change the generated deck (excluded from the coalescing hash)
+_NON_CANONICAL_FIELDS = ("priority", "idempotency_key")
+
+
+def _create_or_attach(kind: str, params: Dict[str, Any], idempotency_key: Optional[str]):
+    """Create a job, or return the existing one for the same idempotency key / identical request"""
+    key = idempotency_key or params.get("idempotency_key")
+    return job_manager.create_or_attach(
+        kind, params,
+        request_hash=request_hash(kind, params, ignore=_NON_CANONICAL_FIELDS),
+        idempotency_key=f"{kind}:{key}" if key else None,
+    )
+
+
+def _attached(job) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "queue_position": job_manager.queue_position(job.id),
+        "coalesced": True,
+    }
+
+
+def _submit(job, run_job, priority: Optional[int]) -> Dict[str, Any]:
+    """Queue a job on the worker pool; 429 when the queue is at its high-water mark"""
+    try:
+        position = job_manager.submit(job, run_job, priority=priority or 0)
+    except QueueFullError as e:
+        logger.warning(f"🚦 Rejecting {job.kind} job: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return {"job_id": job.id, "status": job.status, "queue_position": position, "coalesced": False}
 
 
 @app.post("/jobs/auto")
-def start_generate_auto(req: GenerateAutoRequest):
+def start_generate_auto(req: GenerateAutoRequest, idempotency_key: Optional[str] = Header(None)):
+    _validate_cache_mode(req.cache_mode)
     params: Dict[str, Any] = req.model_dump()
-    job = job_manager.create("generate_auto", params)
+    job, created = _create_or_attach("generate_auto", params, idempotency_key)
+    if not created:
+        return _attached(job)
 
     def run_job():
         job.status = "running"
         job.started_at = __import__("time").time()
 
-        # Attach per-job log handler to key loggers
-        handler = job_manager.attach_logger_handler(job)
-        root = logging.getLogger()
-        automation_logger = logging.getLogger("backend.core.automation")
-        for target_logger in [root, automation_logger, logging.getLogger("server")]:
-            target_logger.addHandler(handler)
-
         try:
-            automation = PPTAutomation(use_ai=True)
-            
-            # Debug: Log received color parameters
-            logger.info("="*80)
-            logger.info("🎨 COLOR PARAMETERS RECEIVED FROM FRONTEND:")
-            logger.info(f"   primary_color: {params.get('primary_color')}")
-            logger.info(f"   secondary_color: {params.get('secondary_color')}")
-            logger.info(f"   accent_color: {params.get('accent_color')}")
-            logger.info("="*80)
-            
-            result = automation.generate_presentation_auto(
-                params.get("context") or params.get("company_name") or "General Presentation",
-                template_id=params.get("template_id") or TEMPLATE_PRESENTATION_ID,
-                output_title=params.get("output_title"),
-                profile=params.get("profile"),
-                project_name=params.get("project_name"),
-                project_description=params.get("project_description"),
-                company_name=params.get("company_name"),
-                proposal_type=params.get("proposal_type"),
-                company_website=params.get("company_website"),
-                sheets_id=params.get("sheets_id"),
-                sheets_range=params.get("sheets_range"),
-                primary_color=params.get("primary_color"),
-                secondary_color=params.get("secondary_color"),
-                accent_color=params.get("accent_color"),
-            )
+            with automation_pool.lease() as automation:
+                result = _run_auto(automation, params)
 
             if not result or not result.get("success"):
                 job.status = "failed"
@@ -120,15 +183,38 @@ def start_generate_auto(req: GenerateAutoRequest):
             job.error = str(e)
         finally:
             job.completed_at = __import__("time").time()
-            # Remove handler
-            for target_logger in [root, automation_logger, logging.getLogger("server")]:
-                try:
-                    target_logger.removeHandler(handler)
-                except Exception:
-                    pass
 
-    threading.Thread(target=run_job, daemon=True).start()
-    return {"job_id": job.id}
+    return _submit(job, run_job, params.get("priority"))
+
+
+def _run_auto(automation, params: Dict[str, Any]):
+    # Debug: Log received color parameters
+    logger.info("="*80)
+    logger.info("🎨 COLOR PARAMETERS RECEIVED FROM FRONTEND:")
+    logger.info(f"   primary_color: {params.get('primary_color')}")
+    logger.info(f"   secondary_color: {params.get('secondary_color')}")
+    logger.info(f"   accent_color: {params.get('accent_color')}")
+    logger.info("="*80)
+
+    result = automation.generate_presentation_auto(
+        params.get("context") or params.get("company_name") or "General Presentation",
+        template_id=params.get("template_id") or TEMPLATE_PRESENTATION_ID,
+        output_title=params.get("output_title"),
+        profile=params.get("profile"),
+        project_name=params.get("project_name"),
+        project_description=params.get("project_description"),
+        company_name=params.get("company_name"),
+        proposal_type=params.get("proposal_type"),
+        company_website=params.get("company_website"),
+        sheets_id=params.get("sheets_id"),
+        sheets_range=params.get("sheets_range"),
+        primary_color=params.get("primary_color"),
+        secondary_color=params.get("secondary_color"),
+        accent_color=params.get("accent_color"),
+        dry_run=bool(params.get("dry_run")),
+        cache_mode=params.get("cache_mode"),
+    )
+    return result
 
 
 @app.post("/jobs/copy")
@@ -140,10 +226,6 @@ def start_copy(req: CopyRequest):
     def run_job():
         job.status = "running"
         job.started_at = __import__("time").time()
-        handler = job_manager.attach_logger_handler(job)
-        root = logging.getLogger()
-        for target_logger in [root, logging.getLogger("server")]:
-            target_logger.addHandler(handler)
         try:
             client = SlidesClient()
             new_id = client.copy_presentation(
@@ -163,13 +245,66 @@ def start_copy(req: CopyRequest):
             job.error = str(e)
         finally:
             job.completed_at = __import__("time").time()
-            try:
-                root.removeHandler(handler)
-            except Exception:
-                pass
 
-    threading.Thread(target=run_job, daemon=True).start()
-    return {"job_id": job.id}
+    return _submit(job, run_job, params.get("priority"))
+
+
+@app.post("/jobs/batch")
+def start_batch(req: BatchRequest, idempotency_key: Optional[str] = Header(None)):
+    """Generate one deck per row. job.result holds the aggregate progress and per-row results while it runs."""
+    _validate_cache_mode(req.cache_mode)
+    for row in req.rows:
+        _validate_cache_mode(row.cache_mode)
+    if not req.rows:
+        raise HTTPException(status_code=400, detail="rows must not be empty")
+    if len(req.rows) > BATCH_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"A batch accepts at most {BATCH_MAX_ROWS} rows")
+    params: Dict[str, Any] = req.model_dump()
+    job, created = _create_or_attach("batch", params, idempotency_key)
+    if not created:
+        return _attached(job)
+
+    def run_job():
+        job.status = "running"
+        job.started_at = __import__("time").time()
+
+        def on_progress(summary):
+            job.result = summary
+
+        try:
+            runner = BatchRunner(pool=automation_pool, concurrency=params.get("concurrency"))
+            summary = runner.run(
+                params["rows"],
+                template_id=params.get("template_id") or TEMPLATE_PRESENTATION_ID,
+                cache_mode=params.get("cache_mode"),
+                dry_run=bool(params.get("dry_run")),
+                on_progress=on_progress,
+            )
+            job.result = summary
+            if summary["succeeded"]:
+                job.status = "succeeded"
+            else:
+                job.status = "failed"
+                job.error = f"All {summary['total']} batch rows failed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.completed_at = __import__("time").time()
+
+    return _submit(job, run_job, params.get("priority"))
+
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = None, kind: Optional[str] = None,
+              created_after: Optional[float] = None, created_before: Optional[float] = None,
+              limit: int = 100):
+    """Jobs filtered by status, kind and creation time (epoch seconds), newest first"""
+    limit = max(1, min(limit, 1000))
+    return {
+        "jobs": job_manager.list(status, kind, created_after, created_before, limit),
+        "queue": job_manager.queue_stats(),
+    }
 
 
 @app.get("/jobs/{job_id}")
@@ -186,29 +321,100 @@ def get_job(job_id: str):
         "created_at": job.created_at,
         "started_at": job.started_at,
         "completed_at": job.completed_at,
+        "priority": job.priority,
+        "queue_position": job_manager.queue_position(job.id),
+        "queue_depth": job_manager.queue_stats()["queued"],
     }
 
 
+@app.post("/jobs/{job_id}/cancel")
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued job immediately, or ask a running job to stop at its next checkpoint"""
+    status = job_manager.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"id": job_id, "status": status}
+
+
 @app.get("/jobs/{job_id}/logs")
-def get_job_logs(job_id: str):
+def get_job_logs(job_id: str, after: Optional[int] = None):
+    """All buffered log lines, or only those with a sequence number greater than `after`"""
     job = job_manager.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return {"logs": job.logs}
+    entries = job.logs_after(after or 0)
+    response = {
+        "logs": [line for _, line in entries],
+        "next": entries[-1][0] if entries else max(after or 0, job.log_seq),
+        "status": job.status,
+        "dropped": job.log_lines_dropped,
+    }
+    if after is not None:
+        response["entries"] = [{"seq": seq, "line": line} for seq, line in entries]
+    return response
+
+
+def _sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/jobs/{job_id}/events")
+def stream_job_events(job_id: str, request: Request, after: Optional[int] = None):
+    """Server-Sent Events stream of status changes and new log lines.
+
+    Events: `status` ({status, queue_position}), `log` ({seq, line}, SSE id = seq) and a
+    final `end` once the job finished and its logs were sent. Reconnecting clients
+    resume from the Last-Event-ID header (or `after`).
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    last_event_id = request.headers.get("last-event-id")
+    cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else (after or 0)
+
+    async def events():
+        nonlocal cursor
+        status = None
+        idle_since = time.monotonic()
+        while True:
+            if job.status != status:
+                status = job.status
+                yield _sse("status", {"status": status, "queue_position": job_manager.queue_position(job.id)})
+            for seq, line in job.logs_after(cursor):
+                cursor = seq
+                idle_since = time.monotonic()
+                yield _sse("log", {"seq": seq, "line": line}, event_id=seq)
+            if status in job.TERMINAL_STATUSES and cursor >= job.log_seq:
+                yield _sse("end", {"status": status, "error": job.error})
+                return
+            while job.log_seq <= cursor and job.status == status:
+                if await request.is_disconnected():
+                    return
+                if time.monotonic() - idle_since >= SSE_KEEPALIVE_SECONDS:
+                    idle_since = time.monotonic()
+                    yield ": keep-alive\n\n"
+                await asyncio.sleep(SSE_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/jobs/interactive")
-def start_interactive(req: InteractiveRequest):
+def start_interactive(req: InteractiveRequest, idempotency_key: Optional[str] = Header(None)):
+    _validate_cache_mode(req.cache_mode)
     params: Dict[str, Any] = req.model_dump()
-    job = job_manager.create("interactive", params)
+    job, created = _create_or_attach("interactive", params, idempotency_key)
+    if not created:
+        return _attached(job)
 
     def run_job():
         job.status = "running"
         job.started_at = __import__("time").time()
-        handler = job_manager.attach_logger_handler(job)
-        root = logging.getLogger()
-        for target_logger in [root, logging.getLogger("server")]:
-            target_logger.addHandler(handler)
         try:
             from interactive_mode import InteractiveMode
             im = InteractiveMode()
@@ -221,21 +427,24 @@ def start_interactive(req: InteractiveRequest):
             logger.info(f"   accent_color: {params.get('accent_color')}")
             logger.info("="*80)
             
-            result = im.run_with_params(
-                template_id=params.get("template_id") or TEMPLATE_PRESENTATION_ID,
-                company_name=params["company_name"],
-                project_name=params["project_name"],
-                project_description=params["project_description"],
-                output_title=params.get("output_title"),
-                company_website=params.get("company_website"),
-                use_ai=True,
-                auto_detect=bool(params.get("auto_detect")),
-                sheets_id=params.get("sheets_id"),
-                sheets_range=params.get("sheets_range"),
-                primary_color=params.get("primary_color"),
-                secondary_color=params.get("secondary_color"),
-                accent_color=params.get("accent_color"),
-            )
+            with automation_pool.lease() as automation:
+                result = im.run_with_params(
+                    template_id=params.get("template_id") or TEMPLATE_PRESENTATION_ID,
+                    company_name=params["company_name"],
+                    project_name=params["project_name"],
+                    project_description=params["project_description"],
+                    output_title=params.get("output_title"),
+                    company_website=params.get("company_website"),
+                    use_ai=True,
+                    auto_detect=bool(params.get("auto_detect")),
+                    sheets_id=params.get("sheets_id"),
+                    sheets_range=params.get("sheets_range"),
+                    primary_color=params.get("primary_color"),
+                    secondary_color=params.get("secondary_color"),
+                    accent_color=params.get("accent_color"),
+                    cache_mode=params.get("cache_mode"),
+                    automation=automation,
+                )
             if not result or not result.get("success"):
                 job.status = "failed"
                 job.error = (result or {}).get("message") or "Interactive run failed"
@@ -247,12 +456,7 @@ def start_interactive(req: InteractiveRequest):
             job.error = str(e)
         finally:
             job.completed_at = __import__("time").time()
-            try:
-                root.removeHandler(handler)
-            except Exception:
-                pass
 
-    threading.Thread(target=run_job, daemon=True).start()
-    return {"job_id": job.id}
+    return _submit(job, run_job, params.get("priority"))
 
 
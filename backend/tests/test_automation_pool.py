@@ -0,0 +1,62 @@
+"""
+Tests for the warm automation pool (with fake automation instances)
+"""
+import pytest
+
+from core.automation_pool import AutomationPool
+
+
+class FakeAutomation:
+    def __init__(self, fail_reset=False):
+        self.resets = 0
+        self.fail_reset = fail_reset
+
+    def reset_run_state(self):
+        if self.fail_reset:
+            raise RuntimeError("reset failed")
+        self.resets += 1
+
+
+def test_lease_reuses_a_reset_instance():
+    pool = AutomationPool(size=2, factory=FakeAutomation)
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        pass
+    assert first is second
+    assert first.resets == 2
+    assert pool.stats() == {'size': 2, 'idle': 1, 'leased': 0, 'created': 1}
+
+
+def test_concurrent_leases_get_distinct_instances_and_idle_is_capped():
+    pool = AutomationPool(size=1, factory=FakeAutomation)
+    with pool.lease() as first, pool.lease() as second:
+        assert first is not second
+        assert pool.stats()['leased'] == 2
+    assert pool.stats()['idle'] == 1
+
+
+def test_instance_whose_reset_fails_is_dropped():
+    pool = AutomationPool(size=2, factory=lambda: FakeAutomation(fail_reset=True))
+    with pool.lease():
+        pass
+    assert pool.stats()['idle'] == 0
+    assert pool.stats()['leased'] == 0
+
+
+def test_warm_builds_up_to_the_pool_size():
+    pool = AutomationPool(size=3, factory=FakeAutomation)
+    assert pool.warm() == 3
+    assert pool.warm() == 0
+    assert pool.stats()['created'] == 3
+
+
+def test_failed_creation_does_not_leak_a_lease():
+    def broken():
+        raise RuntimeError("no credentials")
+
+    pool = AutomationPool(size=1, factory=broken)
+    with pytest.raises(RuntimeError):
+        with pool.lease():
+            pass
+    assert pool.stats()['leased'] == 0
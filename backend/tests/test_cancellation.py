@@ -0,0 +1,70 @@
+"""
+Tests for cooperative cancellation tokens and stage deadlines
+"""
+import threading
+import time
+
+import pytest
+
+from utils import cancellation
+from utils.cancellation import CancellationToken, JobCancelled, StageTimeout, cancellation_scope
+
+
+def test_checkpoint_raises_once_cancelled():
+    token = CancellationToken()
+    with cancellation_scope(token):
+        cancellation.checkpoint()
+        token.cancel("stop")
+        with pytest.raises(JobCancelled, match="stop"):
+            cancellation.checkpoint()
+    # Outside the scope there is no token to check
+    cancellation.checkpoint()
+
+
+def test_job_cancelled_is_not_swallowed_by_except_exception():
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(JobCancelled):
+        try:
+            token.check()
+        except Exception:
+            pass
+
+
+def test_stage_deadline_raises_stage_timeout():
+    token = CancellationToken()
+    token.enter_stage("content_generation", timeout=0.01)
+    time.sleep(0.02)
+    with pytest.raises(StageTimeout) as error:
+        token.check()
+    assert error.value.stage == "content_generation"
+
+
+def test_sleep_wakes_up_on_cancel():
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(JobCancelled):
+        token.sleep(5)
+    assert time.monotonic() - started < 2
+
+
+def test_parent_cancel_reaches_children_but_child_timeouts_stay_local():
+    parent = CancellationToken()
+    child = CancellationToken(parent=parent)
+    sibling = CancellationToken(parent=parent)
+    child.enter_stage("row", timeout=0.01)
+    time.sleep(0.02)
+    with pytest.raises(StageTimeout):
+        child.check()
+    parent.check()
+    sibling.check()
+    parent.cancel("job cancelled")
+    with pytest.raises(JobCancelled, match="job cancelled"):
+        sibling.check()
+
+
+def test_child_of_a_cancelled_parent_starts_cancelled():
+    parent = CancellationToken()
+    parent.cancel("gone")
+    assert CancellationToken(parent=parent).cancelled
@@ -0,0 +1,54 @@
+"""
+Tests for DeckMutationPlan ordering and commit fallback
+"""
+import pytest
+
+from core.deck_mutation_plan import DeckMutationPlan
+
+
+def replace(text):
+    return {'replaceAllText': {'containsText': {'text': text}, 'replaceText': 'x'}}
+
+
+class FakeExecute:
+    """Records each batchUpdate and rejects any batch containing a request for 'bad'"""
+
+    def __init__(self, bad='{{bad}}'):
+        self.bad = bad
+        self.calls = []
+
+    def __call__(self, requests):
+        self.calls.append(requests)
+        if any(request.get('replaceAllText', {}).get('containsText', {}).get('text') == self.bad for request in requests):
+            raise RuntimeError('Invalid requests[1]')
+        return {'replies': [{'replaceAllText': {'occurrencesChanged': 0}} for _ in requests]}
+
+
+def test_requests_are_committed_by_phase_then_staging_order():
+    plan = DeckMutationPlan('deck', max_requests_per_batch=2)
+    plan.add([{'updateTextStyle': {'objectId': 'e1', 'fields': 'bold'}}], stage='style')
+    plan.add([{'deleteObject': {'objectId': 's2'}}, replace('{{a}}')], stage='text')
+    assert [entry['kind'] for entry in plan.ordered_entries()] == ['replaceAllText', 'deleteObject', 'updateTextStyle']
+    assert [len(batch) for batch in plan.batches()] == [2, 1]
+
+
+def test_a_rejected_batch_only_loses_the_failing_stage():
+    plan = DeckMutationPlan('deck')
+    plan.add([replace('{{a}}'), replace('{{b}}')], stage='text')
+    bad = plan.add([replace('{{bad}}')], stage='conclusion')
+    plan.add([replace('{{c}}')], stage='special_styling')
+    execute = FakeExecute()
+    assert plan.commit(execute) is False  # The snapshot applied requests the server rejected
+    assert len(execute.calls) == 4  # The whole batch, then one call per stage
+    assert list(plan.failed_stages) == ['conclusion']
+    assert isinstance(bad[0]['error'], RuntimeError)
+    assert plan.committed_requests == 3
+    assert plan.entries == []
+
+
+def test_commit_raises_when_nothing_could_be_applied():
+    plan = DeckMutationPlan('deck')
+    plan.add([replace('{{bad}}')], stage='text')
+    with pytest.raises(RuntimeError):
+        plan.commit(FakeExecute())
+    assert plan.failed_stages == {'text': 'Invalid requests[1]'}
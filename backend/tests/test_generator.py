@@ -0,0 +1,128 @@
+"""
+Tests for ContentGenerator helpers that do not need a Gemini API key
+"""
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from core import generator as generator_module
+from core.generator import EMOJI_DATABASE, EMOJI_INDEX, FALLBACK_EMOJIS, LOGO_CATEGORY_MAPPING, ContentGenerator
+
+
+def make_generator():
+    generator = ContentGenerator.__new__(ContentGenerator)
+    generator.logger = logging.getLogger("test_generator")
+    generator.emoji_cache = {}
+    generator.emoji_selection_log = []
+    generator._emoji_context_scores = {}
+    generator._record_token_usage = lambda response, label=None: None
+    return generator
+
+
+def theme_response(payload):
+    part = SimpleNamespace(text=json.dumps(payload))
+    candidate = SimpleNamespace(safety_ratings=[], content=SimpleNamespace(parts=[part]))
+    return SimpleNamespace(candidates=[candidate])
+
+
+def test_theme_generation_retries_after_a_non_api_error(monkeypatch):
+    generator = make_generator()
+    monkeypatch.setattr(generator_module.gemini_client, "wait_before_retry", lambda attempt: 0.0)
+    calls = []
+
+    def generate_text(prompt, generation_config=None, label=None, use_cache=True, validate=None):
+        calls.append(use_cache)
+        if len(calls) == 1:
+            raise ValueError("malformed response")
+        return theme_response({"primary_color": "#123456", "secondary_color": "#654321", "accent_color": "#abcdef"})
+
+    generator._generate_text = generate_text
+    theme = generator._generate_theme_from_company_name("Acme")
+    assert calls == [True, False]  # The retry bypasses the response cache
+    assert theme["primary_color"] == "#123456"
+
+
+def test_theme_generation_does_not_retry_rate_limit_errors(monkeypatch):
+    generator = make_generator()
+    monkeypatch.setattr(generator_module.gemini_client, "wait_before_retry", lambda attempt: 0.0)
+    calls = []
+
+    def generate_text(prompt, generation_config=None, label=None, use_cache=True, validate=None):
+        calls.append(label)
+        raise google_exceptions.ResourceExhausted("quota exceeded")
+
+    generator._generate_text = generate_text
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        generator._generate_theme_from_company_name("Acme")
+    assert len(calls) == 1
+
+
+def test_theme_responses_are_only_cached_when_they_parse_as_json():
+    assert generator_module._is_json_object('```json\n{"primary_color": "#123456"}\n```')
+    with pytest.raises(ValueError):
+        generator_module._is_json_object('{"primary_color": "#1234')  # Truncated
+
+
+EMOJI_CONTEXTS = [
+    "Cloud data platform migration with analytics dashboards and machine learning",
+    "Mobile banking app: payments, security, fraud detection and customer growth",
+    "Strategy roadmap planning for renewable energy and solar power innovation",
+    "data data data analytics analytical dashboard dashboards metrics",
+    "Healthcare patient portal",
+    "zzzz qqqq",
+]
+
+
+@pytest.mark.parametrize("context", EMOJI_CONTEXTS)
+def test_emoji_index_scores_match_the_full_scan(context):
+    generator = make_generator()
+    words = generator.preprocess_text(context)
+    scores = EMOJI_INDEX.score(words)
+    for emoji, data in EMOJI_DATABASE.items():
+        assert scores.get(emoji, 0.0) == generator.calculate_emoji_score(words, data)
+
+
+@pytest.mark.parametrize("context", EMOJI_CONTEXTS)
+def test_emoji_index_ranking_matches_the_full_scan(context):
+    generator = make_generator()
+    words = generator.preprocess_text(context)
+    for placeholder in LOGO_CATEGORY_MAPPING:
+        candidates = generator.filter_emojis_by_category(placeholder)
+        legacy = sorted(
+            ((emoji, generator.calculate_emoji_score(words, data)) for emoji, data in candidates.items()),
+            key=lambda item: item[1], reverse=True
+        )
+        assert EMOJI_INDEX.rank(EMOJI_INDEX.score(words), candidates) == legacy
+
+
+def test_emoji_candidates_are_filtered_by_category_in_database_order():
+    candidates = EMOJI_INDEX.candidates(["data_analytics", "strategy"])
+    expected = [
+        emoji for emoji, data in EMOJI_DATABASE.items()
+        if {"data_analytics", "strategy"} & set(data.get("categories", []))
+    ]
+    assert list(candidates) == expected
+    assert EMOJI_INDEX.candidates(["data_analytics", "strategy"]) is candidates
+    assert EMOJI_INDEX.candidates(["no_such_category"]) == {}
+
+
+def test_select_emoji_deterministic_falls_back_without_context_or_matches():
+    generator = make_generator()
+    assert generator.select_emoji_deterministic("", "", "logo_2") == FALLBACK_EMOJIS["logo_2"]
+    assert generator.select_emoji_deterministic("zzzz qqqq", "xxxx yyyy wwww", "logo_3") == FALLBACK_EMOJIS["logo_3"]
+    assert generator.emoji_selection_log == []
+
+
+def test_select_emoji_deterministic_picks_the_top_ranked_candidate():
+    generator = make_generator()
+    name, description = "Acme Analytics", "Data analytics dashboards and metrics reporting"
+    emoji = generator.select_emoji_deterministic(name, description, "logo_2")
+    words = generator.preprocess_text(f"{name} {description}")
+    ranked = EMOJI_INDEX.rank(EMOJI_INDEX.score(words), generator.filter_emojis_by_category("logo_2"))
+    assert ranked[0][1] > 0 and emoji == ranked[0][0]
+    assert generator.emoji_selection_log[-1]["emoji"] == emoji
+    assert generator.select_emoji_deterministic(name, description, "logo_2") == emoji
+    assert len(generator.emoji_selection_log) == 1
@@ -0,0 +1,50 @@
+"""
+Tests for the Google API service registry (bundled discovery documents, no network)
+"""
+import threading
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+from core import slides_client as slides_client_module
+from core.slides_client import SlidesClient
+from utils import google_services
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    google_services.reset()
+    yield
+    google_services.reset()
+
+
+def test_each_call_gets_its_own_service_and_connection(monkeypatch):
+    builds = []
+    real_build = google_services.build
+    monkeypatch.setattr(google_services, 'build', lambda *args, **kwargs: builds.append(args) or real_build(*args, **kwargs))
+    credentials = AnonymousCredentials()
+    first = google_services.get_service('drive', 'v3', credentials)
+    second = google_services.get_service('drive', 'v3', credentials)
+    assert first is not second
+    assert first._http is not second._http and first._http.http is not second._http.http
+    assert len(builds) == 1  # The discovery document is parsed once
+
+
+def test_clients_built_on_one_thread_do_not_share_services(monkeypatch):
+    credentials = AnonymousCredentials()  # One process-wide credentials object, as in the app
+    monkeypatch.setattr(slides_client_module, 'get_credentials', lambda: credentials)
+    a, b = SlidesClient(), SlidesClient()
+    assert a.service is not b.service
+    assert a.drive_service is not b.drive_service
+    assert a.service._http.http is not b.service._http.http
+
+
+def test_upload_threads_get_their_own_drive_service(monkeypatch):
+    monkeypatch.setattr(slides_client_module, 'get_credentials', AnonymousCredentials)
+    client = SlidesClient()
+    services = []
+    thread = threading.Thread(target=lambda: services.append(client._thread_drive_service()))
+    thread.start()
+    thread.join()
+    assert client._thread_drive_service() is client._thread_drive_service()
+    assert services[0] is not client._thread_drive_service()
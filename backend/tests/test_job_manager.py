@@ -0,0 +1,123 @@
+"""
+Tests for the job manager: request coalescing and job listing
+"""
+import threading
+import time
+
+from utils.job_manager import JobManager, request_hash
+from utils.job_store import MemoryJobStore
+
+
+class SlowJobStore(MemoryJobStore):
+    """Memory store whose saves take a while, to widen race windows"""
+
+    def save(self, record):
+        time.sleep(0.05)
+        super().save(record)
+
+
+def test_concurrent_identical_submissions_share_one_job():
+    manager = JobManager(worker_count=1, store=SlowJobStore())
+    params = {"context": "Acme", "profile": "company"}
+    digest = request_hash("generate", params)
+    barrier = threading.Barrier(8)
+    results = []
+    lock = threading.Lock()
+
+    def submit():
+        barrier.wait()
+        job, created = manager.create_or_attach("generate", dict(params), request_hash=digest)
+        with lock:
+            results.append((job.id, created))
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({job_id for job_id, _ in results}) == 1
+    assert sum(1 for _, created in results if created) == 1
+
+
+def test_concurrent_submissions_with_same_idempotency_key_share_one_job():
+    manager = JobManager(worker_count=1, store=SlowJobStore())
+    barrier = threading.Barrier(6)
+    job_ids = []
+
+    def submit(index):
+        barrier.wait()
+        job, _ = manager.create_or_attach("generate", {"context": f"Acme {index}"}, idempotency_key="key-1")
+        job_ids.append(job.id)
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(job_ids)) == 1
+
+
+def test_failed_save_releases_the_reservation():
+    class FailingOnceStore(MemoryJobStore):
+        failed = False
+
+        def save(self, record):
+            if not self.failed:
+                self.failed = True
+                raise RuntimeError("disk full")
+            super().save(record)
+
+    manager = JobManager(worker_count=1, store=FailingOnceStore())
+    digest = request_hash("generate", {"context": "Acme"})
+    try:
+        manager.create_or_attach("generate", {"context": "Acme"}, request_hash=digest, idempotency_key="key-1")
+    except RuntimeError:
+        pass
+    job, created = manager.create_or_attach("generate", {"context": "Acme"}, request_hash=digest, idempotency_key="key-1")
+    assert created
+    assert manager.get(job.id) is job
+
+
+def test_list_reports_running_jobs_with_their_current_status():
+    manager = JobManager(worker_count=1, store=MemoryJobStore())
+    started = threading.Event()
+    release = threading.Event()
+    job, _ = manager.create_or_attach("generate", {"context": "Acme"})
+
+    def task():
+        job.status = "running"
+        started.set()
+        release.wait(5)
+        job.status = "succeeded"
+
+    manager.submit(job, task)
+    assert started.wait(5)
+    try:
+        assert [j["id"] for j in manager.list(status="queued")] == []
+        running = manager.list(status="running")
+        assert [j["id"] for j in running] == [job.id]
+        assert all(j["status"] == "running" for j in manager.list())
+    finally:
+        release.set()
+
+
+def test_finished_jobs_are_listed_from_the_store():
+    manager = JobManager(worker_count=1, store=MemoryJobStore())
+    job, _ = manager.create_or_attach("generate", {"context": "Acme"})
+    done = threading.Event()
+
+    def task():
+        job.status = "succeeded"
+        done.set()
+
+    manager.submit(job, task)
+    assert done.wait(5)
+    for _ in range(100):
+        if manager.list(status="succeeded"):
+            break
+        time.sleep(0.01)
+    assert [j["id"] for j in manager.list(status="succeeded")] == [job.id]
+    assert manager.list(status="queued") == []
+
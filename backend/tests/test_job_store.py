@@ -0,0 +1,70 @@
+"""
+Tests for the job store backends (memory and SQLite)
+"""
+import pytest
+
+from utils.job_store import JobStore, MemoryJobStore, SQLiteJobStore
+
+
+def make_record(job_id, status="queued", created_at=100.0, completed_at=None, kind="generate"):
+    return {
+        "id": job_id, "kind": kind, "status": status, "params": {"context": "Acme"}, "priority": 0,
+        "result": None, "error": None, "created_at": created_at, "started_at": None,
+        "completed_at": completed_at, "log_seq": 1, "log_lines_dropped": 0, "logs": [[1, "line"]],
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobStore(str(tmp_path / "jobs.db"))
+    return MemoryJobStore()
+
+
+def test_save_load_and_delete(store):
+    store.save(make_record("a"))
+    loaded = store.load("a")
+    assert loaded["params"] == {"context": "Acme"}
+    assert loaded["logs"] == [[1, "line"]]
+    store.delete("a")
+    assert store.load("a") is None
+
+
+def test_query_filters_newest_first_without_logs(store):
+    store.save(make_record("a", created_at=1.0))
+    store.save(make_record("b", status="succeeded", created_at=2.0, completed_at=3.0))
+    store.save(make_record("c", created_at=3.0, kind="batch"))
+    assert [r["id"] for r in store.query()] == ["c", "b", "a"]
+    assert [r["id"] for r in store.query(status="queued")] == ["c", "a"]
+    assert [r["id"] for r in store.query(kind="batch")] == ["c"]
+    assert [r["id"] for r in store.query(created_after=2.0)] == ["c", "b"]
+    assert all("logs" not in r for r in store.query())
+
+
+def test_evict_keeps_active_jobs(store):
+    store.save(make_record("old", status="succeeded", completed_at=10.0))
+    store.save(make_record("new", status="failed", completed_at=20.0))
+    store.save(make_record("newest", status="cancelled", completed_at=30.0))
+    store.save(make_record("running", status="running"))
+    assert store.evict(finished_before=15.0) == 1
+    assert store.evict(max_finished=1) == 1
+    assert {r["id"] for r in store.query()} == {"newest", "running"}
+
+
+def test_sqlite_marks_interrupted_jobs_failed(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    store.save(make_record("a", status="running"))
+    store.save(make_record("b", status="succeeded", completed_at=5.0))
+    assert SQLiteJobStore(path).mark_interrupted() == 1
+    assert store.load("a")["status"] == "failed"
+    assert store.load("b")["status"] == "succeeded"
+
+
+def test_incomplete_job_store_fails_on_creation():
+    class PartialStore(JobStore):
+        def save(self, record):
+            pass
+
+    with pytest.raises(TypeError):
+        PartialStore()
@@ -0,0 +1,59 @@
+"""
+Tests for the template analysis cache and report filtering
+"""
+import core  # noqa: F401  (core.automation imports the analyzer; import core first, as the app does)
+from utils.placeholder_analyzer import TemplateAnalysisCache, analyze_presentation, filter_report, template_analysis_cache
+
+
+class FakeClient:
+    def __init__(self, documents, sources):
+        self.documents = documents
+        self.sources = sources
+        self.fetches = 0
+
+    def copy_source(self, presentation_id):
+        return self.sources.get(presentation_id)
+
+    def get_presentation(self, presentation_id):
+        self.fetches += 1
+        return self.documents[presentation_id]
+
+
+def test_cached_report_has_the_same_shape_as_a_cold_one():
+    template_analysis_cache.clear()
+    revision = {"file_id": "template", "version": "7", "modifiedTime": "2026-01-01T00:00:00Z"}
+    client = FakeClient(
+        {"copy-a": {"title": "Deck A", "slides": []}, "copy-b": {"title": "Deck B", "slides": []}},
+        {"copy-a": dict(revision, title="Deck A"), "copy-b": dict(revision, title="Deck B")},
+    )
+    cold = analyze_presentation("copy-a", client=client)
+    warm = analyze_presentation("copy-b", client=client)
+    assert client.fetches == 1
+    assert set(warm) == set(cold)
+    assert warm["title"] == "Deck B"
+    assert warm["presentationId"] == "copy-b"
+    template_analysis_cache.clear()
+
+
+def test_cache_keeps_the_stored_title_when_the_copy_title_is_unknown():
+    cache = TemplateAnalysisCache(max_entries=2)
+    revision = {"file_id": "template", "version": "1", "modifiedTime": None}
+    cache.put(revision, {"presentationId": "copy-a", "title": "Deck A", "placeholders": []})
+    report = cache.get(revision, "copy-b")
+    assert report == {"presentationId": "copy-b", "title": "Deck A", "placeholders": []}
+
+
+def test_cache_evicts_least_recently_used_revisions():
+    cache = TemplateAnalysisCache(max_entries=2)
+    revisions = [{"file_id": "template", "version": str(n), "modifiedTime": None} for n in range(3)]
+    for revision in revisions:
+        cache.put(revision, {"presentationId": "copy", "placeholders": []})
+    assert cache.get(revisions[0], "copy") is None
+    assert cache.get(revisions[2], "copy") is not None
+
+
+def test_filter_report_drops_placeholders_on_removed_slides():
+    report = {"placeholders": [{"slide_id": "s1"}, {"slide_id": "s2"}, {"slide_id": "s3"}]}
+    filtered = filter_report(report, removed_slide_ids=["s1"], remaining_slide_ids=["s2"])
+    assert filtered["placeholders"] == [{"slide_id": "s2"}]
+    assert len(report["placeholders"]) == 3
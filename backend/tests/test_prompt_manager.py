@@ -0,0 +1,65 @@
+"""
+Tests for prompt key normalization and lookup in the prompt registry
+"""
+import re
+
+import pytest
+
+from utils.prompt_manager import normalize_prompt_key, prompt_manager
+
+
+def legacy_lookup(prompts, placeholder_type):
+    """Key found by the variation lookup generate_content used before the registry"""
+    snake = re.sub(r'(?<!^)(?=[A-Z])', '_', placeholder_type.replace(' ', '_').replace('-', '_')).lower()
+    variations = [
+        placeholder_type,
+        placeholder_type.replace(' ', '_'),
+        placeholder_type.replace('-', '_'),
+        placeholder_type.lower(),
+        snake,
+        snake.title(),
+        snake.capitalize(),
+    ]
+    return next((variation for variation in variations if prompts.get(variation)), None)
+
+
+@pytest.mark.parametrize("key, expected", [
+    ("DAYS", "days"),
+    ("TEAM", "team"),
+    ("POINTS_4", "points_4"),
+    ("S_R_DESC_3", "s_r_desc_3"),
+    ("points_4", "points_4"),
+    ("projectName", "project_name"),
+    ("side-Heading 1", "side_heading_1"),
+    ("Head1Para", "head1_para"),
+])
+def test_normalize_prompt_key(key, expected):
+    assert normalize_prompt_key(key) == expected
+
+
+@pytest.mark.parametrize("key", ["DAYS", "days", "Days", "POINTS_4", "points_4", "Points_4", "TEAM", "team"])
+def test_all_caps_and_snake_case_names_resolve(key):
+    compiled = prompt_manager._compiled['text_prompts']
+    expected = legacy_lookup(prompt_manager.prompts['text_prompts'], key)
+    if expected is None:
+        pytest.skip(f"no text prompt for {key}")
+    prompt = prompt_manager.find_prompt('text_prompts', key)
+    assert prompt is compiled[expected]
+
+
+def test_lookup_resolves_every_name_the_legacy_lookup_resolved():
+    prompts = prompt_manager.prompts['text_prompts']
+    variants = set()
+    for key in prompts:
+        parts = re.split(r'[_\s-]+', key)
+        camel = parts[0].lower() + ''.join(part.capitalize() for part in parts[1:])
+        variants.update([
+            key, key.upper(), key.lower(), key.title(), key.capitalize(), key.replace('_', ' '),
+            key.replace('_', '-'), camel, camel[:1].upper() + camel[1:], key.upper().replace('_', ' '),
+        ])
+    for variant in sorted(variants):
+        expected = legacy_lookup(prompts, variant)
+        if expected is None:
+            continue
+        prompt = prompt_manager.find_prompt('text_prompts', variant)
+        assert prompt is not None and prompt.key == expected, variant
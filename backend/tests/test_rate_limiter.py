@@ -0,0 +1,59 @@
+"""
+Tests for the token bucket rate limiter
+"""
+from utils import rate_limiter
+from utils.rate_limiter import RateLimiter, get_rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def install_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_burst_passes_without_waiting_then_requests_are_paced(monkeypatch):
+    clock = install_clock(monkeypatch)
+    limiter = RateLimiter(60, burst=3)  # one request per second after the burst
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    waited = limiter.acquire()
+    assert abs(waited - 1.0) < 1e-9
+    assert clock.sleeps == [waited]
+
+
+def test_tokens_refill_up_to_the_burst_capacity(monkeypatch):
+    clock = install_clock(monkeypatch)
+    limiter = RateLimiter(120, burst=2)
+    limiter.acquire()
+    limiter.acquire()
+    clock.now += 60  # far more than needed to refill
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() > 0
+
+
+def test_zero_limit_disables_limiting(monkeypatch):
+    clock = install_clock(monkeypatch)
+    limiter = RateLimiter(0)
+    assert all(limiter.acquire() == 0.0 for _ in range(100))
+    assert clock.sleeps == []
+
+
+def test_limiters_are_shared_per_name():
+    first = get_rate_limiter("test.shared-limiter", requests_per_minute=30)
+    second = get_rate_limiter("test.shared-limiter", requests_per_minute=999)
+    assert first is second
+    assert first.requests_per_minute == 30
@@ -0,0 +1,97 @@
+"""
+Tests for the Gemini response cache
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils import gemini_client as gemini_client_module
+from utils import response_cache as response_cache_module
+from utils.gemini_client import gemini_client
+from utils.response_cache import ResponseCache
+
+
+def text_response(text, tokens=10, probability="LOW"):
+    rating = SimpleNamespace(probability=probability)
+    part = SimpleNamespace(text=text)
+    candidate = SimpleNamespace(content=SimpleNamespace(parts=[part]), safety_ratings=[rating])
+    return SimpleNamespace(candidates=[candidate], usage_metadata=SimpleNamespace(total_token_count=tokens))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(path=str(tmp_path / "responses.sqlite3"), ttl_seconds=60, max_bytes=1000)
+
+
+def test_make_key_is_stable_and_skips_non_text_prompts():
+    config = {"temperature": 0.3, "top_p": 0.8}
+    key = ResponseCache.make_key("model", config, "prompt")
+    assert key == ResponseCache.make_key("model", {"top_p": 0.8, "temperature": 0.3}, ["prompt"])
+    assert key != ResponseCache.make_key("model", config, "other prompt")
+    assert key != ResponseCache.make_key("other-model", config, "prompt")
+    assert ResponseCache.make_key("model", config, ["text", object()]) is None
+
+
+def test_round_trip_records_saved_tokens(cache):
+    key = cache.make_key("model", None, "prompt")
+    assert cache.put(key, "model", text_response("hello", tokens=42))
+    cached = cache.get(key)
+    assert cached.text == "hello" and cached.from_cache
+    assert cached.saved_tokens == 42
+    assert cached.usage_metadata is None
+
+
+def test_blocked_responses_are_not_cached(cache):
+    key = cache.make_key("model", None, "prompt")
+    assert not cache.put(key, "model", text_response("unsafe", probability="HIGH"))
+    assert cache.get(key) is None
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    key = cache.make_key("model", None, "prompt")
+    cache.put(key, "model", text_response("hello"))
+    now = response_cache_module.time.time()
+    monkeypatch.setattr(response_cache_module.time, "time", lambda: now + 61)
+    assert cache.get(key) is None
+
+
+def test_least_recently_used_entries_are_evicted_above_max_bytes(cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(response_cache_module.time, "time", lambda: clock[0])
+    keys = [cache.make_key("model", None, f"prompt {n}") for n in range(3)]
+    for key in keys[:2]:
+        clock[0] += 1
+        cache.put(key, "model", text_response("x" * 400))
+    clock[0] += 1
+    cache.get(keys[0])  # keys[1] is now the least recently used
+    clock[0] += 1
+    cache.put(keys[2], "model", text_response("x" * 400))
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+
+
+def test_cache_mode_off_never_reads_the_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(response_cache_module.response_cache, "get", lambda key: calls.append(key))
+    monkeypatch.setattr(gemini_client, "_generate_with_retries", lambda *args, **kwargs: text_response("fresh"))
+    response = gemini_client.generate("model", "prompt")
+    assert response.candidates[0].content.parts[0].text == "fresh"
+    assert calls == []
+
+
+def test_responses_rejected_by_the_caller_are_not_stored(cache, monkeypatch):
+    monkeypatch.setattr(gemini_client_module, "response_cache", cache)
+    monkeypatch.setattr(gemini_client, "_generate_with_retries", lambda *args, **kwargs: text_response('{"trunc'))
+    gemini_client.generate("model", "prompt", cache_mode="readwrite", validate=lambda text: json.loads(text))
+    assert cache.get(cache.make_key("model", None, "prompt")) is None
+
+
+def test_cached_responses_rejected_by_the_caller_are_evicted_and_refetched(cache, monkeypatch):
+    monkeypatch.setattr(gemini_client_module, "response_cache", cache)
+    key = cache.make_key("model", None, "prompt")
+    cache.put(key, "model", text_response("not json"))
+    monkeypatch.setattr(gemini_client, "_generate_with_retries", lambda *args, **kwargs: text_response('{"ok": 1}'))
+    response = gemini_client.generate("model", "prompt", cache_mode="readwrite", validate=json.loads)
+    assert not getattr(response, "from_cache", False)
+    assert cache.get(key).text == '{"ok": 1}'
@@ -0,0 +1,58 @@
+"""
+Tests for the job event stream (/jobs/{id}/events)
+"""
+import asyncio
+import inspect
+import threading
+import time
+
+import server
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after=None):
+        self.headers = {}
+        self.checks = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.disconnect_after is not None and self.checks > self.disconnect_after
+
+
+async def collect(iterator, limit=50):
+    chunks = []
+    async for chunk in iterator:
+        chunks.append(chunk)
+        if len(chunks) >= limit:
+            break
+    return chunks
+
+
+def test_stream_is_async_and_ends_with_the_job(monkeypatch):
+    monkeypatch.setattr(server, "SSE_POLL_SECONDS", 0.01)
+    job = server.job_manager.create("generate", {"context": "Acme"})
+    job.append_log("first line")
+    response = server.stream_job_events(job.id, FakeRequest())
+    assert inspect.isasyncgen(response.body_iterator)
+
+    def finish():
+        time.sleep(0.05)
+        job.append_log("second line")
+        job.status = "succeeded"
+
+    threading.Thread(target=finish).start()
+    chunks = asyncio.run(collect(response.body_iterator))
+    text = "".join(chunks)
+    assert "first line" in text and "second line" in text
+    assert chunks[-1].startswith("event: end")
+
+
+def test_stream_stops_when_the_client_disconnects(monkeypatch):
+    monkeypatch.setattr(server, "SSE_POLL_SECONDS", 0.01)
+    job = server.job_manager.create("generate", {"context": "Acme"})
+    request = FakeRequest(disconnect_after=3)
+    response = server.stream_job_events(job.id, request)
+    chunks = asyncio.run(asyncio.wait_for(collect(response.body_iterator), timeout=5))
+    assert chunks and chunks[0].startswith("event: status")
+    assert request.checks == 4
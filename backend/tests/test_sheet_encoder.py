@@ -0,0 +1,52 @@
+"""
+Tests for the compact, token-budgeted sheet encoding used in Gemini prompts
+"""
+from utils.sheet_encoder import column_letter, encode_run_lengths, encode_sheets_compact, estimate_tokens
+
+HEADER_PAD = [''] * 9
+
+
+def large_sheet(task_rows=400):
+    rows = [
+        ['Project estimate'],
+        HEADER_PAD + [f'W{w}' if d == 1 else '' for w in range(1, 21) for d in range(1, 6)],
+        HEADER_PAD + [f'W{w}D{d}' for w in range(1, 21) for d in range(1, 6)],
+    ]
+    for index in range(task_rows):
+        phase = ('Planning', 'Design', 'Development', 'Testing')[index * 4 // task_rows] if index % 25 == 0 else ''
+        hours = [''] * 100
+        hours[index % 100] = '4'
+        rows.append(['', '', f'Task {index}', phase, '', '', '', '', f'Person {index % 7}'] + hours)
+    return [['=== DATA FROM SHEET: Effort Estimation ===']] + rows
+
+
+def test_column_letter():
+    assert [column_letter(i) for i in (0, 9, 25, 26, 27, 701, 702)] == ['A', 'J', 'Z', 'AA', 'AB', 'ZZ', 'AAA']
+
+
+def test_run_length_encoding_collapses_gaps_and_drops_trailing_blanks():
+    assert encode_run_lengths(['', '', '4', '0', '', '8', 4.0, '', '']) == '~2 4 ~2 8 4'
+    assert encode_run_lengths(['', '0', None]) == ''
+
+
+def test_encoding_fits_the_budget_and_summarizes_the_rest():
+    text, stats = encode_sheets_compact(large_sheet(), token_budget=2000)
+    assert stats['after_tokens'] == estimate_tokens(text)
+    assert stats['after_tokens'] < stats['before_tokens']
+    assert stats['rows_summarized'] > 0
+    assert 'SUMMARIZED' in text
+    # Data rows stop at the budget; only the header and the per-(phase, owner) summary follow
+    assert stats['after_tokens'] < 2000 + 400
+
+
+def test_summary_keeps_the_total_hours():
+    text, stats = encode_sheets_compact(large_sheet(), token_budget=1000)
+    summary = text[text.index('SUMMARIZED'):].splitlines()[1:]
+    summarized_hours = sum(float(line.split('\t')[3]) for line in summary if line.count('\t') == 3)
+    assert summarized_hours == 4 * stats['rows_summarized']
+
+
+def test_small_sheet_is_not_summarized():
+    text, stats = encode_sheets_compact(large_sheet(task_rows=10), token_budget=8000)
+    assert stats['rows_summarized'] == 0
+    assert 'Task 9' in text
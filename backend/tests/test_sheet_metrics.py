@@ -0,0 +1,63 @@
+"""
+Tests for the local project metrics computed from the effort estimation sheet
+"""
+from utils.sheet_metrics import compute_effort_metrics, compute_project_metrics, fill_phases, split_sheets, to_hours
+
+HEADER_PAD = [''] * 9
+
+
+def estimation_rows():
+    """Effort estimation grid: title rows, week header (J onwards), day header, then tasks"""
+    return [
+        ['Project estimate'],
+        [],
+        HEADER_PAD + ['W1', '', '', '', '', 'W2', '', '', '', ''],
+        HEADER_PAD + [f'W{w}D{d}' for w in (1, 2) for d in range(1, 6)],
+        ['', '', '', 'Planning', '', '', '', '', 'Alice', '4', '4'],
+        ['', '', '', '', '', '', '', '', 'Bob', '2'],
+        [],
+        ['', '', '', 'Design', '', '', '', '', 'Alice', '8', '', '3'],
+        ['', '', '', 'Development', '', '', '', '', 'Carol', '10', '10', '10'],
+        ['', '', '', 'Testing & QA', '', '', '', '', 'Dan', '1,5', 'n/a'],
+    ]
+
+
+def test_to_hours_parses_numbers_and_ignores_text():
+    assert to_hours('1,5') == 15.0
+    assert to_hours(' 2.5 ') == 2.5
+    assert to_hours(3) == 3.0
+    assert to_hours('n/a') == 0.0
+    assert to_hours(None) == 0.0
+
+
+def test_merged_phase_cells_are_forward_filled():
+    phases = fill_phases(estimation_rows())
+    assert phases[5] == 'Planning'
+    assert phases[6] == 'Planning'
+    assert phases[9] == 'Testing & QA'
+
+
+def test_effort_metrics():
+    metrics = compute_effort_metrics(estimation_rows())
+    # 10 Planning + 11 Design + 30 Development + 15 Testing = 66 hours
+    assert metrics['days'] == '10'
+    assert metrics['p_b'] == f"{10 / 66 * 100:.2f}%"
+    assert metrics['d_b'] == f"{11 / 66 * 100:.2f}%"
+    assert metrics['d_v'] == f"{30 / 66 * 100:.2f}%"
+    assert metrics['d_p'] == f"{15 / 66 * 100:.2f}%"
+    assert metrics['top_resources'] == ['Carol', 'Alice', 'Dan', 'Bob', '', '']
+    assert metrics['unmapped_hours'] == 0.0
+
+
+def test_unrecognized_layout_returns_none():
+    assert compute_effort_metrics([['name', 'value'], ['budget', '100']]) is None
+
+
+def test_project_metrics_prefer_the_effort_estimation_sheet():
+    other = [[cell.replace('Carol', 'Zoe') for cell in row] for row in estimation_rows()]
+    combined = (
+        [['=== DATA FROM SHEET: Investment Breakup ===']] + other
+        + [['=== DATA FROM SHEET: Effort Estimation ===']] + estimation_rows()
+    )
+    assert [name for name, _ in split_sheets(combined)] == ['Investment Breakup', 'Effort Estimation']
+    assert compute_project_metrics(combined)['top_resources'][0] == 'Carol'
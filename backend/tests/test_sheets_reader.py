@@ -0,0 +1,164 @@
+"""
+Tests for the paged Google Sheets reader (with an in-memory Sheets API fake)
+"""
+import logging
+import re
+
+import pytest
+
+import config
+from utils import sheets_reader as sheets_reader_module
+from utils.project_analyzer import ProjectAnalyzer
+from utils.sheet_metrics import EffortAggregator, compute_effort_metrics
+from utils.sheets_reader import SheetValuesCache, SheetsReader, quote_sheet_name
+
+from test_sheet_metrics import estimation_rows
+
+RANGE = re.compile(r"^'(?P<name>(?:[^']|'')+)'!A(?P<start>\d+):[A-Z]+(?P<end>\d+)$")
+
+
+class Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeSheetsService:
+    """Serves spreadsheets.get (grid sizes) and values.batchGet from {sheet name: rows}"""
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.batch_ranges = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, fields):
+        return Request({'sheets': [
+            {'properties': {'title': name, 'gridProperties': {
+                'rowCount': len(rows), 'columnCount': max(len(row) for row in rows)}}}
+            for name, rows in self.sheets.items()
+        ]})
+
+    def batchGet(self, spreadsheetId, ranges, fields):
+        self.batch_ranges.append(ranges)
+        value_ranges = []
+        for a1_range in ranges:
+            match = RANGE.match(a1_range)
+            rows = self.sheets[match['name'].replace("''", "'")][int(match['start']) - 1:int(match['end'])]
+            rows = [list(row) for row in rows]
+            while rows and not rows[-1]:
+                rows.pop()  # The API omits trailing empty rows
+            value_ranges.append({'values': rows} if rows else {})
+        return Request({'valueRanges': value_ranges})
+
+
+class FakeDriveService:
+    def __init__(self, modified_time='2026-01-01T00:00:00Z'):
+        self.modified_time = modified_time
+
+    def files(self):
+        return self
+
+    def get(self, fileId, fields, supportsAllDrives):
+        return Request({'name': 'Estimate', 'mimeType': 'application/vnd.google-apps.spreadsheet',
+                        'modifiedTime': self.modified_time})
+
+
+def make_reader(sheets):
+    reader = SheetsReader.__new__(SheetsReader)
+    reader.logger = logging.getLogger('test_sheets_reader')
+    reader.service = FakeSheetsService(sheets)
+    reader.drive_service = FakeDriveService()
+    reader.sheets_id = None
+    reader.linked_placeholders = config.SHEET_LINKED_PLACEHOLDERS + ['client_name']
+    reader.cache = {}
+    analyzer = ProjectAnalyzer.__new__(ProjectAnalyzer)
+    analyzer.logger = logging.getLogger('test_project_analyzer')
+    analyzer.gemini_available = False
+    reader.project_analyzer = analyzer
+    return reader
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(sheets_reader_module, 'SHEETS_PAGE_ROWS', 3)
+    sheets_reader_module.sheet_values_cache.clear()
+
+
+def test_quote_sheet_name():
+    assert quote_sheet_name("Effort Estimation") == "'Effort Estimation'"
+    assert quote_sheet_name("Bob's sheet") == "'Bob''s sheet'"
+
+
+@pytest.mark.parametrize("page_rows", [1, 2, 3, 4, 7, 100])
+def test_paged_blocks_give_the_same_metrics_as_the_full_sheet(monkeypatch, page_rows):
+    monkeypatch.setattr(sheets_reader_module, 'SHEETS_PAGE_ROWS', page_rows)
+    reader = make_reader({'Effort Estimation': estimation_rows()})
+    sheets = reader._resolve_sheets('sheet-id', ['Effort Estimation'])
+    aggregator = EffortAggregator()
+    rows = []
+    for name, block in reader.iter_row_blocks('sheet-id', sheets):
+        assert len(block) <= page_rows
+        aggregator.feed(block)
+        rows.extend(block)
+    assert aggregator.result() == compute_effort_metrics(estimation_rows())
+    assert len(rows) == len(estimation_rows())
+
+
+def test_pages_cover_all_sheets_in_one_batch_get_each():
+    reader = make_reader({'Effort Estimation': estimation_rows(), "Bob's notes": [['client_name', 'Acme']]})
+    sheets = reader._resolve_sheets('sheet-id', ['Effort Estimation', "Bob's notes"], explicit=True)
+    list(reader.iter_row_blocks('sheet-id', sheets))
+    assert reader.service.batch_ranges[0] == ["'Effort Estimation'!A1:S3", "'Bob''s notes'!A1:B1"]
+    # The one-row sheet is done after the first page
+    assert all(len(ranges) == 1 for ranges in reader.service.batch_ranges[1:])
+
+
+def test_fetch_combines_manual_values_and_local_metrics_and_caches_them():
+    rows = [['client_name', 'Acme'], ['days', '99']] + estimation_rows()
+    reader = make_reader({'Effort Estimation': rows})
+    values = reader.fetch_placeholder_values('sheet-id', sheet_names=['Effort Estimation'])
+    assert values['client_name'] == 'Acme'
+    assert values['days'] == '10 Days'  # Analysis-based placeholders ignore manual entries
+    assert values['p_r_1'] == 'Carol'
+
+    again = make_reader({'Effort Estimation': rows})
+    assert again.fetch_placeholder_values('sheet-id', sheet_names=['Effort Estimation']) == values
+    assert again.service.batch_ranges == []  # Served from the revision-keyed cache
+
+
+def test_missing_default_sheet_falls_back_to_the_first_available():
+    reader = make_reader({'Sheet1': estimation_rows()})
+    assert list(reader._resolve_sheets('sheet-id', ['Effort Estimation', 'Investment Breakup'])) == ['Sheet1']
+    assert reader._resolve_sheets('sheet-id', ['Missing'], explicit=True) == {}
+
+
+def test_values_cache_is_keyed_by_revision_and_expires(monkeypatch):
+    cache = SheetValuesCache(ttl_seconds=60, max_entries=2)
+    cache.put('sheet-id', 'rev-1', ['Effort Estimation'], {'days': '10'})
+    assert cache.get('sheet-id', 'rev-1', ['Effort Estimation']) == {'days': '10'}
+    assert cache.get('sheet-id', 'rev-2', ['Effort Estimation']) is None
+    cache.put('sheet-id', None, ['Effort Estimation'], {'days': '11'})
+    assert cache.get('sheet-id', None, ['Effort Estimation']) is None
+    now = sheets_reader_module.time.time()
+    monkeypatch.setattr(sheets_reader_module.time, 'time', lambda: now + 61)
+    assert cache.get('sheet-id', 'rev-1', ['Effort Estimation']) is None
+
+
+def test_unrecognized_layout_reuses_the_streamed_rows_for_gemini():
+    rows = [['client_name', 'Acme'], ['Role', 'Notes'], ['Developer', 'two sprints'], [], ['QA', 'one sprint']]
+    reader = make_reader({'Effort Estimation': rows})
+    analyzer = reader.project_analyzer
+    analyzer.gemini_available = True
+    sent = []
+    analyzer.analyze_project_data = lambda sheet_rows: sent.append(sheet_rows) or {'days': '5 Days'}
+    values = reader.fetch_placeholder_values('sheet-id', sheet_names=['Effort Estimation'])
+    assert values['days'] == '5 Days'
+    assert sent == [[['=== DATA FROM SHEET: Effort Estimation ===']] + rows]
+    assert len(reader.service.batch_ranges) == 2  # The pages are not read a second time
@@ -0,0 +1,117 @@
+"""
+Tests for SlidesClient snapshots, slide listing and mutation plan commits
+"""
+from unittest import mock
+
+from core import slides_client as slides_client_module
+from core.presentation_snapshot import PresentationSnapshot
+from core.slides_client import SlidesClient
+
+
+def make_client(monkeypatch, server_slides):
+    monkeypatch.setattr(SlidesClient, '_authenticate', lambda self: None)
+    client = SlidesClient()
+    client.service = mock.MagicMock()
+    client.service.presentations.return_value.get.return_value.execute.return_value = {
+        'slides': [{'objectId': slide_id} for slide_id in server_slides]
+    }
+    return client
+
+
+def test_slide_ids_come_from_the_snapshot(monkeypatch):
+    client = make_client(monkeypatch, ['s1', 's2'])
+    client._snapshots['deck'] = PresentationSnapshot('deck', {'slides': [{'objectId': 's1'}]})
+    assert client.get_slide_ids('deck') == ['s1']
+    client.service.presentations.return_value.get.assert_not_called()
+
+
+def test_force_remote_asks_the_server_with_a_field_mask(monkeypatch):
+    client = make_client(monkeypatch, ['s1', 's2'])
+    client._snapshots['deck'] = PresentationSnapshot('deck', {'slides': [{'objectId': 's1'}]})
+    assert client.get_slide_ids('deck', force_remote=True) == ['s1', 's2']
+    client.service.presentations.return_value.get.assert_called_once_with(
+        presentationId='deck', fields='slides.objectId'
+    )
+
+
+def deck():
+    text = {'textElements': [{'textRun': {'content': 'Hello {{name}}\n'}}]}
+    return {'slides': [
+        {'objectId': 's1', 'pageElements': [{'objectId': 'e1', 'shape': {'text': text}}]},
+        {'objectId': 's2', 'pageElements': []},
+    ]}
+
+
+def open_plan(monkeypatch, dry_run=False):
+    client = make_client(monkeypatch, ['s1', 's2'])
+    client.service.presentations.return_value.get.return_value.execute.return_value = deck()
+    assert client.begin_mutation_plan('deck', dry_run=dry_run) is not None
+    return client
+
+
+def test_dry_run_never_sends_even_requests_the_snapshot_cannot_model(monkeypatch):
+    client = open_plan(monkeypatch, dry_run=True)
+    client._execute_batch_update('deck', [{'deleteObject': {'objectId': 's2'}}], stage='delete')
+    response = client._execute_batch_update('deck', [{'duplicateObject': {'objectId': 'e1'}}], stage='copy')
+    assert response['replies'] == [{}]
+    client._execute_batch_update('deck', [{'replaceAllText': {
+        'containsText': {'text': '{{name}}'}, 'replaceText': 'Acme'}}], stage='text')
+    result = client.commit_mutation_plan('deck')
+    client.service.presentations.return_value.batchUpdate.assert_not_called()
+    assert result['dry_run'] and not result['committed']
+    assert result['unpredicted_requests'] == 2
+    assert [(request['kind'], request['predicted']) for request in result['requests']] == [
+        ('duplicateObject', False), ('replaceAllText', False), ('deleteObject', True)]
+
+
+def test_commit_applies_the_other_stages_when_one_is_rejected(monkeypatch):
+    client = open_plan(monkeypatch)
+    client._execute_batch_update('deck', [{'replaceAllText': {
+        'containsText': {'text': '{{name}}'}, 'replaceText': 'Acme'}}], stage='text')
+    client._execute_batch_update('deck', [{'deleteObject': {'objectId': 's2'}}], stage='cleanup')
+    sent = []
+
+    def batch_update(presentationId, body):
+        sent.append([next(iter(request)) for request in body['requests']])
+        request = mock.MagicMock()
+        if len(body['requests']) > 1 or 'deleteObject' in body['requests'][0]:
+            request.execute.side_effect = RuntimeError('Invalid requests[1].deleteObject')
+        else:
+            request.execute.return_value = {'replies': [{'replaceAllText': {'occurrencesChanged': 1}}]}
+        return request
+
+    client.service.presentations.return_value.batchUpdate.side_effect = batch_update
+    result = client.commit_mutation_plan('deck')
+    assert sent == [['replaceAllText', 'deleteObject'], ['replaceAllText'], ['deleteObject']]
+    assert result['committed'] is True
+    assert list(result['failed_stages']) == ['cleanup']
+    assert 'deck' not in client._snapshots  # The snapshot had applied the rejected deletion
+
+
+def test_commit_fails_when_nothing_is_applied(monkeypatch):
+    client = open_plan(monkeypatch)
+    client._execute_batch_update('deck', [{'deleteObject': {'objectId': 's2'}}], stage='cleanup')
+    client.service.presentations.return_value.batchUpdate.return_value.execute.side_effect = RuntimeError('quota')
+    result = client.commit_mutation_plan('deck')
+    assert result['committed'] is False and result['error'] == 'quota'
+
+
+def test_get_presentation_returns_a_copy_of_the_snapshot(monkeypatch):
+    client = make_client(monkeypatch, [])
+    client.service.presentations.return_value.get.return_value.execute.return_value = deck()
+    presentation = client.get_presentation('deck')
+    presentation['slides'][0]['pageElements'].clear()
+    assert client.get_presentation('deck') == deck()
+    client.service.presentations.return_value.get.assert_called_once()
+
+
+def test_snapshots_are_dropped_after_commit_and_bounded(monkeypatch):
+    monkeypatch.setattr(slides_client_module, 'SLIDES_SNAPSHOT_MAX_ENTRIES', 2)
+    client = open_plan(monkeypatch)
+    client.service.presentations.return_value.batchUpdate.return_value.execute.return_value = {'replies': [{}]}
+    client._execute_batch_update('deck', [{'deleteObject': {'objectId': 's2'}}], stage='cleanup')
+    for presentation_id in ('a', 'b', 'c'):
+        client.get_presentation(presentation_id)
+    assert list(client._snapshots) == ['deck', 'c']  # The deck with an open plan is kept
+    assert client.commit_mutation_plan('deck')['committed']
+    assert list(client._snapshots) == ['c']
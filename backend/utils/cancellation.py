@@ -0,0 +1,126 @@
+"""
+Cooperative cancellation for server jobs
+A CancellationToken is bound to the running job through a context variable; pipeline code
+calls enter_stage()/checkpoint() between steps and long waits use sleep(), so a cancelled
+job or a stage that exceeds its deadline stops at the next check.
+"""
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from config import JOB_STAGE_TIMEOUTS
+
+
+class JobCancelled(BaseException):
+    """Raised at a checkpoint once the job was cancelled.
+
+    Derives from BaseException (like asyncio.CancelledError) so the pipeline's broad
+    `except Exception` fallbacks do not swallow it.
+    """
+
+
+class StageTimeout(JobCancelled):
+    """Raised at a checkpoint once the current stage ran past its deadline"""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"Stage '{stage}' exceeded its {timeout:g}s deadline")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class CancellationToken:
+    """Cancellation flag plus the current stage deadline.
+
+    A child token (parent=...) has its own stage deadlines but is cancelled together with
+    its parent, so concurrent batch rows can time out independently within one job.
+    """
+
+    def __init__(self, parent: Optional['CancellationToken'] = None):
+        self.parent = parent
+        self._event = threading.Event()
+        self._children = weakref.WeakSet()
+        self._children_lock = threading.Lock()
+        self.reason: Optional[str] = None
+        self.stage: Optional[str] = None
+        self.stage_timeout: Optional[float] = None
+        self._deadline: Optional[float] = None
+        if parent is not None:
+            with parent._children_lock:
+                parent._children.add(self)
+            if parent.cancelled:
+                self.cancel(parent.reason or "Cancelled")
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Cancelled by user") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+        with self._children_lock:
+            children = list(self._children)
+        for child in children:
+            child.cancel(reason)
+
+    def enter_stage(self, stage: str, timeout: Optional[float] = None) -> None:
+        """Check the previous stage, then start `stage` with its deadline (JOB_STAGE_TIMEOUTS by default)"""
+        self.check()
+        if timeout is None:
+            timeout = JOB_STAGE_TIMEOUTS.get(stage, 0)
+        self.stage = stage
+        self.stage_timeout = timeout or None
+        self._deadline = time.monotonic() + timeout if timeout else None
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise JobCancelled(self.reason or "Cancelled")
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise StageTimeout(self.stage, self.stage_timeout)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep that wakes up (and raises) as soon as the job is cancelled or the stage deadline passes"""
+        if self._deadline is not None:
+            seconds = min(seconds, max(0.0, self._deadline - time.monotonic()))
+        self._event.wait(seconds)
+        self.check()
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar("current_cancellation_token", default=None)
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken):
+    """Bind token to the current context (and ContextThreadPoolExecutor tasks started from it)"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def current_token() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+def enter_stage(stage: str, timeout: Optional[float] = None) -> None:
+    token = _current_token.get()
+    if token is not None:
+        token.enter_stage(stage, timeout)
+
+
+def checkpoint() -> None:
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def sleep(seconds: float) -> None:
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
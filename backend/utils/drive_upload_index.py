@@ -0,0 +1,144 @@
+"""
+Drive Upload Index
+Maps the SHA-256 of uploaded image bytes to the Drive file created for them, so identical
+images (logos, fallbacks, cropped variants) are uploaded once and reused across jobs
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Any
+
+from utils.logger import get_logger
+from config import (
+    DRIVE_UPLOAD_INDEX_PATH, DRIVE_UPLOAD_INDEX_TTL_SECONDS, DRIVE_UPLOAD_INDEX_MAX_ENTRIES,
+    DRIVE_UPLOAD_VERIFY_SECONDS, LOG_LEVEL, LOG_FILE
+)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class DriveUploadIndex:
+    """SQLite index of (Drive account, content hash) -> (file_id, public_url).
+
+    Entries expire after ttl_seconds; above max_entries the least recently used are
+    evicted. Callers verify a file with Drive when needs_verification() says so and
+    call remove() when it is gone.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 max_entries: Optional[int] = None, verify_seconds: Optional[int] = None):
+        self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.path = path or DRIVE_UPLOAD_INDEX_PATH
+        self.ttl_seconds = DRIVE_UPLOAD_INDEX_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = DRIVE_UPLOAD_INDEX_MAX_ENTRIES if max_entries is None else max_entries
+        self.verify_seconds = DRIVE_UPLOAD_VERIFY_SECONDS if verify_seconds is None else verify_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+        self.available = True
+
+    def _connect(self):
+        if self._conn is not None or not self.available:
+            return self._conn
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "account TEXT NOT NULL, hash TEXT NOT NULL, file_id TEXT NOT NULL, public_url TEXT NOT NULL, "
+                "size INTEGER, created_at REAL NOT NULL, used_at REAL NOT NULL, verified_at REAL NOT NULL, "
+                "PRIMARY KEY (account, hash))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_uploads_used ON uploads(used_at)")
+            conn.commit()
+            self._conn = conn
+        except Exception as e:
+            self.logger.warning(f"⚠️ Drive upload index disabled (could not open {self.path}): {e}")
+            self.available = False
+        return self._conn
+
+    def lookup(self, account: str, digest: str) -> Optional[Dict[str, Any]]:
+        """Return {'file_id', 'public_url', 'verified_at'} for a content hash, or None"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT file_id, public_url, created_at, verified_at FROM uploads WHERE account = ? AND hash = ?",
+                    (account, digest)
+                ).fetchone()
+                if row is None:
+                    return None
+                file_id, public_url, created_at, verified_at = row
+                now = time.time()
+                if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM uploads WHERE account = ? AND hash = ?", (account, digest))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE uploads SET used_at = ? WHERE account = ? AND hash = ?", (now, account, digest))
+                conn.commit()
+                return {'file_id': file_id, 'public_url': public_url, 'verified_at': verified_at}
+            except Exception as e:
+                self.logger.warning(f"⚠️ Drive upload index read failed: {e}")
+                return None
+
+    def needs_verification(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry.get('verified_at', 0) > self.verify_seconds
+
+    def mark_verified(self, account: str, digest: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            conn.execute(
+                "UPDATE uploads SET verified_at = ? WHERE account = ? AND hash = ?", (time.time(), account, digest)
+            )
+            conn.commit()
+
+    def record(self, account: str, digest: str, file_id: str, public_url: str, size: int = 0) -> None:
+        """Remember the (public) Drive file holding these bytes"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO uploads (account, hash, file_id, public_url, size, created_at, used_at, verified_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (account, digest, file_id, public_url, size, now, now, now)
+                )
+                self._evict(conn, now)
+                conn.commit()
+            except Exception as e:
+                self.logger.warning(f"⚠️ Drive upload index write failed: {e}")
+
+    def remove(self, account: str, digest: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            conn.execute("DELETE FROM uploads WHERE account = ? AND hash = ?", (account, digest))
+            conn.commit()
+
+    def _evict(self, conn, now: float) -> None:
+        if self.ttl_seconds > 0:
+            conn.execute("DELETE FROM uploads WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries > 0:
+            count = conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM uploads WHERE rowid IN (SELECT rowid FROM uploads ORDER BY used_at ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+
+# Global instance shared by all SlidesClient instances
+drive_upload_index = DriveUploadIndex()
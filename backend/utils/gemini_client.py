@@ -0,0 +1,237 @@
+"""
+Gemini Client
+Shared, thread-safe access to Gemini models: cached model handles, request pacing,
+concurrency limits and retries with exponential backoff in one place
+"""
+import random
+import threading
+from typing import Any, Callable, Dict, Optional
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from utils.logger import get_logger
+from utils.rate_limiter import get_rate_limiter
+from utils.response_cache import response_cache, response_text
+from utils import cancellation
+from config import (
+    GEMINI_API_KEY, GEMINI_MAX_CONCURRENT_REQUESTS, GEMINI_MAX_RETRIES,
+    GEMINI_RETRY_BASE_DELAY, GEMINI_RETRY_MAX_DELAY, LOG_LEVEL, LOG_FILE
+)
+
+
+# Errors worth retrying: rate limiting, server-side failures and timeouts
+TRANSIENT_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.Aborted,
+    ConnectionError,
+    TimeoutError,
+)
+# Rate limiting / quota exhaustion: paced by the shared rate limiter and retried in generate()
+RATE_LIMIT_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+)
+
+
+def _freeze(value):
+    """Hashable form of a generation config (dicts/lists nested)"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class GeminiClient:
+    """Process-wide Gemini facade.
+
+    - Model handles are created once per (model name, generation config) and reused.
+    - Every request goes through the per-model rate limiter and a per-model
+      concurrency limit (GEMINI_MAX_CONCURRENT_REQUESTS in-flight requests).
+    - Transient API errors are retried with exponential backoff and jitter;
+      other API errors (bad request, permission denied, ...) are raised immediately.
+    - Text requests can be served from / stored in the persistent response cache
+      (cache_mode 'read' or 'readwrite').
+    """
+
+    def __init__(self, max_concurrent_requests: Optional[int] = None, max_retries: Optional[int] = None,
+                 base_delay: Optional[float] = None, max_delay: Optional[float] = None):
+        self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.max_concurrent_requests = max(1, max_concurrent_requests or GEMINI_MAX_CONCURRENT_REQUESTS)
+        self.max_retries = max(0, GEMINI_MAX_RETRIES if max_retries is None else max_retries)
+        self.base_delay = GEMINI_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = GEMINI_RETRY_MAX_DELAY if max_delay is None else max_delay
+        self._lock = threading.Lock()
+        self._configured_key = None
+        self._models: Dict[Any, Any] = {}
+        self._concurrency_limits: Dict[str, int] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._stats = {'requests': 0, 'retries': 0, 'failures': 0, 'models_created': 0, 'cache_hits': 0}
+
+    def configure(self, api_key: Optional[str] = None) -> bool:
+        """Configure the SDK once (re-configures only if the key changes)"""
+        api_key = api_key or GEMINI_API_KEY
+        if not api_key:
+            return False
+        with self._lock:
+            if self._configured_key != api_key:
+                genai.configure(api_key=api_key)
+                self._configured_key = api_key
+                self._models.clear()
+        return True
+
+    def get_model(self, model_name: str, generation_config: Optional[Dict] = None):
+        """Return the cached GenerativeModel for (model name, generation config)"""
+        if self._configured_key is None:
+            self.configure()
+        key = (model_name, _freeze(generation_config))
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if generation_config:
+                    model = genai.GenerativeModel(model_name, generation_config=generation_config)
+                else:
+                    model = genai.GenerativeModel(model_name)
+                self._models[key] = model
+                self._stats['models_created'] += 1
+            return model
+
+    def set_concurrency_limit(self, model_name: str, limit: int) -> None:
+        """Change the number of in-flight requests allowed for one model"""
+        with self._lock:
+            self._concurrency_limits[model_name] = max(1, int(limit))
+            # Requests already holding the old semaphore release it; new ones use the new limit
+            self._semaphores.pop(model_name, None)
+
+    def _semaphore(self, model_name: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(model_name)
+            if semaphore is None:
+                limit = self._concurrency_limits.get(model_name, self.max_concurrent_requests)
+                semaphore = threading.BoundedSemaphore(limit)
+                self._semaphores[model_name] = semaphore
+            return semaphore
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (0-based): base * 2^attempt with jitter, capped"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(0.75, 1.25)
+
+    def wait_before_retry(self, attempt: int) -> float:
+        """Sleep for the backoff delay (for callers retrying on empty/blocked responses)"""
+        delay = self.backoff_delay(attempt)
+        with self._lock:
+            self._stats['retries'] += 1
+        cancellation.sleep(delay)
+        return delay
+
+    @staticmethod
+    def is_rate_limit(error: Exception) -> bool:
+        return isinstance(error, RATE_LIMIT_ERRORS)
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        if isinstance(error, (google_exceptions.GoogleAPICallError, ValueError, TypeError)):
+            return False
+        # Unknown transport-level errors (SSL resets, socket errors, ...)
+        return True
+
+    def generate(self, model_name: str, contents, generation_config: Optional[Dict] = None,
+                 max_retries: Optional[int] = None, label: Optional[str] = None,
+                 cache_mode: str = 'off', validate: Optional[Callable[[str], bool]] = None, **kwargs):
+        """Call generate_content on the cached model with pacing, concurrency limit and retries.
+
+        Args:
+            model_name: Gemini model name
+            contents: Prompt (string or list of parts) passed to generate_content
+            generation_config: Generation config; part of the model cache key
+            max_retries: Override the default number of retries for transient errors
+            label: Short description used in log messages
+            cache_mode: 'off', 'read' (serve cached responses) or 'readwrite' (also store
+                        new text responses). Requests with extra kwargs or non-text parts
+                        are never cached.
+            validate: Optional check of the response text (e.g. "parses as JSON"). Only
+                      responses it accepts are stored, and a cached response it rejects
+                      is evicted and requested again.
+            **kwargs: Passed through to generate_content (e.g. safety_settings)
+
+        Returns:
+            The Gemini response (a CachedResponse with from_cache=True on a cache hit).
+            The last error is raised when all attempts fail.
+        """
+        cache_key = None
+        if cache_mode in ('read', 'readwrite') and not kwargs:
+            cache_key = response_cache.make_key(model_name, generation_config, contents)
+            cached = response_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                if self._accepts(validate, cached):
+                    with self._lock:
+                        self._stats['cache_hits'] += 1
+                    return cached
+                self.logger.warning(f"Evicting cached Gemini response rejected by the caller ({label or model_name})")
+                response_cache.delete(cache_key)
+        response = self._generate_with_retries(model_name, contents, generation_config, max_retries, label, **kwargs)
+        if cache_key and cache_mode == 'readwrite' and self._accepts(validate, response):
+            response_cache.put(cache_key, model_name, response)
+        return response
+
+    @staticmethod
+    def _accepts(validate: Optional[Callable[[str], bool]], response) -> bool:
+        """True if there is no validator or it accepts the response text"""
+        if validate is None:
+            return True
+        text = response_text(response)
+        if text is None:
+            return False
+        try:
+            return bool(validate(text))
+        except Exception:
+            return False
+
+    def _generate_with_retries(self, model_name: str, contents, generation_config: Optional[Dict],
+                               max_retries: Optional[int], label: Optional[str], **kwargs):
+        model = self.get_model(model_name, generation_config)
+        retries = self.max_retries if max_retries is None else max(0, max_retries)
+        limiter = get_rate_limiter(model_name)
+        label = label or model_name
+        attempt = 0
+        while True:
+            # Stop before spending quota on a cancelled job or an expired stage
+            cancellation.checkpoint()
+            limiter.acquire()
+            semaphore = self._semaphore(model_name)
+            with semaphore:
+                with self._lock:
+                    self._stats['requests'] += 1
+                try:
+                    return model.generate_content(contents, **kwargs)
+                except Exception as e:
+                    error = e
+            if attempt >= retries or not self.is_retryable(error):
+                with self._lock:
+                    self._stats['failures'] += 1
+                raise error
+            delay = self.backoff_delay(attempt)
+            self.logger.warning(
+                f"⚠️ Gemini request '{label}' failed (attempt {attempt + 1}/{retries + 1}): {error} - retrying in {delay:.1f}s"
+            )
+            with self._lock:
+                self._stats['retries'] += 1
+            cancellation.sleep(delay)
+            attempt += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_models'] = len(self._models)
+            return stats
+
+
+# Global instance shared by ContentGenerator, ProjectAnalyzer and worker threads
+gemini_client = GeminiClient()
@@ -0,0 +1,93 @@
+"""
+Google API Service Registry
+Process-wide credentials and cached discovery documents for Slides, Drive and Sheets
+"""
+import os
+import threading
+import httplib2
+from google.oauth2 import service_account
+from google.oauth2.credentials import Credentials as UserCredentials
+from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build, build_from_document
+from google_auth_oauthlib.flow import InstalledAppFlow
+
+from utils.logger import get_logger
+from config import AUTH_MODE, GOOGLE_CREDENTIALS_FILE, GOOGLE_OAUTH_CLIENT_FILE, GOOGLE_TOKEN_FILE, GOOGLE_SCOPES, LOG_LEVEL, LOG_FILE
+
+
+logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+
+_credentials = None
+_credentials_lock = threading.Lock()
+
+# (api, version) -> parsed discovery document, shared by all threads
+_discovery_documents = {}
+_discovery_lock = threading.Lock()
+
+
+def _load_credentials():
+    """Load credentials for the configured AUTH_MODE (runs the OAuth flow if needed)"""
+    if AUTH_MODE == 'oauth':
+        creds = None
+        if os.path.exists(GOOGLE_TOKEN_FILE):
+            creds = UserCredentials.from_authorized_user_file(GOOGLE_TOKEN_FILE, GOOGLE_SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                if not os.path.exists(GOOGLE_OAUTH_CLIENT_FILE):
+                    raise FileNotFoundError(f"Missing OAuth client file at: {GOOGLE_OAUTH_CLIENT_FILE}")
+                flow = InstalledAppFlow.from_client_secrets_file(GOOGLE_OAUTH_CLIENT_FILE, GOOGLE_SCOPES)
+                creds = flow.run_local_server(port=0)
+            with open(GOOGLE_TOKEN_FILE, 'w') as token:
+                token.write(creds.to_json())
+        return creds
+    return service_account.Credentials.from_service_account_file(
+        GOOGLE_CREDENTIALS_FILE,
+        scopes=GOOGLE_SCOPES
+    )
+
+
+def get_credentials():
+    """Return the process-wide Google credentials, loading them once and refreshing expired OAuth tokens"""
+    global _credentials
+    with _credentials_lock:
+        if _credentials is None:
+            _credentials = _load_credentials()
+            logger.info("🔐 Google credentials loaded")
+        elif isinstance(_credentials, UserCredentials) and _credentials.expired and _credentials.refresh_token:
+            _credentials.refresh(Request())
+            try:
+                with open(GOOGLE_TOKEN_FILE, 'w') as token:
+                    token.write(_credentials.to_json())
+            except Exception as e:
+                logger.warning(f"Could not persist refreshed OAuth token: {e}")
+        return _credentials
+
+
+def get_service(api_name, version, credentials=None):
+    """Build a discovery client with its own HTTP connection.
+
+    The discovery document is parsed once per process, but every call returns a new
+    service object: googleapiclient/httplib2 connections are not thread-safe, and clients
+    built on one thread are handed to others (AutomationPool, BatchRunner).
+    """
+    credentials = credentials or get_credentials()
+    with _discovery_lock:
+        document = _discovery_documents.get((api_name, version))
+    if document is None:
+        service = build(api_name, version, credentials=credentials, cache_discovery=False)
+        with _discovery_lock:
+            _discovery_documents.setdefault((api_name, version), getattr(service, '_rootDesc', None))
+        return service
+    return build_from_document(document, http=AuthorizedHttp(credentials, http=httplib2.Http()))
+
+
+def reset():
+    """Forget cached credentials and discovery documents (e.g. after the token file changed)"""
+    global _credentials
+    with _credentials_lock:
+        _credentials = None
+    with _discovery_lock:
+        _discovery_documents.clear()
@@ -1,45 +1,309 @@
+import hashlib
+import heapq
+import itertools
+import json
+from collections import deque
 import threading
 import time
 import uuid
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, Iterable, List, Optional, Any, Callable, Tuple
+
+from utils.logger import get_logger, job_log_context
+from utils.job_store import JobStore, create_job_store
+from utils.cancellation import CancellationToken, JobCancelled, StageTimeout, cancellation_scope
+from config import (
+    JOB_WORKER_COUNT, JOB_QUEUE_HIGH_WATER, JOB_LOG_BUFFER_SIZE, JOB_LOG_RETAIN_LINES,
+    JOB_RETENTION_SECONDS, JOB_MAX_FINISHED, JOB_RESULT_REUSE_SECONDS, LOG_LEVEL, LOG_FILE
+)
+
+
+def request_hash(kind: str, params: Dict[str, Any], ignore: Iterable[str] = ()) -> str:
+    """Canonical hash of a job request: same kind and same (whitespace-trimmed) parameters
+    give the same hash regardless of key order. Keys in `ignore` do not count."""
+    canonical = {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in params.items()
+        if key not in ignore
+    }
+    payload = json.dumps({"kind": kind, "params": canonical}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QueueFullError(Exception):
+    """Raised by JobManager.submit when the queue is at its high-water mark"""
+
+    def __init__(self, depth: int, limit: int):
+        super().__init__(f"Job queue is full ({depth}/{limit} waiting)")
+        self.depth = depth
+        self.limit = limit
 
 
 class InMemoryJob:
+    TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
     def __init__(self, kind: str, params: Dict[str, Any]):
         self.id: str = str(uuid.uuid4())
         self.kind: str = kind
         self.params: Dict[str, Any] = params
-        self.status: str = "queued"  # queued | running | succeeded | failed
-        self.logs: List[str] = []
+        # Notified on every new log line and status change (log streaming waits on it)
+        self._changed = threading.Condition()
+        self._status: str = "queued"  # queued | running | succeeded | failed | cancelled
+        self.priority: int = 0
+        self.cancel_token = CancellationToken()
+        # Ring buffer of the most recent (sequence number, log line) pairs
+        self._logs = deque(maxlen=max(1, JOB_LOG_BUFFER_SIZE))
+        self.log_seq: int = 0  # sequence number of the last appended line
+        self.log_lines_dropped: int = 0
         self.result: Optional[Dict[str, Any]] = None
         self.error: Optional[str] = None
         self.created_at: float = time.time()
         self.started_at: Optional[float] = None
         self.completed_at: Optional[float] = None
 
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str) -> None:
+        with self._changed:
+            self._status = value
+            self._changed.notify_all()
+
+    @property
+    def logs(self) -> List[str]:
+        with self._changed:
+            return [line for _, line in self._logs]
+
+    def logs_after(self, after: int = 0) -> List[Tuple[int, str]]:
+        """(seq, line) pairs with seq > after still held in the buffer"""
+        with self._changed:
+            if after >= self.log_seq:
+                return []
+            # Sequence numbers are contiguous, so skip straight to the first new line
+            start = max(0, len(self._logs) - (self.log_seq - after))
+            return list(itertools.islice(self._logs, start, None))
+
+    def wait_for_update(self, after: int, status: Optional[str], timeout: float) -> bool:
+        """Block until a line newer than `after` arrives or the status differs from `status`"""
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: self.log_seq > after or self._status != status, timeout=timeout
+            )
+
     def append_log(self, message: str) -> None:
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        self.logs.append(f"{timestamp} | {message}")
+        self.append_line(f"{timestamp} | {message}")
+
+    def append_line(self, line: str) -> None:
+        """Append an already formatted (timestamped) log line"""
+        with self._changed:
+            if len(self._logs) == self._logs.maxlen:
+                self.log_lines_dropped += 1
+            self.log_seq += 1
+            self._logs.append((self.log_seq, line))
+            self._changed.notify_all()
+
+    def to_record(self, retain_lines: Optional[int] = None) -> Dict[str, Any]:
+        """Plain record for the job store; logs are compacted to the last retain_lines lines"""
+        with self._changed:
+            logs = [list(entry) for entry in self._logs]
+            dropped = self.log_lines_dropped
+        if retain_lines is not None and len(logs) > retain_lines:
+            dropped += len(logs) - retain_lines
+            logs = logs[len(logs) - retain_lines:] if retain_lines > 0 else []
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "priority": self.priority,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "log_seq": self.log_seq,
+            "log_lines_dropped": dropped,
+            "logs": logs,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "InMemoryJob":
+        job = cls(record["kind"], record.get("params") or {})
+        job.id = record["id"]
+        job._status = record["status"]
+        job.priority = record.get("priority") or 0
+        job.result = record.get("result")
+        job.error = record.get("error")
+        job.created_at = record["created_at"]
+        job.started_at = record.get("started_at")
+        job.completed_at = record.get("completed_at")
+        for seq, line in record.get("logs") or []:
+            job._logs.append((seq, line))
+        job.log_seq = record.get("log_seq") or 0
+        job.log_lines_dropped = record.get("log_lines_dropped") or 0
+        return job
 
 
 class JobManager:
-    def __init__(self):
+    """Job registry plus a bounded scheduler.
+
+    Submitted jobs wait in a priority queue (higher priority first, FIFO within a
+    priority) and are executed by a fixed pool of worker threads. Once
+    max_queue_depth jobs are waiting, submit() raises QueueFullError.
+
+    Unfinished jobs live in memory; finished jobs are compacted into the job store
+    (memory or SQLite) and evicted after JOB_RETENTION_SECONDS / beyond JOB_MAX_FINISHED.
+    """
+
+    def __init__(self, worker_count: Optional[int] = None, max_queue_depth: Optional[int] = None,
+                 store: Optional[JobStore] = None):
+        self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.store = store or create_job_store()
+        interrupted = self.store.mark_interrupted()
+        if interrupted:
+            self.logger.warning(f"⚠️ Marked {interrupted} job(s) from a previous run as failed")
+        # Queued and running jobs
         self._jobs: Dict[str, InMemoryJob] = {}
         self._lock = threading.Lock()
+        self.worker_count = max(1, worker_count or JOB_WORKER_COUNT)
+        self.max_queue_depth = JOB_QUEUE_HIGH_WATER if max_queue_depth is None else max_queue_depth
+        # Heap of (-priority, sequence, job_id); _tasks holds the callables of waiting jobs
+        self._queue: List[tuple] = []
+        self._tasks: Dict[str, Callable[[], None]] = {}
+        self._sequence = itertools.count()
+        self._queue_ready = threading.Condition(self._lock)
+        self._workers: List[threading.Thread] = []
+        self._running = 0
+        # Coalescing indexes: idempotency key -> (job_id, created_at), request hash -> in-flight job_id,
+        # request hash -> (job_id, completed_at) of the last successful run
+        self._idempotency_keys: Dict[str, Tuple[str, float]] = {}
+        self._inflight: Dict[str, str] = {}
+        self._recent: Dict[str, Tuple[str, float]] = {}
+        self._request_hashes: Dict[str, str] = {}
 
     def create(self, kind: str, params: Dict[str, Any]) -> InMemoryJob:
         job = InMemoryJob(kind, params)
         with self._lock:
             self._jobs[job.id] = job
+        self.store.save(job.to_record())
         return job
 
+    def create_or_attach(self, kind: str, params: Dict[str, Any], request_hash: Optional[str] = None,
+                         idempotency_key: Optional[str] = None,
+                         reuse_seconds: Optional[int] = None) -> Tuple[InMemoryJob, bool]:
+        """Create a job unless an equivalent one exists. Returns (job, created).
+
+        A known idempotency key returns its job (any status). Otherwise a queued/running job
+        with the same request hash is shared, and a successful one finished less than
+        reuse_seconds (default JOB_RESULT_REUSE_SECONDS) ago is reused.
+        """
+        reuse_seconds = JOB_RESULT_REUSE_SECONDS if reuse_seconds is None else reuse_seconds
+        while True:
+            now = time.time()
+            with self._lock:
+                existing_id = None
+                if idempotency_key and idempotency_key in self._idempotency_keys:
+                    existing_id = self._idempotency_keys[idempotency_key][0]
+                elif request_hash and self._inflight.get(request_hash) in self._jobs:
+                    existing_id = self._inflight[request_hash]
+                elif request_hash and reuse_seconds > 0 and request_hash in self._recent:
+                    recent_id, completed_at = self._recent[request_hash]
+                    if now - completed_at <= reuse_seconds:
+                        existing_id = recent_id
+                if existing_id is None:
+                    # Reserve the key and hash before releasing the lock, so concurrent
+                    # identical submissions attach to this job instead of creating their own
+                    job = InMemoryJob(kind, params)
+                    self._jobs[job.id] = job
+                    if idempotency_key:
+                        self._idempotency_keys[idempotency_key] = (job.id, now)
+                    if request_hash:
+                        self._inflight[request_hash] = job.id
+                        self._request_hashes[job.id] = request_hash
+                    self._prune_coalescing(now)
+                    break
+                existing = self._jobs.get(existing_id)
+                if existing is not None and idempotency_key:
+                    self._idempotency_keys.setdefault(idempotency_key, (existing_id, now))
+            if existing is None:
+                # Finished job: load it from the store outside the lock
+                existing = self.get(existing_id)
+                if existing is not None and idempotency_key:
+                    with self._lock:
+                        self._idempotency_keys.setdefault(idempotency_key, (existing_id, now))
+            if existing is not None:
+                self.logger.info(f"🔁 Attaching {kind} request to existing job {existing_id} ({existing.status})")
+                return existing, False
+            # The job was evicted from the store: forget it and look again
+            with self._lock:
+                if idempotency_key and self._idempotency_keys.get(idempotency_key, (None,))[0] == existing_id:
+                    del self._idempotency_keys[idempotency_key]
+                if request_hash and self._recent.get(request_hash, (None,))[0] == existing_id:
+                    del self._recent[request_hash]
+
+        try:
+            self.store.save(job.to_record())
+        except Exception:
+            with self._lock:
+                self._forget(job)
+            raise
+        return job, True
+
+    def _prune_coalescing(self, now: float) -> None:
+        """Forget idempotency keys and reusable results older than the job retention (lock held)"""
+        horizon = now - (JOB_RETENTION_SECONDS if JOB_RETENTION_SECONDS > 0 else 24 * 3600)
+        for index in (self._idempotency_keys, self._recent):
+            if len(index) > 256:
+                for key in [k for k, (_, stamp) in index.items() if stamp < horizon]:
+                    del index[key]
+
+    def _forget(self, job: InMemoryJob) -> None:
+        """Drop a job that never ran from the active set and the coalescing indexes (lock held)"""
+        self._jobs.pop(job.id, None)
+        self._release_request_hash(job)
+        self._idempotency_keys = {
+            key: entry for key, entry in self._idempotency_keys.items() if entry[0] != job.id
+        }
+
+    def _release_request_hash(self, job: InMemoryJob) -> None:
+        """Stop coalescing onto a finished job; remember it for reuse if it succeeded (lock held)"""
+        digest = self._request_hashes.pop(job.id, None)
+        if digest is None:
+            return
+        if self._inflight.get(digest) == job.id:
+            del self._inflight[digest]
+        if job.status == "succeeded":
+            self._recent[digest] = (job.id, job.completed_at or time.time())
+
     def get(self, job_id: str) -> Optional[InMemoryJob]:
         with self._lock:
-            return self._jobs.get(job_id)
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        record = self.store.load(job_id)
+        return InMemoryJob.from_record(record) if record else None
 
-    def list(self) -> List[Dict[str, Any]]:
+    def list(self, status: Optional[str] = None, kind: Optional[str] = None,
+             created_after: Optional[float] = None, created_before: Optional[float] = None,
+             limit: int = 100) -> List[Dict[str, Any]]:
+        """Jobs matching the filters, newest first"""
         with self._lock:
-            return [self._serialize(j) for j in self._jobs.values()]
+            active_ids = set(self._jobs)
+            active = [
+                j for j in self._jobs.values()
+                if (status is None or j.status == status) and (kind is None or j.kind == kind)
+                and (created_after is None or j.created_at >= created_after)
+                and (created_before is None or j.created_at < created_before)
+            ]
+        jobs = {j.id: j for j in active}
+        for record in self.store.query(status, kind, created_after, created_before, limit):
+            # Active jobs are the source of truth; their stored record may still say "queued"
+            if record["id"] not in active_ids:
+                jobs.setdefault(record["id"], InMemoryJob.from_record(record))
+        ordered = sorted(jobs.values(), key=lambda j: j.created_at, reverse=True)[:limit]
+        return [self._serialize(j) for j in ordered]
 
     def _serialize(self, job: InMemoryJob) -> Dict[str, Any]:
         return {
@@ -51,23 +315,126 @@ class JobManager:
             "completed_at": job.completed_at,
         }
 
-    def attach_logger_handler(self, job: InMemoryJob):
-        import logging
+    def submit(self, job: InMemoryJob, task: Callable[[], None], priority: int = 0) -> int:
+        """Queue a created job for execution by the worker pool.
 
-        class JobLogHandler(logging.Handler):
-            def emit(self, record):
-                try:
-                    msg = self.format(record)
-                except Exception:
-                    msg = record.getMessage()
-                job.append_log(msg)
+        Returns the job's 1-based queue position. Raises QueueFullError (and forgets
+        the job) when max_queue_depth jobs are already waiting.
+        """
+        with self._lock:
+            if self.max_queue_depth > 0 and len(self._queue) >= self.max_queue_depth:
+                self._forget(job)
+                self.store.delete(job.id)
+                raise QueueFullError(len(self._queue), self.max_queue_depth)
+            job.priority = int(priority or 0)
+            job.status = "queued"
+            heapq.heappush(self._queue, (-job.priority, next(self._sequence), job.id))
+            self._tasks[job.id] = task
+            self._ensure_workers()
+            self._queue_ready.notify()
+            return self._position(job.id)
+
+    def _ensure_workers(self) -> None:
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.worker_count:
+            worker = threading.Thread(
+                target=self._worker_loop, name=f"job-worker-{len(self._workers) + 1}", daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
 
-        handler = JobLogHandler()
-        formatter = logging.Formatter(
-            fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-        handler.setFormatter(formatter)
-        return handler
+    def _worker_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._queue:
+                    self._queue_ready.wait()
+                _, _, job_id = heapq.heappop(self._queue)
+                task = self._tasks.pop(job_id, None)
+                self._running += 1
+            job = self.get(job_id)
+            try:
+                if task is not None and job is not None:
+                    # Log records emitted while the task runs are routed to this job only
+                    with job_log_context(job_id, job.append_line), cancellation_scope(job.cancel_token):
+                        job.cancel_token.check()
+                        task()
+            except JobCancelled as e:
+                # StageTimeout is a failure; an explicit cancel is not
+                job.status = "failed" if isinstance(e, StageTimeout) else "cancelled"
+                job.error = str(e)
+                job.completed_at = time.time()
+                self.logger.warning(f"🛑 Job {job_id} stopped: {e}")
+            except Exception as e:
+                self.logger.error(f"❌ Job {job_id} crashed in worker: {e}")
+                if job and job.status in ("queued", "running"):
+                    job.status = "failed"
+                    job.error = str(e)
+                    job.completed_at = time.time()
+            finally:
+                self._finish(job_id)
+                with self._lock:
+                    self._running -= 1
 
+    def _finish(self, job_id: str) -> None:
+        """Move a finished job into the store (with compacted logs) and evict old jobs"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return
+        try:
+            # Saved before leaving the active set so the job is always visible to get()
+            self.store.save(job.to_record(retain_lines=JOB_LOG_RETAIN_LINES))
+            with self._lock:
+                self._jobs.pop(job_id, None)
+                self._release_request_hash(job)
+            finished_before = time.time() - JOB_RETENTION_SECONDS if JOB_RETENTION_SECONDS > 0 else None
+            evicted = self.store.evict(finished_before, JOB_MAX_FINISHED)
+            if evicted:
+                self.logger.info(f"🧹 Evicted {evicted} finished job(s) from the job store")
+        except Exception as e:
+            self.logger.error(f"❌ Could not store finished job {job_id}: {e}")
+
+    def cancel(self, job_id: str, reason: str = "Cancelled by user") -> Optional[str]:
+        """Cancel a job. A queued job is removed from the queue right away; a running job
+        stops at its next checkpoint. Returns the job status after the call (None if unknown)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job_id in self._tasks:
+                self._tasks.pop(job_id)
+                self._queue = [entry for entry in self._queue if entry[2] != job_id]
+                heapq.heapify(self._queue)
+                job.cancel_token.cancel(reason)
+                job.status = "cancelled"
+                job.error = reason
+                job.completed_at = time.time()
+                queued = True
+            else:
+                queued = False
+        if queued:
+            self._finish(job_id)
+            return "cancelled"
+        if job is None:
+            stored = self.get(job_id)
+            return stored.status if stored else None
+        job.cancel_token.cancel(reason)
+        return "cancelling" if job.status not in job.TERMINAL_STATUSES else job.status
 
+    def _position(self, job_id: str) -> Optional[int]:
+        for position, entry in enumerate(sorted(self._queue), start=1):
+            if entry[2] == job_id:
+                return position
+        return None
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job (None once it has started)"""
+        with self._lock:
+            return self._position(job_id)
+
+    def queue_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queued": len(self._queue),
+                "running": self._running,
+                "workers": self.worker_count,
+                "max_queue_depth": self.max_queue_depth,
+            }
@@ -0,0 +1,216 @@
+"""
+Job Store
+Pluggable persistence for server jobs: an in-memory backend and a SQLite (WAL) backend.
+Jobs are stored as plain records (dicts); JobManager converts them to and from jobs.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from utils.logger import get_logger
+from config import JOB_STORE, JOB_STORE_PATH, LOG_LEVEL, LOG_FILE
+
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobStore(ABC):
+    """Interface shared by the job store backends.
+
+    A record holds: id, kind, status, params, priority, result, error, created_at,
+    started_at, completed_at, log_seq, log_lines_dropped and logs ([seq, line] pairs).
+    """
+
+    @abstractmethod
+    def save(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def query(self, status: Optional[str] = None, kind: Optional[str] = None,
+              created_after: Optional[float] = None, created_before: Optional[float] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        """Records (without logs) matching the filters, newest first"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def evict(self, finished_before: Optional[float] = None, max_finished: int = 0) -> int:
+        """Delete finished jobs completed before `finished_before` and all but the newest
+        `max_finished` finished jobs (0 = no count limit). Returns the number deleted."""
+        raise NotImplementedError
+
+    def mark_interrupted(self) -> int:
+        """Fail jobs left queued/running by a previous process. Returns the number updated."""
+        return 0
+
+
+class MemoryJobStore(JobStore):
+    def __init__(self):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def save(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records[record['id']] = record
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._records.get(job_id)
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._records.pop(job_id, None)
+
+    def query(self, status=None, kind=None, created_after=None, created_before=None, limit=100):
+        with self._lock:
+            records = [
+                r for r in self._records.values()
+                if (status is None or r['status'] == status)
+                and (kind is None or r['kind'] == kind)
+                and (created_after is None or r['created_at'] >= created_after)
+                and (created_before is None or r['created_at'] < created_before)
+            ]
+        records.sort(key=lambda r: r['created_at'], reverse=True)
+        return [{k: v for k, v in r.items() if k != 'logs'} for r in records[:limit]]
+
+    def evict(self, finished_before=None, max_finished=0):
+        with self._lock:
+            finished = sorted(
+                (r for r in self._records.values() if r['status'] in FINISHED_STATUSES),
+                key=lambda r: r.get('completed_at') or r['created_at'], reverse=True
+            )
+            doomed = [
+                r['id'] for index, r in enumerate(finished)
+                if (max_finished > 0 and index >= max_finished)
+                or (finished_before is not None and (r.get('completed_at') or r['created_at']) < finished_before)
+            ]
+            for job_id in doomed:
+                del self._records[job_id]
+            return len(doomed)
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs table in a SQLite database (WAL mode), indexed by status, kind and time"""
+
+    _COLUMNS = ('id', 'kind', 'status', 'params', 'priority', 'result', 'error', 'created_at',
+                'started_at', 'completed_at', 'log_seq', 'log_lines_dropped', 'logs')
+    _JSON_COLUMNS = ('params', 'result', 'logs')
+
+    def __init__(self, path: Optional[str] = None):
+        self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.path = path or JOB_STORE_PATH
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, params TEXT, priority INTEGER DEFAULT 0, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, completed_at REAL, "
+            "log_seq INTEGER DEFAULT 0, log_lines_dropped INTEGER DEFAULT 0, logs TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_kind_created ON jobs(kind, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_completed ON jobs(completed_at)")
+        self._conn.commit()
+
+    def _to_row(self, record: Dict[str, Any]) -> tuple:
+        return tuple(
+            json.dumps(record.get(column), ensure_ascii=False, default=str) if column in self._JSON_COLUMNS
+            else record.get(column)
+            for column in self._COLUMNS
+        )
+
+    def _from_row(self, columns, row) -> Dict[str, Any]:
+        record = dict(zip(columns, row))
+        for column in self._JSON_COLUMNS:
+            if column in record and record[column] is not None:
+                record[column] = json.loads(record[column])
+        return record
+
+    def save(self, record: Dict[str, Any]) -> None:
+        placeholders = ', '.join('?' for _ in self._COLUMNS)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({placeholders})",
+                self._to_row(record)
+            )
+            self._conn.commit()
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._from_row(self._COLUMNS, row) if row else None
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+
+    def query(self, status=None, kind=None, created_after=None, created_before=None, limit=100):
+        columns = tuple(c for c in self._COLUMNS if c != 'logs')
+        clauses, args = [], []
+        for clause, value in (("status = ?", status), ("kind = ?", kind),
+                              ("created_at >= ?", created_after), ("created_at < ?", created_before)):
+            if value is not None:
+                clauses.append(clause)
+                args.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM jobs {where} ORDER BY created_at DESC LIMIT ?",
+                (*args, int(limit))
+            ).fetchall()
+        return [self._from_row(columns, row) for row in rows]
+
+    def evict(self, finished_before=None, max_finished=0):
+        finished = f"status IN ({', '.join('?' for _ in FINISHED_STATUSES)})"
+        deleted = 0
+        with self._lock:
+            if finished_before is not None:
+                deleted += self._conn.execute(
+                    f"DELETE FROM jobs WHERE {finished} AND COALESCE(completed_at, created_at) < ?",
+                    (*FINISHED_STATUSES, finished_before)
+                ).rowcount
+            if max_finished > 0:
+                deleted += self._conn.execute(
+                    f"DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE {finished} "
+                    f"ORDER BY COALESCE(completed_at, created_at) DESC LIMIT -1 OFFSET ?)",
+                    (*FINISHED_STATUSES, max_finished)
+                ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def mark_interrupted(self) -> int:
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart', completed_at = ? "
+                "WHERE status IN ('queued', 'running')",
+                (time.time(),)
+            ).rowcount
+            self._conn.commit()
+        return updated
+
+
+def create_job_store(kind: Optional[str] = None) -> JobStore:
+    """Job store for JOB_STORE ('memory' or 'sqlite')"""
+    kind = (kind or JOB_STORE or 'memory').strip().lower()
+    if kind == 'sqlite':
+        return SQLiteJobStore()
+    return MemoryJobStore()
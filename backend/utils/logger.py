@@ -3,9 +3,77 @@ Application logging setup with console and rotating file handlers
 """
 import logging
 from logging.handlers import RotatingFileHandler
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, Optional
 import os
 
 
+_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# ID of the server job the current thread/task is working for (None outside jobs)
+current_job_id: ContextVar[Optional[str]] = ContextVar("current_job_id", default=None)
+
+
+class JobLogRouter(logging.Handler):
+    """One handler shared by every logger: a record is formatted once and delivered
+    only to the job whose ID is set in the current context (records outside a job
+    are ignored without taking the handler lock)."""
+
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(logging.Formatter(fmt=_FORMAT, datefmt=_DATE_FORMAT))
+        self._sinks: Dict[str, Callable[[str], None]] = {}
+
+    def register(self, job_id: str, sink: Callable[[str], None]) -> None:
+        self._sinks[job_id] = sink
+
+    def unregister(self, job_id: str) -> None:
+        self._sinks.pop(job_id, None)
+
+    def handle(self, record):
+        if current_job_id.get() is None:
+            return False
+        return super().handle(record)
+
+    def emit(self, record):
+        sink = self._sinks.get(current_job_id.get())
+        if sink is None:
+            return
+        try:
+            msg = self.format(record)
+        except Exception:
+            msg = record.getMessage()
+        sink(msg)
+
+
+job_log_router = JobLogRouter()
+# Third-party loggers propagate to the root logger
+logging.getLogger().addHandler(job_log_router)
+
+
+@contextmanager
+def job_log_context(job_id: str, sink: Callable[[str], None]):
+    """Route log records emitted in this context (and in ContextThreadPoolExecutor tasks) to sink"""
+    job_log_router.register(job_id, sink)
+    token = current_job_id.set(job_id)
+    try:
+        yield
+    finally:
+        current_job_id.reset(token)
+        job_log_router.unregister(job_id)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in a copy of the submitting thread's context,
+    so worker threads keep logging to the job that started them."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(copy_context().run, fn, *args, **kwargs)
+
+
 def get_logger(name: str,
                level: str | int = "INFO",
                log_file: str | None = None,
@@ -20,10 +88,7 @@ def get_logger(name: str,
     if logger.handlers:
         return logger
 
-    formatter = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    formatter = logging.Formatter(fmt=_FORMAT, datefmt=_DATE_FORMAT)
 
     # Console handler
     ch = logging.StreamHandler()
@@ -40,6 +105,9 @@ def get_logger(name: str,
         fh.setFormatter(formatter)
         logger.addHandler(fh)
 
+    # Per-job log capture (loggers do not propagate to the root logger)
+    logger.addHandler(job_log_router)
+
     logger.propagate = False
     return logger
 
@@ -7,13 +7,17 @@ properties. Outputs a structured JSON report.
 """
 
 import argparse
+import copy
 import json
 import os
 import re
+import threading
 import unicodedata
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional
 
 from core.slides_client import SlidesClient
+from config import TEMPLATE_ANALYSIS_CACHE_SIZE
 
 
 PLACEHOLDER_PATTERN = re.compile(r"\{\{([^}]+)\}\}")
@@ -174,9 +178,78 @@ def _compute_bounding_box(size: Optional[Dict[str, Any]], transform: Optional[Di
         return None
 
 
-def analyze_presentation(presentation_id: str) -> Dict[str, Any]:
-    client = SlidesClient()
-    presentation = client.get_presentation(presentation_id)
+class TemplateAnalysisCache:
+    """LRU of placeholder reports keyed by template revision (Drive file ID, version, modifiedTime).
+
+    A Drive copy keeps the template's object IDs, so a report computed for one unedited
+    copy is valid for every other copy of the same revision.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = TEMPLATE_ANALYSIS_CACHE_SIZE if max_entries is None else max_entries
+        self._reports: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(source: Dict[str, Any]) -> Optional[tuple]:
+        if not source.get('file_id') or not (source.get('version') or source.get('modifiedTime')):
+            return None
+        return (source['file_id'], str(source.get('version')), source.get('modifiedTime'))
+
+    def get(self, source: Dict[str, Any], presentation_id: str) -> Optional[Dict[str, Any]]:
+        """Cached report for the template revision, re-targeted at presentation_id (and its title)"""
+        key = self._key(source)
+        if key is None or self.max_entries <= 0:
+            return None
+        with self._lock:
+            report = self._reports.get(key)
+            if report is None:
+                return None
+            self._reports.move_to_end(key)
+            report = copy.deepcopy(report)
+        report["presentationId"] = presentation_id
+        if source.get("title"):
+            report["title"] = source["title"]
+        return report
+
+    def put(self, source: Dict[str, Any], report: Dict[str, Any]) -> None:
+        key = self._key(source)
+        if key is None or self.max_entries <= 0:
+            return
+        entry = copy.deepcopy(report)
+        with self._lock:
+            self._reports[key] = entry
+            self._reports.move_to_end(key)
+            while len(self._reports) > self.max_entries:
+                self._reports.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reports.clear()
+
+
+# Shared by every job in the process
+template_analysis_cache = TemplateAnalysisCache()
+
+
+def analyze_presentation(presentation_id: str, client: Optional[SlidesClient] = None,
+                         presentation: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build the placeholder report for a presentation.
+
+    Pass an existing (authenticated) client to avoid re-authenticating and to read from
+    its in-memory snapshot, or the presentation document itself to skip the fetch.
+    For an unedited copy made by that client the report comes from template_analysis_cache
+    when the same template revision was analyzed before.
+    """
+    source = client.copy_source(presentation_id) if presentation is None and client is not None else None
+    if source:
+        cached = template_analysis_cache.get(source, presentation_id)
+        if cached is not None:
+            return cached
+
+    if presentation is None:
+        client = client or SlidesClient()
+        presentation = client.get_presentation(presentation_id)
     if not presentation:
         raise RuntimeError("Could not load presentation")
 
@@ -300,9 +373,29 @@ def analyze_presentation(presentation_id: str) -> Dict[str, Any]:
                                 "text_snippet": text_content[:120],
                             })
 
+    if source:
+        template_analysis_cache.put(source, report)
     return report
 
 
+def filter_report(report: Dict[str, Any], removed_slide_ids=None,
+                  remaining_slide_ids=None) -> Dict[str, Any]:
+    """Report without the placeholders on removed slides (no presentation fetch).
+
+    Pass the deleted slide IDs, and/or the slide IDs still in the deck (e.g. from
+    SlidesClient.get_slide_ids) to also drop placeholders on slides that are gone.
+    """
+    removed = set(removed_slide_ids or ())
+    remaining = set(remaining_slide_ids) if remaining_slide_ids is not None else None
+    filtered = dict(report)
+    filtered["placeholders"] = [
+        ph for ph in report.get("placeholders") or []
+        if ph.get("slide_id") not in removed
+        and (remaining is None or ph.get("slide_id") in remaining)
+    ]
+    return filtered
+
+
 def _save_report(report: Dict[str, Any], out_path: Optional[str]) -> str:
     path = out_path or os.path.join("logs", "placeholder_report.json")
     os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -4,17 +4,22 @@ Matches template placeholders with predefined mappings and generates appropriate
 """
 import json
 import os
+import re
+from concurrent.futures import wait, FIRST_COMPLETED
 from typing import Dict, List, Any, Optional
-from utils.logger import get_logger
-from config import LOG_LEVEL, LOG_FILE
+from utils.logger import get_logger, ContextThreadPoolExecutor
+from utils.prompt_manager import prompt_manager
+from config import LOG_LEVEL, LOG_FILE, TEXT_GENERATION_CONCURRENCY
 from core.generator import ContentGenerator
 
 
 class PlaceholderMatcher:
-    def __init__(self, mapping_file: str = "templates/placeholder_mapping.json"):
+    def __init__(self, mapping_file: str = "templates/placeholder_mapping.json", max_workers: Optional[int] = None):
         self.mapping_file = mapping_file
         self.mappings = {}
         self.content_generator = None
+        # Upper bound on concurrent text generations (see TEXT_GENERATION_CONCURRENCY)
+        self.max_workers = max(1, max_workers or TEXT_GENERATION_CONCURRENCY)
         self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
         self.load_mappings()
     
@@ -130,62 +135,130 @@ class PlaceholderMatcher:
             # Collect for batch AI generation
             text_placeholders_to_generate[placeholder_name] = mapping
         
-        # Second pass: Generate all text content in batch
+        # Second pass: Generate all text content, independent placeholders in parallel
         if text_placeholders_to_generate and self.content_generator:
-            self.logger.info(f"🤖 Batch generating {len(text_placeholders_to_generate)} text contents...")
+            self.logger.info(
+                f"🤖 Batch generating {len(text_placeholders_to_generate)} text contents "
+                f"(up to {self.max_workers} in parallel)..."
+            )
+            self._generate_in_dependency_order(
+                text_placeholders_to_generate, generated_content, combined_values,
+                context, company_name, project_name, project_description
+            )
+        
+        self.logger.info(f"✅ Batch generation complete: {len(generated_content)} contents generated")
+        return generated_content
+
+    def _generate_in_dependency_order(self, to_generate: Dict[str, Dict], generated_content: Dict[str, str],
+                                      combined_values: Dict[str, Any], context: str, company_name: str,
+                                      project_name: str, project_description: str) -> None:
+        """Run generate_content for every placeholder on a bounded thread pool.
+        
+        A placeholder is submitted once all placeholders it depends on (see
+        _placeholder_dependencies) have finished, so prompts still receive the values they
+        reference. Results are collected on the calling thread only.
+        """
+        profile = 'company' if company_name else None
+        names = set(to_generate)
+        waiting_on = {name: self._placeholder_dependencies(name, names) for name in names}
+        dependents: Dict[str, List[str]] = {}
+        for name, deps in waiting_on.items():
+            for dep in deps:
+                dependents.setdefault(dep, []).append(name)
 
-            ordered_items = sorted(
-                text_placeholders_to_generate.items(),
-                key=lambda item: self._placeholder_priority(item[0])
+        def run(name: str, extra_variables: Dict[str, str]) -> str:
+            # Pacing and the per-model concurrency limit are applied by the shared Gemini client
+            return self.content_generator.generate_content(
+                name,
+                context,
+                profile=profile,
+                company_name=company_name or context,
+                project_name=project_name or f"{context} Project",
+                project_description=project_description,
+                extra_variables=extra_variables
             )
 
-            for placeholder_name, mapping in ordered_items:
-                # Determine profile based on company mode
-                profile = 'company' if company_name else None
-                
-                # For resource description placeholders, make sure the matching resource name exists
-                if placeholder_name.startswith('pr_desc_'):
-                    idx = placeholder_name.split('_')[-1]
-                    corresponding = f'p_r_{idx}'
-                    if corresponding not in combined_values or not combined_values[corresponding]:
-                        self.logger.debug(f"Skipping {placeholder_name} because corresponding {corresponding} not available yet")
-                        continue
-                if placeholder_name.startswith('sr_desc_'):
-                    idx = placeholder_name.split('_')[-1]
-                    corresponding = f's_r_{idx}'
-                    if corresponding not in combined_values or not combined_values[corresponding]:
-                        self.logger.debug(f"Skipping {placeholder_name} because corresponding {corresponding} not available yet")
+        def submit_ready(pool, futures) -> None:
+            while True:
+                ready = sorted((n for n, deps in waiting_on.items() if not deps), key=self._placeholder_priority)
+                if not ready:
+                    return
+                for name in ready:
+                    del waiting_on[name]
+                    # For resource description placeholders, make sure the matching resource name exists
+                    required = self._required_resource(name)
+                    if required and not combined_values.get(required):
+                        self.logger.debug(f"Skipping {name} because corresponding {required} not available")
+                        finish(name)
                         continue
+                    # Pass along any known placeholder values so prompts can align descriptions with titles
+                    extra_variables = {
+                        key: value
+                        for key, value in {**combined_values, **generated_content}.items()
+                        if isinstance(key, str) and isinstance(value, str) and value
+                    }
+                    futures[pool.submit(run, name, extra_variables)] = name
 
-                # Pass along any known placeholder values so prompts can align descriptions with titles
-                extra_variables = {
-                    key: value
-                    for key, value in {**combined_values, **generated_content}.items()
-                    if isinstance(key, str) and isinstance(value, str) and value
-                }
+        def finish(name: str) -> None:
+            for dependent in dependents.get(name, []):
+                if dependent in waiting_on:
+                    waiting_on[dependent].discard(name)
+
+        with ContextThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="text-gen") as pool:
+            futures = {}
+            submit_ready(pool, futures)
+            while futures or waiting_on:
+                if not futures:
+                    # Dependency cycle - release everything that is left
+                    self.logger.warning(f"⚠️ Circular placeholder dependencies, generating anyway: {sorted(waiting_on)}")
+                    for deps in waiting_on.values():
+                        deps.clear()
+                    submit_ready(pool, futures)
+                    continue
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Error generating content for {name}: {e}")
+                        content = f"[Error generating content for {name}]"
+                    # Apply content optimization
+                    content = self._optimize_content(content, to_generate[name].get('content_requirements', {}))
+                    generated_content[name] = content
+                    combined_values[name] = content
+                    if name.startswith(('p_r_', 's_r_', 'pr_desc_', 'sr_desc_')):
+                        self.logger.info(f"🧩 Generated {name} = {content}")
+                    self.logger.debug(f"✓ Generated content for {name}")
+                    finish(name)
+                submit_ready(pool, futures)
+
+    def _required_resource(self, name: str) -> Optional[str]:
+        """Resource title a pr_desc_/sr_desc_ placeholder cannot be generated without"""
+        if name.startswith('pr_desc_'):
+            return f"p_r_{name.split('_')[-1]}"
+        if name.startswith('sr_desc_'):
+            return f"s_r_{name.split('_')[-1]}"
+        return None
 
-                # Generate content using prompt manager
-                content = self.content_generator.generate_content(
-                    placeholder_name,
-                    context,
-                    profile=profile,
-                    company_name=company_name or context,
-                    project_name=project_name or f"{context} Project",
-                    project_description=project_description,
-                    extra_variables=extra_variables
-                )
-                
-                # Apply content optimization
-                content = self._optimize_content(content, mapping.get('content_requirements', {}))
-                generated_content[placeholder_name] = content
-                combined_values[placeholder_name] = content
-                if placeholder_name.startswith(('p_r_', 's_r_', 'pr_desc_', 'sr_desc_')):
-                    self.logger.info(f"🧩 Generated {placeholder_name} = {content}")
-                
-                self.logger.debug(f"✓ Generated content for {placeholder_name}")
+    def _placeholder_dependencies(self, name: str, candidates: set) -> set:
+        """Placeholders (among candidates) whose generated value the prompt for `name` uses.
         
-        self.logger.info(f"✅ Batch generation complete: {len(generated_content)} contents generated")
-        return generated_content
+        pr_desc_N/sr_desc_N need p_r_N/s_r_N, HeadN_para needs Heading_N, and any
+        placeholder referenced as a {field} in the text prompt template is waited for too.
+        """
+        deps = set()
+        required = self._required_resource(name)
+        if required:
+            deps.add(required)
+        heading_match = re.match(r'^Head(\d+)_para$', name)
+        if heading_match:
+            deps.add(f"Heading_{heading_match.group(1)}")
+        compiled_prompt = prompt_manager.find_prompt('text_prompts', name)
+        if compiled_prompt:
+            deps.update(compiled_prompt.fields)
+        deps.discard(name)
+        return deps & candidates
 
     def _should_auto_fill(self, placeholder_name: str, auto_fill: Dict, 
                          company_name: str, project_name: str) -> bool:
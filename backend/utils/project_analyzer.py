@@ -1,14 +1,17 @@
 """
-Google Sheets Project Analyzer with Gemini AI
-Analyzes project data from Google Sheets and extracts structured information
+Google Sheets Project Analyzer
+Extracts structured project information from Google Sheets data: computed locally
+for the standard estimation layout, with Gemini AI as the fallback for other layouts
 """
 import json
 import re
 from typing import Dict, Optional, List
-import google.generativeai as genai
 
 from utils.logger import get_logger
-from config import GEMINI_API_KEY, GEMINI_MODEL, LOG_LEVEL, LOG_FILE
+from utils.gemini_client import gemini_client
+from utils.sheet_metrics import compute_project_metrics
+from utils.sheet_encoder import encode_sheets_compact
+from config import GEMINI_API_KEY, GEMINI_MODEL, GEMINI_CACHE_MODE, LOG_LEVEL, LOG_FILE
 
 
 class ProjectAnalyzer:
@@ -17,6 +20,9 @@ class ProjectAnalyzer:
     def __init__(self):
         """Initialize the analyzer"""
         self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.model_name = None
+        self.cache_mode = GEMINI_CACHE_MODE  # Gemini response cache mode ('off', 'read', 'readwrite')
+        self.on_prompt_size = None  # Called with the sheet prompt size stats (before/after compaction)
         self.gemini_model = None
         self.gemini_available = False
         self._setup_gemini()
@@ -34,10 +40,11 @@ class ProjectAnalyzer:
             
             # self.logger.info(f"✓ GEMINI_API_KEY found: {GEMINI_API_KEY[:10]}...")
             
-            genai.configure(api_key=GEMINI_API_KEY)
+            gemini_client.configure(GEMINI_API_KEY)
             model_name = GEMINI_MODEL or 'gemini-2.5-pro'
-            self.logger.info(f"🔧 Creating Gemini model: {model_name}")
-            self.gemini_model = genai.GenerativeModel(model_name)
+            self.logger.info(f"🔧 Using shared Gemini model: {model_name}")
+            self.model_name = model_name
+            self.gemini_model = gemini_client.get_model(model_name)
             self.gemini_available = True
             self.logger.info(f"✅ Gemini AI configured successfully (model: {model_name})")
             return True
@@ -50,7 +57,7 @@ class ProjectAnalyzer:
     
     def format_data_for_gemini(self, sheet_data: List[List]) -> str:
         """
-        Format sheet data into a readable format for Gemini
+        Format sheet data into a compact, token-budgeted text for Gemini
         
         Args:
             sheet_data: Raw data from Google Sheets (list of rows)
@@ -58,6 +65,14 @@ class ProjectAnalyzer:
         Returns:
             Formatted string representation of the data
         """
+        encoded, stats = encode_sheets_compact(sheet_data)
+        self.logger.info(
+            f"🗜️ Sheet prompt data: ~{stats['before_tokens']} → ~{stats['after_tokens']} tokens"
+            + (f" ({stats['rows_summarized']} rows summarized)" if stats['rows_summarized'] else "")
+        )
+        if self.on_prompt_size:
+            self.on_prompt_size(stats)
+
         formatted = "PROJECT DATA FROM GOOGLE SHEETS\n"
         formatted += "=" * 60 + "\n\n"
         formatted += "COLUMN STRUCTURE:\n"
@@ -66,37 +81,10 @@ class ProjectAnalyzer:
         formatted += "- Column I (index 8): Task Owner/Resource name\n"
         formatted += "- Columns J onwards (index 9+): Daily hour allocations\n"
         formatted += "\n" + "=" * 60 + "\n\n"
-        
-        # Include all rows for comprehensive analysis
-        for idx, row in enumerate(sheet_data, 1):
-            # Convert row to string, handling None values
-            row_str = [str(cell) if cell is not None else '' for cell in row]
-            
-            # Add helpful annotations for key rows
-            if idx == 9:
-                formatted += f"Row {idx} (WEEK HEADERS): {row_str}\n"
-            elif idx == 10:
-                formatted += f"Row {idx} (DAY HEADERS): {row_str}\n"
-            elif idx >= 11:
-                # For data rows, highlight key columns
-                phase = row[3] if len(row) > 3 and row[3] else ''
-                task_owner = row[8] if len(row) > 8 and row[8] else ''
-                hours_start = row[9:] if len(row) > 9 else []
-                # Sum hours for this row (safely handle non-numeric values)
-                try:
-                    row_hours = sum([
-                        float(val) if val is not None and (isinstance(val, (int, float)) or (isinstance(val, str) and val.replace('.', '').replace('-', '').isdigit())) else 0
-                        for val in hours_start
-                    ])
-                    formatted += f"Row {idx}: Phase='{phase}', Owner='{task_owner}', RowHours={row_hours:.1f}, Data={row_str}\n"
-                except (ValueError, TypeError):
-                    formatted += f"Row {idx}: Phase='{phase}', Owner='{task_owner}', Data={row_str}\n"
-            else:
-                formatted += f"Row {idx}: {row_str}\n"
-        
-        formatted += f"\n(Total {len(sheet_data)} rows)\n"
+        formatted += encoded
+        formatted += f"\n(Total {stats['rows']} rows)\n"
         formatted += "\nNOTE: Row 9 contains week headers (W1, W2, W3, etc.) - count unique weeks for duration calculation.\n"
-        formatted += "NOTE: Data rows start from row 11 - sum hours from column J (index 9) onwards for each row.\n"
+        formatted += "NOTE: Data rows start from row 11 - use the 'hours' column (sum of column J onwards) for each row.\n"
         
         return formatted
     
@@ -187,7 +175,10 @@ CRITICAL RULES:
             
             self.logger.info("📊 Sending project data to Gemini AI for analysis...")
             
-            response = self.gemini_model.generate_content(prompt)
+            response = gemini_client.generate(
+                self.model_name, prompt, label="project_analysis", cache_mode=self.cache_mode,
+                validate=self._is_analysis_json,
+            )
             response_text = response.text.strip()
             
             self.logger.info("✓ Analysis completed by Gemini AI")
@@ -215,6 +206,11 @@ CRITICAL RULES:
             traceback.print_exc()
             return None
     
+    def _is_analysis_json(self, response_text: str) -> bool:
+        """Response cache validator: the response contains a parsable analysis JSON object"""
+        json_text = self._extract_json_from_response(response_text)
+        return json_text is not None and isinstance(json.loads(json_text), dict)
+
     def _extract_json_from_response(self, response_text: str) -> Optional[str]:
         """
         Extract JSON from Gemini response (might be wrapped in markdown code blocks)
@@ -265,27 +261,48 @@ CRITICAL RULES:
                 'd_p': '20%'
             }
         """
+        if not sheet_data:
+            self.logger.warning("⚠️ No sheet data provided for analysis")
+            return {}
+
+        self.logger.info(f"📊 Sheet data preview: {len(sheet_data)} rows, {len(sheet_data[0]) if sheet_data else 0} columns")
+
+        # Pure arithmetic on known columns - no model round trip needed for the standard layout
+        analysis_result = None
+        try:
+            analysis_result = compute_project_metrics(sheet_data)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Local sheet analysis failed: {e}")
+        if analysis_result:
+            return self.placeholders_from_metrics(analysis_result)
+
+        self.logger.info("🔍 Sheet layout not recognized - falling back to Gemini analysis")
         if not self.gemini_model or not self.gemini_available:
             self.logger.error("❌ Gemini model not initialized - cannot analyze project data")
             self.logger.error(f"   gemini_model: {self.gemini_model is not None}")
             self.logger.error(f"   gemini_available: {self.gemini_available}")
             self.logger.error("   Please check GEMINI_API_KEY configuration")
             return {}
-        
-        if not sheet_data:
-            self.logger.warning("⚠️ No sheet data provided for analysis")
-            return {}
-        
+
         self.logger.info(f"🔍 Analyzing {len(sheet_data)} rows of project data with Gemini AI...")
-        self.logger.info(f"📊 Sheet data preview: {len(sheet_data)} rows, {len(sheet_data[0]) if sheet_data else 0} columns")
-        
         analysis_result = self.analyze_with_gemini(sheet_data)
         
         if not analysis_result:
             self.logger.error("❌ Gemini analysis failed - returning empty results")
             self.logger.error("   Check Gemini API key and network connection")
             return {}
-        
+
+        return self._to_placeholders(analysis_result)
+
+    def placeholders_from_metrics(self, metrics: Dict[str, any]) -> Dict[str, str]:
+        """Placeholder values from locally computed metrics (see utils.sheet_metrics)"""
+        self.logger.info("🧮 Project metrics computed locally from the estimation grid")
+        if metrics.get('unmapped_hours'):
+            self.logger.warning(f"⚠️ {metrics['unmapped_hours']:.1f} hours belong to phases outside the 4 budget groups")
+        return self._to_placeholders(metrics)
+
+    def _to_placeholders(self, analysis_result: Dict[str, any]) -> Dict[str, str]:
+        """Map an analysis result (local or Gemini) to the sheet-linked placeholders"""
         # Map analysis results to placeholders
         placeholder_map = {}
         
@@ -304,7 +321,7 @@ CRITICAL RULES:
         # s_r_1 to s_r_3 (next 3 resources, indices 3-5)
         for i in range(1, 4):
             resource_idx = i + 2  # s_r_1 = resource[3], s_r_2 = resource[4], s_r_3 = resource[5]
-            if resource_idx <= len(top_resources):
+            if resource_idx < len(top_resources):
                 placeholder_map[f's_r_{i}'] = str(top_resources[resource_idx]).strip()
                 self.logger.info(f"📊 Mapped s_r_{i} = {top_resources[resource_idx]}")
             else:
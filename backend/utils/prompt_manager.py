@@ -4,71 +4,219 @@ Handles loading and formatting of AI prompts from configuration files
 """
 import json
 import os
+import re
+import string
+import threading
+import time
 from utils.logger import get_logger
 from config import LOG_LEVEL, LOG_FILE
 
 
+# Prompt category -> (file name, required)
+PROMPT_FILES = {
+    'image_prompts': ('prompts_image.json', True),
+    'text_prompts': ('prompts_text.json', True),
+    'theme_prompts': ('prompts_theme.json', False),
+}
+
+# Seconds between mtime checks for hot-reloading the prompt files
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+def normalize_prompt_key(key):
+    """Normalize a prompt key so naming variants (camelCase, spaces, dashes, case) share one form."""
+    if not key:
+        return key
+    key = key.replace(' ', '_').replace('-', '_')
+    # Split camelCase at lower -> upper boundaries only, so ALL-CAPS names stay one word
+    key = re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', key)
+    return re.sub(r'_+', '_', key).lower()
+
+
+class CompiledPrompt:
+    """A prompt template parsed once into literal text and format fields."""
+
+    def __init__(self, key, template):
+        self.key = key
+        self.template = template
+        self.segments = None  # [(literal, field_name, format_spec, conversion)]
+        self.fields = frozenset()
+        try:
+            segments = list(string.Formatter().parse(template))
+            names = [field for _, field, _, _ in segments if field is not None]
+            # Positional or attribute/index fields are left to str.format
+            if all(name and re.match(r'^[A-Za-z_][A-Za-z0-9_]*$', name) for name in names):
+                self.segments = segments
+            self.fields = frozenset(re.split(r'[.\[]', name)[0] for name in names if name)
+        except ValueError:
+            # Unbalanced braces - rendering falls back to str.format and its error handling
+            pass
+
+    def render(self, variables, keep_unknown=True):
+        """Fill the template.
+
+        Args:
+            variables: dict of values for the template fields
+            keep_unknown: If True, fields without a value are kept as "{field}";
+                          if False a KeyError is raised (same as str.format)
+        """
+        if self.segments is None:
+            if keep_unknown:
+                return self.template.format_map(_DefaultFormatterDict(variables))
+            return self.template.format(**variables)
+        parts = []
+        for literal, field, format_spec, conversion in self.segments:
+            parts.append(literal)
+            if field is None:
+                continue
+            if field not in variables:
+                if not keep_unknown:
+                    raise KeyError(field)
+                parts.append('{' + field + ('!' + conversion if conversion else '') + (':' + format_spec if format_spec else '') + '}')
+                continue
+            value = variables[field]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 'a':
+                value = ascii(value)
+            elif conversion == 's':
+                value = str(value)
+            parts.append(format(value, format_spec) if format_spec else str(value))
+        return ''.join(parts)
+
+
+class _DefaultFormatterDict(dict):
+    def __missing__(self, key):
+        # Preserve unknown placeholders as-is (e.g., {Heading_1})
+        return '{' + key + '}'
+
+
 class PromptManager:
     def __init__(self):
         self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.config_dir = os.path.join(os.path.dirname(__file__), '..', 'config')
+        self._lock = threading.RLock()
+        self._mtimes = {}
+        self._compiled = {}  # category -> {key: CompiledPrompt}
+        self._index = {}  # category -> {normalized key: key}
+        self._last_check = 0.0
         self.prompts = self._load_prompts()
-    
+
+    def _prompt_path(self, file_name):
+        return os.path.join(self.config_dir, file_name)
+
+    def _file_mtimes(self):
+        mtimes = {}
+        for file_name, _ in PROMPT_FILES.values():
+            try:
+                mtimes[file_name] = os.stat(self._prompt_path(file_name)).st_mtime
+            except OSError:
+                mtimes[file_name] = None
+        return mtimes
+
     def _load_prompts(self):
-        """Load prompts from the separated configuration files"""
+        """Load prompts from the separated configuration files and build the lookup index"""
         try:
-            # Load image prompts
-            image_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'prompts_image.json')
-            with open(image_path, 'r', encoding='utf-8') as f:
-                image_prompts = json.load(f)
-            
-            # Load text prompts
-            text_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'prompts_text.json')
-            with open(text_path, 'r', encoding='utf-8') as f:
-                text_prompts = json.load(f)
-            
-            # Load theme prompts
-            theme_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'prompts_theme.json')
-            theme_prompts = {}
-            if os.path.exists(theme_path):
-                with open(theme_path, 'r', encoding='utf-8') as f:
-                    theme_prompts = json.load(f)
-            
-            # Combine into old format for compatibility
-            return {
-                'image_prompts': image_prompts.get('prompts', {}),
-                'text_prompts': text_prompts.get('prompts', {}),
-                'theme_prompts': theme_prompts.get('prompts', {})
-            }
+            mtimes = self._file_mtimes()
+            prompts = {}
+            for category, (file_name, required) in PROMPT_FILES.items():
+                path = self._prompt_path(file_name)
+                if not required and not os.path.exists(path):
+                    prompts[category] = {}
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    prompts[category] = json.load(f).get('prompts', {})
+
+            compiled = {}
+            index = {}
+            for category, templates in prompts.items():
+                compiled[category] = {
+                    key: CompiledPrompt(key, template)
+                    for key, template in templates.items()
+                    if isinstance(template, str)
+                }
+                index[category] = {}
+                for key in templates:
+                    # First key wins if two keys normalize to the same form
+                    index[category].setdefault(normalize_prompt_key(key), key)
+
+            with self._lock:
+                self._compiled = compiled
+                self._index = index
+                self._mtimes = mtimes
+                self._last_check = time.monotonic()
+            self.logger.debug(
+                f"Loaded prompts: {', '.join(f'{c}={len(t)}' for c, t in prompts.items())}"
+            )
+            return prompts
         except Exception as e:
             self.logger.error(f"Failed to load AI prompts: {e}")
             raise e
-    
-    
+
+    def _reload_if_changed(self):
+        """Re-read the prompt files when one of them changed on disk (checked at most once per interval)"""
+        now = time.monotonic()
+        if now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return
+        with self._lock:
+            if now - self._last_check < RELOAD_CHECK_INTERVAL:
+                return
+            self._last_check = now
+            if self._file_mtimes() == self._mtimes:
+                return
+            try:
+                self.prompts = self._load_prompts()
+                self.logger.info("🔄 Prompt files changed on disk - prompts reloaded")
+            except Exception as e:
+                self.logger.error(f"Keeping previously loaded prompts, reload failed: {e}")
+
+    def find_prompt(self, category, key):
+        """Return the CompiledPrompt for a key, or None.
+
+        Tries the key as given, with spaces/dashes as underscores and lowercased, then the
+        normalized form (see normalize_prompt_key), then one split before every capital.
+        """
+        if not key:
+            return None
+        self._reload_if_changed()
+        compiled = self._compiled.get(category, {})
+        for variant in (key, key.replace(' ', '_'), key.replace('-', '_'), key.lower()):
+            prompt = compiled.get(variant)
+            if prompt is not None:
+                return prompt
+        index = self._index.get(category, {})
+        # Short abbreviations map letter by letter (e.g. "DB" -> d_b)
+        for normalized in (normalize_prompt_key(key), normalize_prompt_key(re.sub(r'(?<!^)(?=[A-Z])', '_', key))):
+            original_key = index.get(normalized)
+            if original_key:
+                return compiled.get(original_key)
+        return None
+
     def get_image_prompt(self, placeholder_type, **kwargs):
         """Get formatted image prompt for a placeholder type"""
-        prompt_template = self.prompts.get('image_prompts', {}).get(placeholder_type)
-        if not prompt_template:
+        prompt = self.find_prompt('image_prompts', placeholder_type)
+        if not prompt:
             raise ValueError(f"No image prompt found for {placeholder_type}")
-        
-        return self._format_prompt(prompt_template, **kwargs)
-    
+
+        return self._format_prompt(prompt, **kwargs)
+
     def get_text_prompt(self, placeholder_type, **kwargs):
         """Get formatted text prompt for a placeholder type"""
-        prompt_template = self.prompts.get('text_prompts', {}).get(placeholder_type)
-        if not prompt_template:
+        prompt = self.find_prompt('text_prompts', placeholder_type)
+        if not prompt:
             raise ValueError(f"No text prompt found for {placeholder_type}")
-        
-        return self._format_prompt(prompt_template, **kwargs)
-    
+
+        return self._format_prompt(prompt, **kwargs)
+
     def get_theme_prompt(self, prompt_type, **kwargs):
         """Get formatted theme prompt"""
-        prompt_template = self.prompts.get('theme_prompts', {}).get(prompt_type)
-        if not prompt_template:
+        prompt = self.find_prompt('theme_prompts', prompt_type)
+        if not prompt:
             raise ValueError(f"No theme prompt found for {prompt_type}")
-        
-        return self._format_prompt(prompt_template, **kwargs)
-    
-    def _format_prompt(self, template, **kwargs):
+
+        return self._format_prompt(prompt, **kwargs)
+
+    def _format_prompt(self, prompt, **kwargs):
         """Format a prompt template with provided variables"""
         try:
             # Set default values for common variables
@@ -78,16 +226,16 @@ class PromptManager:
                 'context': kwargs.get('context', 'Business'),
                 'proposal_type': kwargs.get('proposal_type', 'Proposal')
             }
-            
+
             # Merge provided kwargs with defaults
             format_vars = {**defaults, **kwargs}
-            
+
             # Format the template
-            return template.format(**format_vars)
+            return prompt.render(format_vars, keep_unknown=False)
         except Exception as e:
             self.logger.warning(f"Failed to format prompt: {e}")
-            return template
-    
+            return prompt.template
+
     def get_prompt_settings(self):
         """Get prompt generation settings"""
         return self.prompts.get('prompt_settings', {
@@ -97,9 +245,10 @@ class PromptManager:
             'max_tokens': 500,
             'use_fallback_on_error': True
         })
-    
+
     def list_available_prompts(self):
         """List all available prompt types"""
+        self._reload_if_changed()
         return {
             'image_prompts': list(self.prompts.get('image_prompts', {}).keys()),
             'text_prompts': list(self.prompts.get('text_prompts', {}).keys()),
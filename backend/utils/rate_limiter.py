@@ -0,0 +1,60 @@
+"""
+Rate Limiter
+Thread-safe request pacing for Gemini models and Google API write quotas
+"""
+import threading
+import time
+from typing import Dict, Optional
+from config import GEMINI_RATE_LIMIT_RPM, GEMINI_MODEL_RATE_LIMITS
+
+
+class RateLimiter:
+    """Token bucket limiter: allows `requests_per_minute` with a burst of `burst` requests.
+
+    A limit of 0 (or less) disables limiting.
+    """
+
+    def __init__(self, requests_per_minute: int, burst: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.capacity = float(burst or max(1, min(requests_per_minute, 10))) if requests_per_minute > 0 else 0.0
+        self.tokens = self.capacity
+        self.refill_rate = requests_per_minute / 60.0 if requests_per_minute > 0 else 0.0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request may be sent. Returns the time waited in seconds."""
+        if self.refill_rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.refill_rate
+            time.sleep(delay)
+            waited += delay
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name: str, requests_per_minute: Optional[int] = None) -> RateLimiter:
+    """Return the process-wide limiter for a Gemini model (shared by all jobs and threads).
+
+    Other APIs use their own name and pass `requests_per_minute`, which is only read
+    when the limiter is first created.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(model_name)
+        if limiter is None:
+            if requests_per_minute is None:
+                requests_per_minute = GEMINI_MODEL_RATE_LIMITS.get(model_name, GEMINI_RATE_LIMIT_RPM)
+            limiter = RateLimiter(requests_per_minute)
+            _limiters[model_name] = limiter
+        return limiter
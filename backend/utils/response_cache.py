@@ -0,0 +1,251 @@
+"""
+Gemini Response Cache
+Persistent, content-addressed cache for Gemini text responses (SQLite, TTL + size-based LRU)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from utils.logger import get_logger
+from config import (
+    GEMINI_CACHE_PATH, GEMINI_CACHE_TTL_SECONDS, GEMINI_CACHE_MAX_BYTES, LOG_LEVEL, LOG_FILE
+)
+
+
+class _CachedPart:
+    def __init__(self, text):
+        self.text = text
+
+
+class _CachedContent:
+    def __init__(self, text):
+        self.parts = [_CachedPart(text)]
+
+
+class _CachedCandidate:
+    def __init__(self, text):
+        self.content = _CachedContent(text)
+        self.safety_ratings = []
+        self.finish_reason = 'STOP'
+
+
+class CachedResponse:
+    """Stand-in for a Gemini text response served from the cache.
+
+    Exposes the attributes our callers read (text, parts, candidates[0].content.parts)
+    and no usage_metadata, so a cache hit records zero tokens.
+    """
+
+    from_cache = True
+    usage_metadata = None
+
+    def __init__(self, text, saved_tokens=0):
+        self.candidates = [_CachedCandidate(text)]
+        self.saved_tokens = saved_tokens or 0
+
+    @property
+    def text(self):
+        return self.candidates[0].content.parts[0].text
+
+    @property
+    def parts(self):
+        return self.candidates[0].content.parts
+
+
+def response_text(response) -> Optional[str]:
+    """Text of a Gemini response if it is a plain, unblocked text answer (else None)"""
+    try:
+        candidates = getattr(response, 'candidates', None)
+        if not candidates:
+            return None
+        candidate = candidates[0]
+        for rating in getattr(candidate, 'safety_ratings', None) or []:
+            probability = getattr(rating, 'probability', None)
+            if getattr(probability, 'name', str(probability)) in ('HIGH', 'MEDIUM'):
+                return None
+        parts = getattr(getattr(candidate, 'content', None), 'parts', None) or []
+        texts = [part.text for part in parts if getattr(part, 'text', None)]
+        # Responses carrying images or other inline data are not cached
+        if not texts or len(texts) != len(parts):
+            return None
+        return ''.join(texts)
+    except Exception:
+        return None
+
+
+def _response_tokens(response) -> int:
+    usage = getattr(response, 'usage_metadata', None)
+    try:
+        return int(getattr(usage, 'total_token_count', 0) or 0)
+    except Exception:
+        return 0
+
+
+class ResponseCache:
+    """SQLite-backed cache keyed by sha256(model, generation config, formatted prompt).
+
+    Entries older than ttl_seconds are treated as misses and purged. When the stored
+    text exceeds max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        self.path = path or GEMINI_CACHE_PATH
+        self.ttl_seconds = GEMINI_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_bytes = GEMINI_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+        self.available = True
+
+    @staticmethod
+    def make_key(model_name: str, generation_config: Optional[Dict], contents: Any) -> Optional[str]:
+        """Cache key for a request, or None if the request is not cacheable (non-text parts)"""
+        if isinstance(contents, str):
+            prompt = [contents]
+        elif isinstance(contents, (list, tuple)) and all(isinstance(part, str) for part in contents):
+            prompt = list(contents)
+        else:
+            return None
+        payload = json.dumps(
+            {'model': model_name, 'config': generation_config or {}, 'contents': prompt},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _connect(self):
+        if self._conn is not None or not self.available:
+            return self._conn
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, text TEXT NOT NULL, tokens INTEGER DEFAULT 0, "
+                "size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            conn.commit()
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        except Exception as e:
+            self.logger.warning(f"⚠️ Gemini response cache disabled (could not open {self.path}): {e}")
+            self.available = False
+        return self._conn
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return the cached response for key, or None on a miss/expired entry"""
+        if not key:
+            return None
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT text, tokens, size, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                text, tokens, size, created_at = row
+                now = time.time()
+                if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                    self._total_bytes -= size
+                    return None
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                return CachedResponse(text, saved_tokens=tokens)
+            except Exception as e:
+                self.logger.warning(f"⚠️ Gemini response cache read failed: {e}")
+                return None
+
+    def put(self, key: str, model_name: str, response) -> bool:
+        """Store a text response. Returns False when the response is not cacheable."""
+        text = response_text(response)
+        if not key or text is None:
+            return False
+        size = len(text.encode('utf-8'))
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return False
+            try:
+                now = time.time()
+                previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, text, tokens, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model_name, text, _response_tokens(response), size, now, now)
+                )
+                self._total_bytes += size - (previous[0] if previous else 0)
+                if self.max_bytes > 0 and self._total_bytes > self.max_bytes:
+                    self._evict(conn, now)
+                conn.commit()
+                return True
+            except Exception as e:
+                self.logger.warning(f"⚠️ Gemini response cache write failed: {e}")
+                return False
+
+    def delete(self, key: str) -> None:
+        """Drop an entry (e.g. a cached answer the caller could not use)"""
+        if not key:
+            return
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                row = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._total_bytes -= row[0]
+            except Exception as e:
+                self.logger.warning(f"⚠️ Gemini response cache delete failed: {e}")
+
+    def _evict(self, conn, now: float) -> None:
+        """Drop expired entries, then least recently used ones until 90% of max_bytes"""
+        if self.ttl_seconds > 0:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= size
+            evicted += 1
+        if evicted:
+            self.logger.info(f"🧹 Evicted {evicted} Gemini cache entr{'y' if evicted == 1 else 'ies'} (LRU)")
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if conn is not None else 0
+            return {'path': self.path, 'entries': entries, 'bytes': self._total_bytes, 'available': self.available}
+
+
+# Global instance shared by all Gemini callers
+response_cache = ResponseCache()
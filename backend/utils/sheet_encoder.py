@@ -0,0 +1,148 @@
+"""
+Sheet Encoder
+Compact, token-budgeted text encoding of estimation sheets for Gemini prompts:
+empty columns are dropped, daily hour cells are run-length encoded and rows beyond
+the budget are summarized per phase and owner
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.sheet_metrics import (
+    HOURS_START_COLUMN, OWNER_COLUMN, split_sheets, find_week_header, fill_phases, to_hours
+)
+from config import PROJECT_ANALYSIS_TOKEN_BUDGET
+
+
+LEGEND = (
+    "FORMAT: tab-separated rows numbered as in the sheet; empty columns and rows are omitted.\n"
+    "The 'hours' column is the row total; 'J..' lists the cells from column J onwards, where\n"
+    "~N stands for N consecutive empty/zero cells and trailing empty cells are dropped.\n"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def column_letter(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return ' '.join(str(value).split())
+
+
+def _is_gap(value: str) -> bool:
+    if not value:
+        return True
+    try:
+        return float(value.replace(',', '')) == 0
+    except ValueError:
+        return False
+
+
+def encode_run_lengths(cells: List[Any]) -> str:
+    """Space-separated cells with runs of empty/zero cells collapsed to ~N"""
+    values = [_cell(value) for value in cells]
+    while values and _is_gap(values[-1]):
+        values.pop()
+    tokens, gap = [], 0
+    for value in values:
+        if _is_gap(value):
+            gap += 1
+            continue
+        if gap:
+            tokens.append(f"~{gap}")
+            gap = 0
+        tokens.append(value)
+    return ' '.join(tokens)
+
+
+def _legacy_size(sheet_data: List[List[Any]]) -> int:
+    """Characters of the previous one-list-repr-per-row format (for the before/after report)"""
+    return sum(
+        len(f"Row {index}: {[str(cell) if cell is not None else '' for cell in row]}\n")
+        for index, row in enumerate(sheet_data, 1)
+    )
+
+
+def encode_sheets_compact(sheet_data: List[List[Any]], token_budget: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """Encode SheetsReader output within an estimated token budget.
+
+    Header rows (up to the week/day header rows) are always kept; data rows are kept in
+    sheet order until the budget is used up and the rest are summarized as total hours
+    per (phase, owner). Returns the text and size stats (estimated tokens before/after).
+    """
+    budget = PROJECT_ANALYSIS_TOKEN_BUDGET if token_budget is None else token_budget
+    parts: List[str] = [LEGEND]
+    used = estimate_tokens(LEGEND)
+    rows_total = rows_summarized = 0
+
+    for name, rows in split_sheets(sheet_data):
+        rows_total += len(rows)
+        lead_columns = [
+            column for column in range(HOURS_START_COLUMN)
+            if any(len(row) > column and _cell(row[column]) for row in rows)
+        ]
+        header = (
+            f"\n## SHEET: {name or 'Sheet'}\n"
+            + '\t'.join(['row'] + [column_letter(column) for column in lead_columns] + ['hours', 'J..']) + '\n'
+        )
+        parts.append(header)
+        used += estimate_tokens(header)
+
+        week_row = find_week_header(rows)
+        first_data_row = week_row + 2 if week_row is not None else min(len(rows), 10)
+        phases = fill_phases(rows)
+        overflow: Dict[Tuple[str, str], List[float]] = {}
+        overflow_rows: List[int] = []
+
+        for index, row in enumerate(rows):
+            lead = [_cell(row[column]) if len(row) > column else '' for column in lead_columns]
+            hour_cells = row[HOURS_START_COLUMN:]
+            encoded = encode_run_lengths(hour_cells)
+            if not any(lead) and not encoded:
+                continue
+            row_hours = sum(to_hours(value) for value in hour_cells) if index >= first_data_row else 0.0
+            line = '\t'.join([str(index + 1)] + lead + [_cell(row_hours) if row_hours else '', encoded]) + '\n'
+            cost = estimate_tokens(line)
+            if index >= first_data_row and (overflow_rows or (budget > 0 and used + cost > budget)):
+                owner = _cell(row[OWNER_COLUMN]) if len(row) > OWNER_COLUMN else ''
+                totals = overflow.setdefault((phases[index], owner), [0, 0.0])
+                totals[0] += 1
+                totals[1] += row_hours
+                overflow_rows.append(index + 1)
+                continue
+            parts.append(line)
+            used += cost
+
+        if overflow_rows:
+            rows_summarized += len(overflow_rows)
+            summary = [
+                f"## ROWS {overflow_rows[0]}-{overflow_rows[-1]} OF {name or 'Sheet'} SUMMARIZED "
+                f"({len(overflow_rows)} rows over the token budget): phase\towner\trows\thours\n"
+            ]
+            for (phase, owner), (count, hours) in overflow.items():
+                summary.append(f"{phase}\t{owner}\t{count}\t{_cell(round(hours, 2))}\n")
+            parts.extend(summary)
+            used += estimate_tokens(''.join(summary))
+
+    text = ''.join(parts)
+    stats = {
+        'label': 'project_analysis',
+        'before_tokens': (_legacy_size(sheet_data) + 3) // 4,
+        'after_tokens': estimate_tokens(text),
+        'rows': rows_total,
+        'rows_summarized': rows_summarized,
+        'token_budget': budget,
+    }
+    return text, stats
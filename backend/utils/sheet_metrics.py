@@ -0,0 +1,209 @@
+"""
+Sheet Metrics
+Computes the project figures used by the sheet-linked placeholders (duration, phase budget
+split and top resources) directly from the "Effort Estimation" grid with NumPy, either from
+a full row list or incrementally from streamed row blocks
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Column layout of the effort estimation sheet (0-based)
+PHASE_COLUMN = 3   # Column D
+OWNER_COLUMN = 8   # Column I
+HOURS_START_COLUMN = 9  # Columns J onwards: daily hour allocations
+WORKING_DAYS_PER_WEEK = 5
+TOP_RESOURCES = 6
+
+SHEET_MARKER = re.compile(r'^=== DATA FROM SHEET: (.*?)(?: \(via CSV export\))? ===$')
+WEEK_HEADER = re.compile(r'^W(\d+)$', re.IGNORECASE)
+
+# Template phases -> budget placeholder (matched on the start of the normalized phase name)
+PHASE_BUDGETS = (
+    ('planning', 'p_b'),
+    ('design', 'd_b'),
+    ('development', 'd_v'),
+    ('graphics', 'd_v'),
+    ('content', 'd_v'),
+    ('testing', 'd_p'),
+    ('launch', 'd_p'),
+    ('deploy', 'd_p'),
+)
+BUDGET_KEYS = ('p_b', 'd_b', 'd_v', 'd_p')
+
+
+def split_sheets(sheet_data: List[List[Any]]) -> List[Tuple[Optional[str], List[List[Any]]]]:
+    """Split SheetsReader output into (sheet name, rows) sections using its marker rows"""
+    sections: List[Tuple[Optional[str], List[List[Any]]]] = []
+    name, rows = None, []
+    for row in sheet_data:
+        marker = SHEET_MARKER.match(str(row[0]).strip()) if len(row) == 1 and row[0] is not None else None
+        if marker:
+            if rows or name is not None:
+                sections.append((name, rows))
+            name, rows = marker.group(1), []
+        else:
+            rows.append(row)
+    if rows or name is not None:
+        sections.append((name, rows))
+    return sections
+
+
+def to_hours(value: Any) -> float:
+    if value is None or value == '':
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '').strip())
+    except ValueError:
+        return 0.0
+
+
+_to_hours_vectorized = np.vectorize(to_hours, otypes=[float])
+
+
+def find_week_header(rows: List[List[Any]]) -> Optional[int]:
+    """Index of the row holding the W1, W2, ... week headers (columns J onwards)"""
+    for index, row in enumerate(rows):
+        cells = [str(cell).strip() for cell in row[HOURS_START_COLUMN:] if cell not in (None, '')]
+        if cells and sum(1 for cell in cells if WEEK_HEADER.match(cell)) >= max(1, len(cells) // 2):
+            return index
+    return None
+
+
+def fill_phases(rows: List[List[Any]]) -> List[str]:
+    """Phase (column D) of every row; phase cells are merged over a phase's rows and the API
+    only returns the first one, so blanks inherit the phase above"""
+    phases, current = [], ''
+    for row in rows:
+        cell = str(row[PHASE_COLUMN]).strip() if len(row) > PHASE_COLUMN and row[PHASE_COLUMN] is not None else ''
+        current = cell or current
+        phases.append(current)
+    return phases
+
+
+def _budget_key(phase: str) -> Optional[str]:
+    normalized = re.sub(r'\s+', ' ', phase).strip().lower()
+    for prefix, key in PHASE_BUDGETS:
+        if normalized.startswith(prefix):
+            return key
+    return None
+
+
+class EffortAggregator:
+    """Streaming version of the effort estimation analysis.
+
+    feed() takes consecutive row blocks of one sheet (e.g. pages from the Sheets API) and
+    keeps only running totals, so memory does not grow with the sheet. Hours of each block
+    are summed with NumPy; owners and budget phases are grouped with np.bincount.
+    """
+
+    def __init__(self):
+        self.weeks = set()
+        self.week_row_found = False
+        self.skip_rows = 0
+        self.current_phase = ''
+        self.owner_hours: Dict[str, float] = {}  # insertion order = sheet order (tie-break)
+        self.budget_hours = np.zeros(len(BUDGET_KEYS) + 1)
+        self.total_hours = 0.0
+
+    def feed(self, rows: List[List[Any]]) -> None:
+        start = 0
+        if not self.week_row_found:
+            week_row = find_week_header(rows)
+            if week_row is None:
+                return
+            self.week_row_found = True
+            self.weeks = {
+                int(match.group(1))
+                for match in (WEEK_HEADER.match(str(cell).strip()) for cell in rows[week_row][HOURS_START_COLUMN:])
+                if match
+            }
+            start = week_row + 1
+            self.skip_rows = 1  # Day header row (W1D1, W1D2, ...)
+        if self.skip_rows:
+            skipped = min(self.skip_rows, len(rows) - start)
+            start += skipped
+            self.skip_rows -= skipped
+        self._add_data_rows(rows[start:])
+
+    def _add_data_rows(self, rows: List[List[Any]]) -> None:
+        # Phase cells are merged over a phase's rows; carry the last one across blocks
+        phases = []
+        for row in rows:
+            cell = str(row[PHASE_COLUMN]).strip() if len(row) > PHASE_COLUMN and row[PHASE_COLUMN] is not None else ''
+            self.current_phase = cell or self.current_phase
+            phases.append(self.current_phase)
+        data = [(row, phase) for row, phase in zip(rows, phases) if len(row) > HOURS_START_COLUMN]
+        if not data:
+            return
+
+        width = max(len(row) for row, _ in data) - HOURS_START_COLUMN
+        grid = np.full((len(data), width), '', dtype=object)
+        for index, (row, _) in enumerate(data):
+            cells = row[HOURS_START_COLUMN:]
+            grid[index, :len(cells)] = cells
+        row_hours = _to_hours_vectorized(grid).sum(axis=1)
+        self.total_hours += float(row_hours.sum())
+
+        owners = np.array([str(row[OWNER_COLUMN]).strip() if row[OWNER_COLUMN] is not None else '' for row, _ in data])
+        owner_names, first_seen, owner_index = np.unique(owners, return_index=True, return_inverse=True)
+        owner_totals = np.bincount(owner_index, weights=row_hours, minlength=len(owner_names))
+        for i in sorted(range(len(owner_names)), key=lambda i: first_seen[i]):
+            name = str(owner_names[i])
+            if name:
+                self.owner_hours[name] = self.owner_hours.get(name, 0.0) + float(owner_totals[i])
+
+        budget_index = np.array([
+            BUDGET_KEYS.index(key) if key else len(BUDGET_KEYS)
+            for key in (_budget_key(phase) for _, phase in data)
+        ])
+        self.budget_hours += np.bincount(budget_index, weights=row_hours, minlength=len(BUDGET_KEYS) + 1)
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Metrics in the structure the Gemini analysis produces, or None when the layout
+        is not recognized:
+        {'top_resources': [6 names], 'days': '20', 'p_b': '10.14%', 'd_b': ..., 'd_v': ..., 'd_p': ...}
+        """
+        if not self.week_row_found or self.total_hours <= 0:
+            return None
+        order = list(self.owner_hours)
+        ranked = sorted(
+            (name for name in order if self.owner_hours[name] > 0),
+            key=lambda name: (-self.owner_hours[name], order.index(name))
+        )
+        if not ranked or self.budget_hours[:len(BUDGET_KEYS)].sum() <= 0:
+            return None
+        top_resources = ranked[:TOP_RESOURCES]
+        top_resources += [''] * (TOP_RESOURCES - len(top_resources))
+
+        result: Dict[str, Any] = {
+            'top_resources': top_resources,
+            'days': str(len(self.weeks) * WORKING_DAYS_PER_WEEK),
+            'unmapped_hours': float(self.budget_hours[len(BUDGET_KEYS)]),
+        }
+        for position, key in enumerate(BUDGET_KEYS):
+            result[key] = f"{self.budget_hours[position] / self.total_hours * 100:.2f}%"
+        return result
+
+
+def compute_effort_metrics(rows: List[List[Any]]) -> Optional[Dict[str, Any]]:
+    """Metrics for one effort estimation sheet, or None when the layout is not recognized"""
+    aggregator = EffortAggregator()
+    aggregator.feed(rows)
+    return aggregator.result()
+
+
+def pick_metrics(results: List[Tuple[Optional[str], Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+    """The "Effort Estimation" sheet's metrics, else the first recognized sheet's"""
+    ordered = sorted(results, key=lambda item: (item[0] or '').strip().lower() != 'effort estimation')
+    return next((metrics for _, metrics in ordered if metrics), None)
+
+
+def compute_project_metrics(sheet_data: List[List[Any]]) -> Optional[Dict[str, Any]]:
+    """Metrics from SheetsReader output (the "Effort Estimation" section, else the first
+    section whose layout is recognized). None means the layout is not recognized."""
+    return pick_metrics([(name, compute_effort_metrics(rows)) for name, rows in split_sheets(sheet_data)])
@@ -2,21 +2,86 @@
 Google Sheets Reader for PPT Automation
 Fetches placeholder values from Google Sheets
 """
-from typing import Dict, Optional, List
-from googleapiclient.discovery import build
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, List, Tuple
 from googleapiclient.errors import HttpError
 
 from utils.logger import get_logger
+from utils.google_services import get_credentials, get_service
 from utils.project_analyzer import ProjectAnalyzer
+from utils.sheet_metrics import EffortAggregator, pick_metrics
+from utils.sheet_encoder import column_letter
 from config import (
     GOOGLE_SHEETS_ID,
     GOOGLE_SHEETS_RANGE,
     LOG_LEVEL,
     LOG_FILE,
     SHEET_LINKED_PLACEHOLDERS,
+    SHEETS_CACHE_TTL_SECONDS,
+    SHEETS_CACHE_MAX_ENTRIES,
+    SHEETS_PAGE_ROWS,
 )
 
 
+# Sheets analyzed when no sheet names are given
+DEFAULT_SHEETS = ("Effort Estimation", "Investment Breakup")
+
+
+def quote_sheet_name(sheet_name: str) -> str:
+    """A1-notation sheet reference: always single-quoted, embedded quotes doubled"""
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+
+class SheetValuesCache:
+    """Process-wide LRU of placeholder values read from a spreadsheet, keyed by
+    (spreadsheet ID, Drive modifiedTime, sheet names).
+
+    An edit to the spreadsheet changes modifiedTime, so entries never go stale; the TTL only
+    bounds how long unused revisions are kept. Entries are only stored when modifiedTime is known.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = SHEETS_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = SHEETS_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sheets_id: str, modified_time: Optional[str], sheet_names: List[str]) -> Optional[Dict[str, str]]:
+        if not modified_time or self.ttl_seconds <= 0:
+            return None
+        key = (sheets_id, modified_time, tuple(sheet_names))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, values = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return dict(values)
+
+    def put(self, sheets_id: str, modified_time: Optional[str], sheet_names: List[str], values: Dict[str, str]) -> None:
+        if not modified_time or self.ttl_seconds <= 0:
+            return
+        key = (sheets_id, modified_time, tuple(sheet_names))
+        with self._lock:
+            self._entries[key] = (time.time(), dict(values))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by every SheetsReader in the process
+sheet_values_cache = SheetValuesCache()
+
+
 def extract_sheet_id(sheet_id_or_url: Optional[str]) -> Optional[str]:
     """
     Extract Google Sheet ID from a plain ID or a full Sheets URL.
@@ -76,14 +141,16 @@ def extract_gid_from_url(url: Optional[str]) -> Optional[int]:
 
 
 class SheetsReader:
-    def __init__(self, credentials):
+    def __init__(self, credentials=None):
         """Initialize with the same credentials used for Slides API
+        (defaults to the process-wide credentials)
         
         Works with both OAuth and Service Account credentials.
         OAuth credentials use the logged-in user's permissions.
         Service Account credentials require the sheet to be shared with the service account email.
         """
         self.logger = get_logger(__name__, LOG_LEVEL, LOG_FILE)
+        credentials = credentials or get_credentials()
         
         # Detect credential type for logging
         from google.oauth2.credentials import Credentials as UserCredentials
@@ -101,10 +168,11 @@ class SheetsReader:
             auth_type = "Unknown"
             self.logger.warning(f"⚠️ Unknown credential type: {type(credentials)}")
         
-        self.service = build('sheets', 'v4', credentials=credentials)
+        # Discovery clients come from the process-wide registry (one HTTP connection per client)
+        self.service = get_service('sheets', 'v4', credentials)
         # Also build Drive service for alternative access methods
         try:
-            self.drive_service = build('drive', 'v3', credentials=credentials)
+            self.drive_service = get_service('drive', 'v3', credentials)
             self.logger.debug(f"✅ Drive service initialized ({auth_type})")
         except Exception as e:
             self.logger.warning(f"⚠️ Could not initialize Drive service: {e}")
@@ -145,7 +213,16 @@ class SheetsReader:
                         If None, defaults to ["Effort Estimation", "Investment Breakup"]
 
         Returns:
-            dict: {placeholder_name: value} including Gemini-analyzed values
+            dict: {placeholder_name: value} including analyzed values
+
+        Rows are streamed page by page (see iter_row_blocks) into the metrics aggregator.
+        A sheet's rows are only kept in memory until its layout is recognized, so that an
+        unrecognized layout can fall back to Gemini without reading the sheet again.
+
+        API calls on a cache miss: one Drive files.get (MIME check and the modifiedTime the
+        caches are keyed by; the Sheets API does not expose a revision), one spreadsheets.get
+        (sheet titles and grid bounds for paging) and one values.batchGet per
+        SHEETS_PAGE_ROWS rows. A warm revision only costs the Drive call.
         """
         try:
             # Extract ID from URL if provided
@@ -162,303 +239,34 @@ class SheetsReader:
                 self.logger.warning("No Google Sheets ID configured")
                 return {}
 
-            # Validate that the file is actually a Google Sheet (not Excel/other format)
-            if self.drive_service:
-                try:
-                    file_info = self.drive_service.files().get(
-                        fileId=sheets_id,
-                        fields='name,mimeType'
-                    ).execute()
-                    
-                    mime_type = file_info.get('mimeType', 'unknown')
-                    file_name = file_info.get('name', 'unknown')
-                    
-                    self.logger.info(f"📄 File: {file_name}")
-                    self.logger.info(f"📄 MIME type: {mime_type}")
-                    
-                    # Check if it's a native Google Sheet
-                    if mime_type == 'application/vnd.google-apps.spreadsheet':
-                        self.logger.info("✅ Confirmed: This is a native Google Sheet - API access should work")
-                    elif 'spreadsheet' in mime_type.lower() and 'google-apps' in mime_type:
-                        self.logger.info("✅ Confirmed: This is a Google Sheet - API access should work")
-                    else:
-                        self.logger.error(f"❌ WARNING: This file is NOT a native Google Sheet!")
-                        self.logger.error(f"   MIME type: {mime_type}")
-                        self.logger.error(f"   Expected: application/vnd.google-apps.spreadsheet")
-                        self.logger.error("")
-                        self.logger.error("🔧 SOLUTION:")
-                        self.logger.error("   1. Open the file in Google Drive")
-                        self.logger.error("   2. Go to File → Save as Google Sheets")
-                        self.logger.error("   3. Use the NEW Google Sheet ID/URL")
-                        self.logger.error("")
-                        return {}  # Don't proceed if it's not a Google Sheet
-                except Exception as e:
-                    self.logger.warning(f"⚠️ Could not verify file type: {e}")
-                    self.logger.info("   Proceeding anyway - will attempt to read the sheet")
-
-            # Determine which sheets to analyze
-            # Priority: sheet_names parameter > sheets_range > default sheets
-            sheets_to_read = []
-            
-            # Try to get spreadsheet metadata first (optional - if it fails, we'll use defaults)
-            available_sheet_names = []
-            try:
-                spreadsheet_metadata = self.service.spreadsheets().get(
-                    spreadsheetId=sheets_id
-                ).execute()
-                
-                sheets_info = spreadsheet_metadata.get('sheets', [])
-                available_sheet_names = [sheet['properties']['title'] for sheet in sheets_info]
-                self.logger.info(f"📋 Available sheets in spreadsheet: {available_sheet_names}")
-            except HttpError as e:
-                self.logger.warning(f"⚠️ Could not get spreadsheet metadata (this is OK): {e}")
-                self.logger.info("📋 Will try reading sheets directly using known names")
-            
             # ALWAYS analyze both "Effort Estimation" and "Investment Breakup" regardless of sheets_range
             # sheets_range is ignored - we always want both sheets for complete analysis
-            default_sheets = ["Effort Estimation", "Investment Breakup"]
-            
-            if available_sheet_names:
-                # Verify which default sheets exist
-                sheets_to_read = [name for name in default_sheets if name in available_sheet_names]
-                if len(sheets_to_read) < len(default_sheets):
-                    missing = [name for name in default_sheets if name not in available_sheet_names]
-                    self.logger.warning(f"⚠️ Some default sheets not found: {missing}")
-                    if not sheets_to_read:
-                        # If neither default sheet exists, try first available
-                        if available_sheet_names:
-                            sheets_to_read = [available_sheet_names[0]]
-                            self.logger.warning(f"⚠️ Default sheets not found, using first available: {sheets_to_read[0]}")
-            else:
-                # Metadata not available, try default names directly
-                sheets_to_read = default_sheets
-                self.logger.info(f"📋 Will try reading default sheets directly: {sheets_to_read}")
-            
-            # If sheet_names parameter is explicitly provided, use that instead
-            if sheet_names:
-                if available_sheet_names:
-                    sheets_to_read = [name for name in sheet_names if name in available_sheet_names]
-                    if len(sheets_to_read) < len(sheet_names):
-                        missing = [name for name in sheet_names if name not in available_sheet_names]
-                        self.logger.warning(f"⚠️ Some specified sheets not found: {missing}")
-                else:
-                    sheets_to_read = sheet_names
-                    self.logger.info(f"📋 Will try reading specified sheets directly: {sheets_to_read}")
-            
-            if not sheets_to_read:
-                self.logger.error("❌ No valid sheets found to read")
-                return {}
-            
-            self.logger.info(f"📊 Will analyze {len(sheets_to_read)} sheet(s): {sheets_to_read}")
+            requested_sheets = list(sheet_names or DEFAULT_SHEETS)
 
-            # Cache key based on sheets being read
-            cache_key = f"{sheets_id}:{','.join(sheets_to_read)}"
+            # Placeholder values already computed during this run
+            cache_key = f"{sheets_id}:{','.join(requested_sheets)}"
             if cache_key in self.cache:
                 self.logger.debug("Using cached sheet data")
                 return self.cache[cache_key]
 
-            # Read data from all specified sheets and combine
-            all_values = []
-            for sheet_name in sheets_to_read:
-                self.logger.info(f"📥 Fetching data from sheet: '{sheet_name}'")
-                sheet_read_success = False
-                
-                # Try multiple range formats
-                # For sheet names with spaces, we need to quote them
-                if ' ' in sheet_name or '-' in sheet_name:
-                    quoted_name = f"'{sheet_name}'"
-                else:
-                    quoted_name = sheet_name
-                
-                range_formats = [
-                    f"{quoted_name}!A1:ZZ1000",  # Quoted sheet name with range
-                    f"{sheet_name}!A1:ZZ1000",  # Unquoted (might work for some)
-                    quoted_name,  # Just quoted sheet name
-                    sheet_name,  # Just sheet name
-                ]
-                
-                for range_format in range_formats:
-                    try:
-                        self.logger.debug(f"🔄 Trying range format: {range_format}")
-                        result = self.service.spreadsheets().values().get(
-                            spreadsheetId=sheets_id,
-                            range=range_format,
-                        ).execute()
-                        
-                        sheet_values = result.get('values', [])
-                        if sheet_values:
-                            # Add a header row to identify which sheet this data is from
-                            all_values.append([f"=== DATA FROM SHEET: {sheet_name} ==="])
-                            all_values.extend(sheet_values)
-                            self.logger.info(f"✅ Read {len(sheet_values)} rows from '{sheet_name}' using range: {range_format}")
-                            sheet_read_success = True
-                            break
-                        else:
-                            self.logger.warning(f"⚠️ No data found in sheet '{sheet_name}' with range: {range_format}")
-                            
-                    except HttpError as e:
-                        error_msg = str(e)
-                        error_code = e.resp.status if hasattr(e, 'resp') else None
-                        last_error = e
-                        
-                        if "not supported" in error_msg.lower() or error_code == 400:
-                            self.logger.error(f"❌ ERROR: Cannot read sheet '{sheet_name}'")
-                            self.logger.error(f"   Error message: {error_msg}")
-                            self.logger.error(f"   Error code: {error_code}")
-                            self.logger.error("")
-                            self.logger.error("🔍 TROUBLESHOOTING:")
-                            self.logger.error("   1. Ensure the Google Sheet is a REGULAR spreadsheet (not a Form response sheet)")
-                            self.logger.error("   2. Verify the sheet is shared with your Google account/service account")
-                            self.logger.error("   3. Check that the sheet name is exactly: 'Effort Estimation' or 'Investment Breakup'")
-                            self.logger.error("   4. Try opening the sheet in browser and verify it's accessible")
-                            self.logger.error("   5. If it's a Form response sheet, create a copy as a regular sheet")
-                            self.logger.error("")
-                            
-                            # Try to get document info to help diagnose
-                            if self.drive_service:
-                                try:
-                                    file_info = self.drive_service.files().get(
-                                        fileId=sheets_id,
-                                        fields='name,mimeType,capabilities'
-                                    ).execute()
-                                    mime_type = file_info.get('mimeType', 'unknown')
-                                    self.logger.info(f"📄 Document type: {mime_type}")
-                                    if 'spreadsheet' not in mime_type.lower():
-                                        self.logger.error(f"❌ Document is not a Google Sheet! Type: {mime_type}")
-                                except Exception as drive_error:
-                                    self.logger.debug(f"Could not get file info: {drive_error}")
-                        else:
-                            self.logger.debug(f"⚠️ Range format '{range_format}' failed: {e}")
-                        continue
-                    except Exception as e:
-                        self.logger.debug(f"⚠️ Unexpected error with range '{range_format}': {e}")
-                        continue
-                
-                if not sheet_read_success:
-                    self.logger.warning(f"⚠️ Standard Sheets API failed for '{sheet_name}', trying alternative methods...")
-                    
-                    # Method 1: Try batchGet API
-                    try:
-                        self.logger.info(f"🔄 Method 1: Trying batchGet API for '{sheet_name}'")
-                        batch_result = self.service.spreadsheets().values().batchGet(
-                            spreadsheetId=sheets_id,
-                            ranges=[f"'{sheet_name}'!A1:ZZ1000", f"{sheet_name}!A1:ZZ1000"],
-                        ).execute()
-                        
-                        value_ranges = batch_result.get('valueRanges', [])
-                        for value_range in value_ranges:
-                            sheet_values = value_range.get('values', [])
-                            if sheet_values:
-                                all_values.append([f"=== DATA FROM SHEET: {sheet_name} ==="])
-                                all_values.extend(sheet_values)
-                                self.logger.info(f"✅ Successfully read {len(sheet_values)} rows using batchGet API")
-                                sheet_read_success = True
-                                break
-                    except Exception as batch_error:
-                        self.logger.debug(f"batchGet API failed: {batch_error}")
-                    
-                    # Method 2: Try using get() with includeGridData (sometimes works for restricted sheets)
-                    if not sheet_read_success:
-                        try:
-                            self.logger.info(f"🔄 Method 2: Trying get() with includeGridData for '{sheet_name}'")
-                            
-                            # Try to get the sheet by name using get() method
-                            # This sometimes works when values().get() doesn't
-                            spreadsheet = self.service.spreadsheets().get(
-                                spreadsheetId=sheets_id,
-                                ranges=[f"'{sheet_name}'!A1:ZZ1000"],
-                                includeGridData=True
-                            ).execute()
-                            
-                            # Extract data from the response
-                            sheets = spreadsheet.get('sheets', [])
-                            for sheet in sheets:
-                                sheet_props = sheet.get('properties', {})
-                                if sheet_props.get('title') == sheet_name:
-                                    data = sheet.get('data', [])
-                                    if data:
-                                        rows = data[0].get('rowData', [])
-                                        sheet_values = []
-                                        for row in rows:
-                                            row_values = []
-                                            for cell in row.get('values', []):
-                                                # Get cell value
-                                                cell_value = cell.get('userEnteredValue', {})
-                                                if 'stringValue' in cell_value:
-                                                    row_values.append(cell_value['stringValue'])
-                                                elif 'numberValue' in cell_value:
-                                                    row_values.append(str(cell_value['numberValue']))
-                                                elif 'formulaValue' in cell_value:
-                                                    row_values.append(cell_value['formulaValue'])
-                                                else:
-                                                    row_values.append('')
-                                            if row_values:
-                                                sheet_values.append(row_values)
-                                        
-                                        if sheet_values:
-                                            all_values.append([f"=== DATA FROM SHEET: {sheet_name} ==="])
-                                            all_values.extend(sheet_values)
-                                            self.logger.info(f"✅ Successfully read {len(sheet_values)} rows using get() with includeGridData")
-                                            sheet_read_success = True
-                                            break
-                        except Exception as get_error:
-                            error_msg = str(get_error)
-                            if "not supported" not in error_msg.lower():
-                                self.logger.debug(f"get() with includeGridData failed: {get_error}")
-                    
-                    # Method 3: Try Drive API export as CSV (last resort)
-                    if not sheet_read_success and self.drive_service:
-                        try:
-                            self.logger.info(f"🔄 Method 3: Trying Drive API CSV export (exports all sheets)")
-                            
-                            # Export entire spreadsheet as CSV
-                            # Note: This exports all sheets, we'll need to identify which rows belong to which sheet
-                            from googleapiclient.http import MediaIoBaseDownload
-                            import io
-                            
-                            request = self.drive_service.files().export_media(
-                                fileId=sheets_id,
-                                mimeType='text/csv'
-                            )
-                            
-                            fh = io.BytesIO()
-                            downloader = MediaIoBaseDownload(fh, request)
-                            done = False
-                            while done is False:
-                                status, done = downloader.next_chunk()
-                            
-                            fh.seek(0)
-                            csv_content = fh.read().decode('utf-8')
-                            
-                            # Parse CSV
-                            import csv
-                            csv_reader = csv.reader(io.StringIO(csv_content))
-                            sheet_values = list(csv_reader)
-                            
-                            if sheet_values:
-                                all_values.append([f"=== DATA FROM SHEET: {sheet_name} (via CSV export) ==="])
-                                all_values.extend(sheet_values)
-                                self.logger.info(f"✅ Successfully read {len(sheet_values)} rows using Drive API CSV export")
-                                sheet_read_success = True
-                                
-                        except Exception as csv_error:
-                            self.logger.debug(f"Drive API CSV export failed: {csv_error}")
-                    
-                    if not sheet_read_success:
-                        self.logger.error(f"❌ All methods failed for sheet '{sheet_name}'")
-                        self.logger.error(f"   This sheet cannot be accessed via Google Sheets API")
-                        self.logger.error(f"   Possible reasons:")
-                        self.logger.error(f"   1. It's a Google Form response sheet (has API restrictions)")
-                        self.logger.error(f"   2. The sheet is not properly shared with your account")
-                        self.logger.error(f"   3. The document type doesn't support Sheets API")
-                        self.logger.error(f"   SOLUTION: Create a copy of the sheet as a regular Google Sheet")
-            
-            if not all_values:
-                self.logger.warning("No data found in any Google Sheet")
+            # One Drive call: MIME type check plus the revision used as the cache key
+            file_info = self._get_file_info(sheets_id)
+            if file_info is False:
+                return {}  # Don't proceed if it's not a Google Sheet
+            modified_time = (file_info or {}).get('modifiedTime')
+
+            cached = sheet_values_cache.get(sheets_id, modified_time, requested_sheets)
+            if cached is not None:
+                self.logger.info(f"📦 Using cached placeholder values for sheet revision {modified_time}")
+                self.cache[cache_key] = cached
+                return cached
+
+            # Sheet titles and grid sizes: the bounds for paging through the rows
+            sheets_to_read = self._resolve_sheets(sheets_id, requested_sheets, explicit=bool(sheet_names))
+            if not sheets_to_read:
+                self.logger.error("❌ No valid sheets found to read")
                 return {}
-            
-            values = all_values
-            self.logger.info(f"📊 Total rows from all sheets: {len(values)}")
+            self.logger.info(f"📊 Will analyze {len(sheets_to_read)} sheet(s): {list(sheets_to_read)}")
 
             placeholder_data: Dict[str, str] = {}
             
@@ -469,41 +277,64 @@ class SheetsReader:
                 'days', 'p_b', 'd_b', 'd_v', 'd_p'
             }
 
-            # First, get manually entered values for non-analysis placeholders
-            # Skip header row
-            for row in values[1:]:
-                if len(row) >= 2:
-                    placeholder_name = str(row[0]).strip()
-                    placeholder_value = str(row[1]).strip()
+            # Stream the rows once: manually entered values for non-analysis placeholders,
+            # plus the running project metrics per sheet
+            aggregators = {name: EffortAggregator() for name in sheets_to_read}
+            # Rows of sheets whose layout is not recognized yet (None once it is)
+            unrecognized_rows: Dict[str, Optional[List[List[str]]]] = {name: [] for name in sheets_to_read}
+            rows_read = 0
+            for sheet_name, block in self.iter_row_blocks(sheets_id, sheets_to_read):
+                aggregators[sheet_name].feed(block)
+                rows_read += len(block)
+                if aggregators[sheet_name].week_row_found:
+                    unrecognized_rows[sheet_name] = None
+                elif unrecognized_rows[sheet_name] is not None:
+                    unrecognized_rows[sheet_name].extend(block)
+                for row in block:
+                    if len(row) >= 2:
+                        placeholder_name = str(row[0]).strip()
+                        placeholder_value = str(row[1]).strip()
 
-                    # Only add manual values for placeholders that are NOT analysis-based
-                    if placeholder_name in self.linked_placeholders and placeholder_name not in analysis_based_placeholders:
-                        placeholder_data[placeholder_name] = placeholder_value
-                        self.logger.info(f"📋 Loaded from Sheet (manual): {placeholder_name} = {placeholder_value}")
+                        # Only add manual values for placeholders that are NOT analysis-based
+                        if placeholder_name in self.linked_placeholders and placeholder_name not in analysis_based_placeholders:
+                            placeholder_data[placeholder_name] = placeholder_value
+                            self.logger.info(f"📋 Loaded from Sheet (manual): {placeholder_name} = {placeholder_value}")
 
-            # Second, ALWAYS analyze the entire sheet with Gemini AI to extract project data
+            if not rows_read:
+                self.logger.warning("No data found in any Google Sheet")
+                return {}
+            self.logger.info(f"📊 Total rows streamed from all sheets: {rows_read}")
+            metrics = pick_metrics([(name, aggregator.result()) for name, aggregator in aggregators.items()])
+
+            # Second, ALWAYS analyze the sheet to extract project data
             # This will populate: p_r_1-3, s_r_1-3, days, p_b, d_b, d_v, d_p
-            # Gemini analysis takes priority for these placeholders
+            # Analysis results take priority for these placeholders
             self.logger.info("=" * 80)
-            self.logger.info("🤖 STARTING GEMINI AI ANALYSIS OF GOOGLE SHEETS DATA")
+            self.logger.info("🤖 STARTING ANALYSIS OF GOOGLE SHEETS DATA")
             self.logger.info("=" * 80)
-            self.logger.info(f"📊 Sheet has {len(values)} rows of data")
             self.logger.info(f"🔍 Project analyzer initialized: {self.project_analyzer is not None}")
             
             if not self.project_analyzer:
-                self.logger.error("❌ ProjectAnalyzer is None - cannot run Gemini analysis")
+                self.logger.error("❌ ProjectAnalyzer is None - cannot analyze the sheet")
                 self.logger.error("   Analysis-based placeholders will be empty")
-            elif not self.project_analyzer.gemini_available:
-                self.logger.error("❌ Gemini AI is not available in ProjectAnalyzer")
+            elif not metrics and not self.project_analyzer.gemini_available:
+                self.logger.error("❌ Sheet layout not recognized and Gemini AI is not available in ProjectAnalyzer")
                 self.logger.error("   Check GEMINI_API_KEY configuration")
-            else:
-                self.logger.info("✅ ProjectAnalyzer and Gemini AI are ready - proceeding with analysis")
             
             try:
                 if not self.project_analyzer:
                     analyzed_data = {}
+                elif metrics:
+                    analyzed_data = self.project_analyzer.placeholders_from_metrics(metrics)
                 else:
-                    analyzed_data = self.project_analyzer.analyze_project_data(values)
+                    # Unrecognized layout: Gemini needs the rows themselves (compacted in the prompt)
+                    self.logger.info("🔍 Sheet layout not recognized locally - sending the rows to Gemini")
+                    if all(rows is not None for rows in unrecognized_rows.values()):
+                        sheet_rows = self._combine_sheets(unrecognized_rows)
+                    else:
+                        # A sheet had the layout but no usable metrics; its rows were not kept
+                        sheet_rows = self.read_rows(sheets_id, sheets_to_read)
+                    analyzed_data = self.project_analyzer.analyze_project_data(sheet_rows)
                 
                 if analyzed_data:
                     self.logger.info(f"✅ Gemini returned {len(analyzed_data)} placeholder values")
@@ -532,17 +363,151 @@ class SheetsReader:
             self.logger.info("=" * 80)
 
             self.cache[cache_key] = placeholder_data
+            if metrics:
+                # Computed deterministically from this revision (Gemini results use the response cache)
+                sheet_values_cache.put(sheets_id, modified_time, requested_sheets, placeholder_data)
             self.logger.info(f"\u2705 Fetched {len(placeholder_data)} placeholder values from Sheet (manual + analyzed)")
             return placeholder_data
 
         except HttpError as e:
             self.logger.error(f"Google Sheets API error: {e}")
             self.logger.error("Make sure the Sheet ID is correct and shared with the service account")
+            if "not supported" in str(e).lower():
+                self._log_unsupported_sheet(e)
             return {}
         except Exception as e:
             self.logger.error(f"Error fetching from Google Sheets: {e}")
             return {}
 
+    def _get_file_info(self, sheets_id: str):
+        """Drive metadata (name, mimeType, modifiedTime) for the spreadsheet.
+
+        Returns False when the file is not a native Google Sheet, None when Drive is unavailable.
+        """
+        if not self.drive_service:
+            return None
+        try:
+            file_info = self.drive_service.files().get(
+                fileId=sheets_id,
+                fields='name,mimeType,modifiedTime',
+                supportsAllDrives=True
+            ).execute()
+        except Exception as e:
+            self.logger.warning(f"⚠️ Could not verify file type: {e}")
+            self.logger.info("   Proceeding anyway - will attempt to read the sheet (without caching)")
+            return None
+
+        mime_type = file_info.get('mimeType', 'unknown')
+        self.logger.info(f"📄 File: {file_info.get('name', 'unknown')} ({mime_type})")
+        if mime_type != 'application/vnd.google-apps.spreadsheet':
+            self.logger.error(f"❌ WARNING: This file is NOT a native Google Sheet!")
+            self.logger.error(f"   MIME type: {mime_type}")
+            self.logger.error(f"   Expected: application/vnd.google-apps.spreadsheet")
+            self.logger.error("")
+            self.logger.error("🔧 SOLUTION:")
+            self.logger.error("   1. Open the file in Google Drive")
+            self.logger.error("   2. Go to File → Save as Google Sheets")
+            self.logger.error("   3. Use the NEW Google Sheet ID/URL")
+            self.logger.error("")
+            return False
+        return file_info
+
+    def _resolve_sheets(self, sheets_id: str, sheet_names: List[str], explicit: bool = False) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+        """{sheet name: (rowCount, columnCount)} for the sheets to read, from a fields-masked
+        spreadsheets.get. Without metadata the requested names are read with unknown bounds."""
+        try:
+            metadata = self.service.spreadsheets().get(
+                spreadsheetId=sheets_id,
+                fields='sheets.properties(title,gridProperties(rowCount,columnCount))'
+            ).execute()
+        except HttpError as e:
+            self.logger.warning(f"⚠️ Could not get spreadsheet metadata (this is OK): {e}")
+            self.logger.info(f"📋 Will try reading sheets directly: {sheet_names}")
+            return {name: (None, None) for name in sheet_names}
+
+        bounds = {}
+        for sheet in metadata.get('sheets', []):
+            properties = sheet.get('properties', {})
+            grid = properties.get('gridProperties', {})
+            bounds[properties.get('title')] = (grid.get('rowCount'), grid.get('columnCount'))
+        self.logger.info(f"📋 Available sheets in spreadsheet: {list(bounds)}")
+
+        existing = [name for name in sheet_names if name in bounds]
+        missing = [name for name in sheet_names if name not in bounds]
+        if missing:
+            self.logger.warning(f"⚠️ Some {'specified' if explicit else 'default'} sheets not found: {missing}")
+        if not existing and bounds and not explicit:
+            # If neither default sheet exists, try first available
+            existing = [next(iter(bounds))]
+            self.logger.warning(f"⚠️ Default sheets not found, using first available: {existing[0]}")
+        return {name: bounds[name] for name in existing}
+
+    def iter_row_blocks(self, sheets_id: str, sheets: Dict[str, Tuple[Optional[int], Optional[int]]]):
+        """Yield (sheet name, rows) blocks of SHEETS_PAGE_ROWS rows, lazily.
+
+        Each page is one values.batchGet covering every sheet that still has rows, bounded
+        by the sheet's gridProperties (all rows, only the used columns). Blocks are padded
+        with empty rows so rows keep their position; a sheet with unknown bounds is read
+        until a page comes back empty.
+        """
+        active = dict(sheets)
+        start = 1
+        while active:
+            end = start + SHEETS_PAGE_ROWS - 1
+            names = list(active)
+            ranges = []
+            for name in names:
+                row_count, column_count = active[name]
+                last_column = column_letter(column_count - 1) if column_count else 'ZZ'
+                ranges.append(f"{quote_sheet_name(name)}!A{start}:{last_column}{min(end, row_count) if row_count else end}")
+            result = self.service.spreadsheets().values().batchGet(
+                spreadsheetId=sheets_id,
+                ranges=ranges,
+                fields='valueRanges(values)'
+            ).execute()
+            for name, value_range in zip(names, result.get('valueRanges', [])):
+                row_count = active[name][0]
+                rows = value_range.get('values', [])
+                # An all-empty page of a sheet with known bounds is still yielded (as empty rows)
+                if rows or row_count:
+                    block_size = (min(end, row_count) if row_count else end) - start + 1
+                    rows.extend([] for _ in range(block_size - len(rows)))
+                    yield name, rows
+                if (row_count and end >= row_count) or (not row_count and not rows):
+                    del active[name]
+            start = end + 1
+
+    def read_rows(self, sheets_id: str, sheets: Dict[str, Tuple[Optional[int], Optional[int]]]) -> List[List[str]]:
+        """All rows of the sheets, each sheet preceded by a "=== DATA FROM SHEET: <name> ===" marker row"""
+        rows_by_sheet: Dict[str, List[List[str]]] = {name: [] for name in sheets}
+        for name, block in self.iter_row_blocks(sheets_id, sheets):
+            rows_by_sheet[name].extend(block)
+        return self._combine_sheets(rows_by_sheet)
+
+    def _combine_sheets(self, rows_by_sheet: Dict[str, List[List[str]]]) -> List[List[str]]:
+        """Rows of several sheets in one list, each sheet preceded by its marker row (trailing empty rows dropped)"""
+        all_values: List[List[str]] = []
+        for name, rows in rows_by_sheet.items():
+            while rows and not rows[-1]:
+                rows.pop()
+            if rows:
+                # Add a header row to identify which sheet this data is from
+                all_values.append([f"=== DATA FROM SHEET: {name} ==="])
+                all_values.extend(rows)
+                self.logger.info(f"✅ Read {len(rows)} rows from '{name}'")
+        return all_values
+
+    def _log_unsupported_sheet(self, error: HttpError) -> None:
+        self.logger.error(f"❌ ERROR: Cannot read the sheets: {error}")
+        self.logger.error("")
+        self.logger.error("🔍 TROUBLESHOOTING:")
+        self.logger.error("   1. Ensure the Google Sheet is a REGULAR spreadsheet (not a Form response sheet)")
+        self.logger.error("   2. Verify the sheet is shared with your Google account/service account")
+        self.logger.error("   3. Check that the sheet name is exactly: 'Effort Estimation' or 'Investment Breakup'")
+        self.logger.error("   4. Try opening the sheet in browser and verify it's accessible")
+        self.logger.error("   5. If it's a Form response sheet, create a copy as a regular sheet")
+        self.logger.error("")
+
     def get_placeholder_value(self, placeholder_name: str) -> Optional[str]:
         data = self.fetch_placeholder_values()
         return data.get(placeholder_name)
@@ -551,6 +516,7 @@ class SheetsReader:
         return placeholder_name in self.linked_placeholders
 
     def clear_cache(self) -> None:
+        """Forget this reader's per-run placeholder values (the revision-keyed sheet cache is kept)"""
         self.cache.clear()
         self.logger.debug("Sheet data cache cleared")
 
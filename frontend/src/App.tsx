@@ -5,7 +5,7 @@ import { ProgressBar } from './components/ProgressBar'
 import { Textarea } from './components/ui/textarea'
 import { Button } from './components/ui/button'
 import logo from '../logo.png'
-import { startAutoJob, startCopyJob, startInteractiveJob, getJob, getJobLogs } from './api'
+import { startAutoJob, startCopyJob, startInteractiveJob, getJob, getJobLogsSince } from './api'
 
 export default function App() {
   const [jobId, setJobId] = useState<string | null>(null)
@@ -130,21 +130,29 @@ https://example6.com`
 
   useEffect(() => {
     if (!jobId) return
+    let cursor = 0
+    let inFlight = false
     const interval = setInterval(async () => {
+      // Skip a tick while the previous poll is pending so lines are not appended twice
+      if (inFlight) return
+      inFlight = true
       try {
-        const [j, l] = await Promise.all([getJob(jobId), getJobLogs(jobId)])
+        const [j, l] = await Promise.all([getJob(jobId), getJobLogsSince(jobId, cursor)])
+        cursor = l.next
         setStatus(j.status)
-        setLogs(l)
+        if (l.logs.length) setLogs((prev) => prev.concat(l.logs))
         if (j.status === 'succeeded') {
           setResultUrl(j?.result?.presentation_url || null)
           clearInterval(interval)
         }
-        if (j.status === 'failed') {
+        if (j.status === 'failed' || j.status === 'cancelled') {
           clearInterval(interval)
         }
       } catch (e) {
         // stop on error
         clearInterval(interval)
+      } finally {
+        inFlight = false
       }
     }, 1500)
     setPolling((p) => p + 1)
@@ -1,4 +1,4 @@
-export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed'
+export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled'
 
 const API_BASE = '/api'
 
@@ -35,6 +35,14 @@ export async function getJobLogs(jobId: string): Promise<string[]> {
   return data.logs || []
 }
 
+// Only the log lines after the `after` cursor; pass the returned `next` to the following call
+export async function getJobLogsSince(jobId: string, after: number): Promise<{ logs: string[]; next: number }> {
+  const res = await fetch(`${API_BASE}/jobs/${jobId}/logs?after=${after}`)
+  if (!res.ok) throw new Error('Failed to fetch logs')
+  const data = await res.json()
+  return { logs: data.logs || [], next: data.next ?? after }
+}
+
 export async function startInteractiveJob(payload: Record<string, any>): Promise<{ job_id: string }> {
   const res = await fetch(`${API_BASE}/jobs/interactive`, {
     method: 'POST',